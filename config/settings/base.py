@@ -69,6 +69,7 @@ DJANGO_APPS = [
     "django.contrib.staticfiles",
     # "django.contrib.humanize", # Handy template tags
     "django.contrib.admin",
+    "django.contrib.postgres",
     "django.forms",
     "django_filters",
     "mptt",
@@ -333,6 +334,25 @@ CELERY_TASK_TIME_LIMIT = 5 * 60
 CELERY_TASK_SOFT_TIME_LIMIT = 60
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#beat-scheduler
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+# https://docs.celeryq.dev/en/stable/userguide/periodic-tasks.html#beat-entries
+CELERY_BEAT_SCHEDULE = {
+    "crm-rebuild-time-based-segments": {
+        "task": "eventuais.crm.tasks.rebuild_time_based_segments",
+        "schedule": 60 * 60,
+    },
+    "crm-flush-tracking-events": {
+        "task": "eventuais.crm.tasks.flush_tracking_events",
+        "schedule": 10,
+    },
+    "crm-dispatch-drip-steps": {
+        "task": "eventuais.crm.tasks.dispatch_drip_steps",
+        "schedule": 60,
+    },
+    "crm-rebuild-suppression-list": {
+        "task": "eventuais.crm.tasks.rebuild_suppression_list",
+        "schedule": 24 * 60 * 60,
+    },
+}
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#worker-send-task-events
 CELERY_WORKER_SEND_TASK_EVENTS = True
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#std-setting-task_send_sent_event
@@ -372,7 +392,11 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
+    "DEFAULT_PAGINATION_CLASS": "eventuais.crm.pagination.KeysetPagination",
+    "PAGE_SIZE": env.int("DJANGO_API_PAGE_SIZE", default=50),
 }
+# Upper bound for the ?page_size= a client may request
+API_MAX_PAGE_SIZE = env.int("DJANGO_API_MAX_PAGE_SIZE", default=500)
 
 # django-cors-headers - https://github.com/adamchainz/django-cors-headers#setup
 CORS_URLS_REGEX = r"^/api/.*$"
@@ -388,3 +412,41 @@ SPECTACULAR_SETTINGS = {
 }
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Seconds a report result stays cached; writes to its source tables retire it earlier
+REPORT_CACHE_TIMEOUT = env.int("REPORT_CACHE_TIMEOUT", default=60 * 60)
+# Threads rendering the items of one dashboard concurrently; 1 renders them in the request thread
+DASHBOARD_RENDER_WORKERS = env.int("DASHBOARD_RENDER_WORKERS", default=4)
+# Seconds a user's set of visible report/dashboard ids stays cached; sharing and edits retire it earlier
+ACCESS_CACHE_TIMEOUT = env.int("ACCESS_CACHE_TIMEOUT", default=60 * 60)
+# Seconds a bulk import task runs chunks before queueing the rest; the chunk
+# running at that point must still end within CELERY_TASK_SOFT_TIME_LIMIT
+IMPORT_TASK_SECONDS = env.int("IMPORT_TASK_SECONDS", default=30)
+# Recipients per campaign send task, and emails per second a single campaign may send
+CAMPAIGN_SEND_BATCH_SIZE = env.int("CAMPAIGN_SEND_BATCH_SIZE", default=500)
+CAMPAIGN_SEND_RATE = env.int("CAMPAIGN_SEND_RATE", default=200)
+# Processes rendering personalized campaign emails; 1 renders in the sending worker itself
+PERSONALIZATION_PROCESSES = env.int("PERSONALIZATION_PROCESSES", default=1)
+# Email open/click tracking: absolute base of the tracking links, Redis timeout of a hit,
+# events kept in the stream, and how many events a flush applies per batch and per run
+TRACKING_BASE_URL = env("TRACKING_BASE_URL", default="http://localhost:8000")
+TRACKING_REDIS_TIMEOUT = env.float("TRACKING_REDIS_TIMEOUT", default=0.5)
+TRACKING_STREAM_MAXLEN = env.int("TRACKING_STREAM_MAXLEN", default=1_000_000)
+TRACKING_FLUSH_BATCH_SIZE = env.int("TRACKING_FLUSH_BATCH_SIZE", default=5000)
+TRACKING_FLUSH_MAX_BATCHES = env.int("TRACKING_FLUSH_MAX_BATCHES", default=20)
+# Drip sequences: steps claimed per transaction, parallel drain tasks and batches per task run
+DRIP_BATCH_SIZE = env.int("DRIP_BATCH_SIZE", default=200)
+DRIP_WORKERS = env.int("DRIP_WORKERS", default=4)
+DRIP_MAX_BATCHES = env.int("DRIP_MAX_BATCHES", default=50)
+# Drip steps that fail to render or send are retried this many minutes later, up to DRIP_MAX_ATTEMPTS times
+DRIP_RETRY_MINUTES = env.int("DRIP_RETRY_MINUTES", default=60)
+DRIP_MAX_ATTEMPTS = env.int("DRIP_MAX_ATTEMPTS", default=3)
+# Suppression list: Redis timeout of a check, and the addresses and false-positive rate
+# each process's Bloom filter is sized for
+SUPPRESSION_REDIS_TIMEOUT = env.float("SUPPRESSION_REDIS_TIMEOUT", default=1.0)
+SUPPRESSION_BLOOM_CAPACITY = env.int("SUPPRESSION_BLOOM_CAPACITY", default=1_000_000)
+SUPPRESSION_BLOOM_ERROR_RATE = env.float("SUPPRESSION_BLOOM_ERROR_RATE", default=0.001)
+# Typeahead: rows returned by default and at most, and the longest queries whose results
+# each process keeps until the table changes
+TYPEAHEAD_LIMIT = env.int("TYPEAHEAD_LIMIT", default=8)
+TYPEAHEAD_MAX_LIMIT = env.int("TYPEAHEAD_MAX_LIMIT", default=20)
+TYPEAHEAD_CACHE_PREFIX_LENGTH = env.int("TYPEAHEAD_CACHE_PREFIX_LENGTH", default=3)
@@ -1,5 +1,11 @@
 import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
+from eventuais.crm import suppression
+from eventuais.crm.tests.fakes import InMemoryRedis
 from eventuais.users.models import User
 from eventuais.users.tests.factories import UserFactory
 
@@ -9,6 +15,53 @@ def _media_storage(settings, tmpdir) -> None:
     settings.MEDIA_ROOT = tmpdir.strpath
 
 
+@pytest.fixture(autouse=True)
+def _clear_cache() -> None:
+    # The test database is rolled back between tests, cached results must go too
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def suppression_redis(monkeypatch) -> InMemoryRedis:
+    # Sends check the suppression list; each test starts with an empty Redis and no filter loaded
+    client = InMemoryRedis()
+    monkeypatch.setattr(suppression, "get_redis", lambda: client)
+    monkeypatch.setattr(suppression, "_local", {"bloom": None, "epoch": None, "offset": 0})
+    return client
+
+
 @pytest.fixture
 def user(db) -> User:
     return UserFactory()
+
+
+@pytest.fixture
+def assert_constant_queries(user, django_capture_on_commit_callbacks):
+    """Check that listing ``url`` costs the same number of queries for one row as for many.
+
+    ``make_row`` is called with the requesting user and must create at least
+    one row that shows up in the listing. Its on-commit hooks run as if the
+    rows had been committed, so caches they retire are retired.
+    """
+    client = APIClient()
+    client.force_authenticate(user)
+
+    def count_queries(url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200, response.content  # noqa: PLR2004
+        rows = response.data["results"] if isinstance(response.data, dict) else response.data
+        return len(context.captured_queries), len(rows)
+
+    def check(url, make_row, many=5):
+        with django_capture_on_commit_callbacks(execute=True):
+            make_row(user)
+        single, few_rows = count_queries(url)
+        with django_capture_on_commit_callbacks(execute=True):
+            for _ in range(many - 1):
+                make_row(user)
+        multiple, many_rows = count_queries(url)
+        assert many_rows > few_rows
+        assert multiple == single, f"{url} ran {single} queries for {few_rows} rows but {multiple} for {many_rows}"
+
+    return check
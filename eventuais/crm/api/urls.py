@@ -4,22 +4,25 @@ from rest_framework.routers import DefaultRouter
 
 from eventuais.crm.views import AccountViewSet
 from eventuais.crm.views import ActivityViewSet
+from eventuais.crm.views import CampaignRecipientViewSet
+from eventuais.crm.views import CampaignViewSet
 from eventuais.crm.views import ContactViewSet
 from eventuais.crm.views import ContentTypeViewSet
 from eventuais.crm.views import CustomFieldValueViewSet
 from eventuais.crm.views import CustomFieldViewSet
+from eventuais.crm.views import DashboardItemViewSet
+from eventuais.crm.views import DashboardViewSet
+from eventuais.crm.views import ImportJobViewSet
+from eventuais.crm.views import MarketingEmailViewSet
 from eventuais.crm.views import OpportunityViewSet
+from eventuais.crm.views import ReportViewSet
+from eventuais.crm.views import SegmentViewSet
 from eventuais.crm.views import SocialProfileViewSet
+from eventuais.crm.views import SupportTicketViewSet
 from eventuais.crm.views import TagViewSet
-from eventuais.crm.views_additional import CampaignRecipientViewSet
-from eventuais.crm.views_additional import CampaignViewSet
-from eventuais.crm.views_additional import DashboardItemViewSet
-from eventuais.crm.views_additional import DashboardViewSet
-from eventuais.crm.views_additional import MarketingEmailViewSet
-from eventuais.crm.views_additional import ReportViewSet
-from eventuais.crm.views_additional import SegmentViewSet
-from eventuais.crm.views_additional import SupportTicketViewSet
-from eventuais.crm.views_additional import TicketMessageViewSet
+from eventuais.crm.views import TicketMessageViewSet
+from eventuais.crm.views import track_click
+from eventuais.crm.views import track_open
 
 router = DefaultRouter()
 router.register(r"tags", TagViewSet)
@@ -40,7 +43,10 @@ router.register(r"ticket-messages", TicketMessageViewSet)
 router.register(r"reports", ReportViewSet)
 router.register(r"dashboards", DashboardViewSet)
 router.register(r"dashboard-items", DashboardItemViewSet)
+router.register(r"import-jobs", ImportJobViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("track/open/<str:token>.gif", track_open, name="crm-track-open"),
+    path("track/click/<str:token>/", track_click, name="crm-track-click"),
 ]
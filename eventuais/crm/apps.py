@@ -6,3 +6,5 @@ class CrmConfig(AppConfig):
     name = "eventuais.crm"
     verbose_name = _("CRM")
 
+    def ready(self):
+        import eventuais.crm.signals  # noqa: F401
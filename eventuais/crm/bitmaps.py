@@ -0,0 +1,201 @@
+"""Segment membership as bitmaps, for fast audience set algebra.
+
+Every contact that belongs to a segment gets a dense integer position
+(:class:`ContactIndex`). A segment's membership is stored once as a
+zlib-compressed bitmap over those positions (:class:`SegmentBitmap`) and
+decoded into a Python ``int``, whose ``|``, ``&`` and ``& ~`` run in C over
+whole machine words: unions, intersections and exclusions of million-contact
+segments take well under a millisecond once decoded, and counting is
+``int.bit_count``.
+
+Bitmaps are built on first use. When a segment's membership changes (see
+:mod:`eventuais.crm.membership` and :mod:`eventuais.crm.bulk`),
+:func:`mark_bitmaps_stale` flags its stored bitmap and, once the change
+commits, queues a Celery rebuild; reads keep getting the stale bitmap until
+the rebuild replaces it, so they never pay for a full rebuild themselves and
+a burst of changes to a segment costs one rebuild. Decoded bitmaps are kept
+per process until their row is rebuilt.
+
+Expressions combine segments by id: a segment id, or
+``{"union" | "intersect" | "except": [expression, ...]}``, where ``except``
+removes every later operand from the first.
+"""
+
+import operator
+import uuid
+import zlib
+from functools import reduce
+from itertools import batched
+from itertools import combinations
+
+from django.db import transaction
+
+from eventuais.crm.models import Contact
+from eventuais.crm.models import ContactIndex
+from eventuais.crm.models import Segment
+from eventuais.crm.models import SegmentBitmap
+from eventuais.crm.models import SegmentMembership
+
+OPERATORS = {
+    "union": operator.or_,
+    "intersect": operator.and_,
+    "except": lambda left, right: left & ~right,
+}
+
+# Segments one expression or overlap request may reference
+MAX_EXPRESSION_SEGMENTS = 20
+
+# Contacts given positions per INSERT
+INDEX_BATCH_SIZE = 5000
+
+# Decoded bitmaps kept per process
+MAX_DECODED = 64
+
+_decoded = {}
+
+
+class SegmentExpressionError(ValueError):
+    """Raised when a segment expression is malformed or references unknown segments."""
+
+
+def mark_bitmaps_stale(segment_ids):
+    """Flag the stored bitmaps of segments whose membership changed and queue their rebuild on commit."""
+    # Imported here: the tasks import the modules that call this one
+    from eventuais.crm.tasks import rebuild_segment_bitmaps
+
+    # Bitmaps already flagged have a rebuild queued
+    fresh = [
+        str(pk)
+        for pk in SegmentBitmap.objects.filter(segment_id__in=segment_ids, stale=False).values_list(
+            "segment_id",
+            flat=True,
+        )
+    ]
+    if fresh:
+        SegmentBitmap.objects.filter(segment_id__in=fresh).update(stale=True)
+        transaction.on_commit(lambda: rebuild_segment_bitmaps.delay(fresh))
+
+
+def rebuild_stale_bitmaps(segment_ids):
+    """Rebuild the stored bitmaps of ``segment_ids`` that are flagged stale; return how many were rebuilt."""
+    rebuilt = 0
+    for segment in Segment.objects.filter(pk__in=segment_ids).only("is_dynamic"):
+        # Cleared before reading the membership, so a change committed meanwhile flags it again
+        if not SegmentBitmap.objects.filter(segment=segment, stale=True).update(stale=False):
+            continue
+        try:
+            build_bitmap(segment)
+        except Exception:
+            SegmentBitmap.objects.filter(segment=segment).update(stale=True)
+            raise
+        rebuilt += 1
+    return rebuilt
+
+
+def expression_segments(expression, found=None):
+    """Return the set of segment ids ``expression`` references, checking its shape on the way."""
+    found = set() if found is None else found
+    if isinstance(expression, dict):
+        if len(expression) != 1 or next(iter(expression)) not in OPERATORS:
+            msg = f"An expression must have exactly one of {', '.join(OPERATORS)}"
+            raise SegmentExpressionError(msg)
+        operands = next(iter(expression.values()))
+        if not isinstance(operands, list) or not operands:
+            msg = "Expression operands must be a non-empty list"
+            raise SegmentExpressionError(msg)
+        for operand in operands:
+            expression_segments(operand, found)
+    else:
+        try:
+            found.add(uuid.UUID(str(expression)))
+        except ValueError:
+            msg = f"Invalid segment id: {expression}"
+            raise SegmentExpressionError(msg) from None
+
+    if len(found) > MAX_EXPRESSION_SEGMENTS:
+        msg = f"Expressions may reference at most {MAX_EXPRESSION_SEGMENTS} segments"
+        raise SegmentExpressionError(msg)
+    return found
+
+
+def evaluate(expression):
+    """Return the bitmap of the contacts selected by ``expression``."""
+    bitmaps = segment_bitmaps(expression_segments(expression))
+    return _evaluate(expression, bitmaps)
+
+
+def overlaps(segment_ids):
+    """Return each segment's size and the size of every pairwise intersection."""
+    bitmaps = segment_bitmaps(segment_ids)
+    return {
+        "segments": {str(pk): bitmap.bit_count() for pk, bitmap in bitmaps.items()},
+        "overlaps": [
+            {"segments": [str(first), str(second)], "count": (bitmaps[first] & bitmaps[second]).bit_count()}
+            for first, second in combinations(bitmaps, 2)
+        ],
+    }
+
+
+def segment_bitmaps(segment_ids):
+    """Return ``{segment_id: bitmap}``, building the bitmaps never built; stale ones are served until rebuilt."""
+    segment_ids = set(segment_ids)
+    segments = {segment.pk: segment for segment in Segment.objects.filter(pk__in=segment_ids).only("is_dynamic")}
+    if missing := segment_ids - set(segments):
+        msg = f"Unknown segments: {', '.join(sorted(str(pk) for pk in missing))}"
+        raise SegmentExpressionError(msg)
+
+    versions = dict(SegmentBitmap.objects.filter(segment_id__in=segment_ids).values_list("segment_id", "built_at"))
+    # Collected here rather than read back from ``_decoded``, which ``_remember`` may clear on the way
+    bitmaps = {pk: _decoded[pk, built_at] for pk, built_at in versions.items() if (pk, built_at) in _decoded}
+    for row in SegmentBitmap.objects.filter(segment_id__in=versions.keys() - bitmaps.keys()):
+        bitmaps[row.segment_id] = int.from_bytes(zlib.decompress(row.bitmap), "little")
+        _remember(row.segment_id, row.built_at, bitmaps[row.segment_id])
+
+    for pk in segments.keys() - bitmaps.keys():
+        bitmaps[pk] = build_bitmap(segments[pk])
+    return bitmaps
+
+
+def build_bitmap(segment):
+    """Compute and store the bitmap of one segment from its membership rows, and return it."""
+    members = member_contact_ids(segment)
+    _index_contacts(members)
+    positions = list(ContactIndex.objects.filter(contact_id__in=members).values_list("pk", flat=True))
+
+    bits = bytearray(max(positions, default=0) // 8 + 1)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    row, _ = SegmentBitmap.objects.update_or_create(
+        segment=segment,
+        defaults={"bitmap": zlib.compress(bytes(bits)), "contact_count": len(positions)},
+    )
+    bitmap = int.from_bytes(bits, "little")
+    _remember(segment.pk, row.built_at, bitmap)
+    return bitmap
+
+
+def _evaluate(expression, bitmaps):
+    if not isinstance(expression, dict):
+        return bitmaps[uuid.UUID(str(expression))]
+    ((name, operands),) = expression.items()
+    return reduce(OPERATORS[name], (_evaluate(operand, bitmaps) for operand in operands))
+
+
+def member_contact_ids(segment):
+    """The ids of a segment's contacts as a subquery over its membership rows."""
+    if segment.is_dynamic:
+        return SegmentMembership.objects.filter(segment=segment).values("contact_id")
+    return Segment.static_contacts.through.objects.filter(segment=segment).values("contact_id")
+
+
+def _index_contacts(contact_ids):
+    """Give a bitmap position to the contacts in ``contact_ids`` (a queryset) that have none yet."""
+    unindexed = Contact.objects.filter(pk__in=contact_ids, bitmap_index__isnull=True).values_list("pk", flat=True)
+    for chunk in batched(unindexed.iterator(chunk_size=INDEX_BATCH_SIZE), INDEX_BATCH_SIZE):
+        ContactIndex.objects.bulk_create([ContactIndex(contact_id=pk) for pk in chunk], ignore_conflicts=True)
+
+
+def _remember(segment_id, built_at, bitmap):
+    if len(_decoded) >= MAX_DECODED:
+        _decoded.clear()
+    _decoded[segment_id, built_at] = bitmap
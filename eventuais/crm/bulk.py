@@ -0,0 +1,155 @@
+"""Set-based bulk membership changes for campaigns and static segments.
+
+Contact ids are resolved in chunks: one query per chunk finds which ids exist
+and which are already members, one ``bulk_create(ignore_conflicts=True)``
+inserts the rest, and removals are a single filtered ``DELETE`` per chunk.
+
+Ids come either from a ``contact_ids`` list in a JSON body or, for large lists,
+from an NDJSON body streamed line by line (``Content-Type: application/x-ndjson``)
+where each line is an id string or an object with a ``contact_id`` key.
+"""
+
+import json
+import uuid
+from itertools import batched
+
+from django.db.models import Exists
+from django.db.models import OuterRef
+
+from eventuais.crm.bitmaps import mark_bitmaps_stale
+from eventuais.crm.models import CampaignRecipient
+from eventuais.crm.models import Contact
+from eventuais.crm.models import Segment
+
+from .reports import bump_data_version
+from .suppression import suppressed
+
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+CHUNK_SIZE = 1000
+
+
+def is_ndjson(request):
+    return request.content_type.split(";")[0].strip() in NDJSON_CONTENT_TYPES
+
+
+def iter_contact_ids(request):
+    """Yield the contact ids sent with a request without loading an NDJSON body in memory."""
+    if not is_ndjson(request):
+        yield from request.data.get("contact_ids", [])
+        return
+
+    for raw_line in request.stream or []:
+        line = raw_line.strip()
+        if not line:
+            continue
+        value = json.loads(line)
+        yield value.get("contact_id") if isinstance(value, dict) else value
+
+
+def add_campaign_recipients(campaign, contact_ids):
+    """Add contacts to a campaign as pending recipients and return added/existing/suppressed/missing counts.
+
+    Contacts whose address is on the suppression list are not added.
+    """
+    is_recipient = CampaignRecipient.objects.filter(campaign=campaign, contact_id=OuterRef("pk"))
+    counts = {"added": 0, "existing": 0, "suppressed": 0, "missing": 0}
+
+    for ids, invalid in _uuid_chunks(contact_ids):
+        found = {
+            pk: (is_member, email)
+            for pk, is_member, email in Contact.objects.filter(pk__in=ids)
+            .annotate(is_member=Exists(is_recipient))
+            .values_list("pk", "is_member", "email")
+        }
+        blocked = suppressed({email for is_member, email in found.values() if not is_member})
+        new_ids = [pk for pk, (is_member, email) in found.items() if not is_member and email not in blocked]
+        CampaignRecipient.objects.bulk_create(
+            [CampaignRecipient(campaign=campaign, contact_id=pk) for pk in new_ids],
+            ignore_conflicts=True,
+        )
+        existing = sum(is_member for is_member, _ in found.values())
+        counts["added"] += len(new_ids)
+        counts["existing"] += existing
+        counts["suppressed"] += len(found) - existing - len(new_ids)
+        counts["missing"] += len(ids) - len(found) + invalid
+
+    bump_data_version(CampaignRecipient)
+    return counts
+
+
+def remove_campaign_recipients(campaign, contact_ids):
+    """Remove contacts that are still pending recipients of a campaign.
+
+    Recipients that were already sent to are kept so their engagement history
+    survives; they are reported as missing along with unknown ids.
+    """
+    counts = {"removed": 0, "missing": 0}
+
+    for ids, invalid in _uuid_chunks(contact_ids):
+        removed, _ = CampaignRecipient.objects.filter(
+            campaign=campaign,
+            contact_id__in=ids,
+            status=CampaignRecipient.RecipientStatus.PENDING,
+        ).delete()
+        counts["removed"] += removed
+        counts["missing"] += len(ids) - removed + invalid
+
+    bump_data_version(CampaignRecipient)
+    return counts
+
+
+def add_segment_contacts(segment, contact_ids):
+    """Add contacts to a static segment and return added/existing/missing counts."""
+    through = Segment.static_contacts.through
+    is_member = through.objects.filter(segment=segment, contact_id=OuterRef("pk"))
+    counts = {"added": 0, "existing": 0, "missing": 0}
+
+    for ids, invalid in _uuid_chunks(contact_ids):
+        found = dict(
+            Contact.objects.filter(pk__in=ids).annotate(is_member=Exists(is_member)).values_list("pk", "is_member"),
+        )
+        new_ids = [pk for pk, member in found.items() if not member]
+        through.objects.bulk_create(
+            [through(segment=segment, contact_id=pk) for pk in new_ids],
+            ignore_conflicts=True,
+        )
+        counts["added"] += len(new_ids)
+        counts["existing"] += len(found) - len(new_ids)
+        counts["missing"] += len(ids) - len(found) + invalid
+
+    _update_static_count(segment)
+    return counts
+
+
+def remove_segment_contacts(segment, contact_ids):
+    """Remove contacts from a static segment and return removed/missing counts."""
+    through = Segment.static_contacts.through
+    counts = {"removed": 0, "missing": 0}
+
+    for ids, invalid in _uuid_chunks(contact_ids):
+        removed, _ = through.objects.filter(segment=segment, contact_id__in=ids).delete()
+        counts["removed"] += removed
+        counts["missing"] += len(ids) - removed + invalid
+
+    _update_static_count(segment)
+    return counts
+
+
+def _uuid_chunks(contact_ids):
+    """Yield ``(ids, invalid_count)`` for each chunk, with ids deduplicated and parsed as UUIDs."""
+    for chunk in batched(contact_ids, CHUNK_SIZE):
+        ids = set()
+        invalid = 0
+        for value in chunk:
+            try:
+                ids.add(uuid.UUID(str(value)))
+            except ValueError:
+                invalid += 1
+        yield ids, invalid
+
+
+def _update_static_count(segment):
+    segment.contact_count = segment.static_contacts.count()
+    Segment.objects.filter(pk=segment.pk).update(contact_count=segment.contact_count)
+    mark_bitmaps_stale([segment.pk])
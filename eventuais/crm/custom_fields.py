@@ -0,0 +1,173 @@
+"""Custom field values inlined into entity responses.
+
+With ``?custom_fields=all`` (or a comma-separated list of field names) the
+contact, account and opportunity endpoints add a ``custom_fields`` object to
+every row. A page costs one extra query: the values of all its rows are read
+at once through the ``(content_type, object_id)`` index, and every field
+defined for the model is present, holding its default when a row has no
+value.
+
+Field definitions rarely change, so each process keeps them per content type
+under a version stamp held in the cache. Saving or deleting a custom field
+replaces the stamp of its content type, and processes reload the definitions
+on their next request.
+
+The same endpoints filter on custom fields with ``cf_<name>[__<lookup>]=``,
+compared on the typed columns of :mod:`eventuais.crm.typed_values`.
+"""
+
+import uuid
+from collections import defaultdict
+from decimal import InvalidOperation
+from itertools import batched
+from typing import NamedTuple
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import CustomField
+from .models import CustomFieldValue
+from .typed_values import COLUMN_LOOKUPS
+from .typed_values import PARSERS
+from .typed_values import TYPED_COLUMNS
+
+# Query parameter selecting the inlined fields, and the value that selects all of them
+CUSTOM_FIELDS_PARAM = "custom_fields"
+ALL_FIELDS = "all"
+
+# Prefix of the list query parameters filtering on custom fields, as in ``cf_revenue__gte=1000``
+FILTER_PREFIX = "cf_"
+
+# Values re-parsed per UPDATE when a field changes type
+RETYPE_BATCH_SIZE = 2000
+
+# Content type versions whose definitions are kept per process
+MAX_DEFINITIONS = 64
+
+_definitions = {}
+
+
+def requested_fields(request):
+    """The field names asked for with ``?custom_fields=``, ``ALL_FIELDS``, or ``None`` when not asked."""
+    requested = request.query_params.get(CUSTOM_FIELDS_PARAM, "").strip()
+    if not requested:
+        return None
+    if requested == ALL_FIELDS:
+        return ALL_FIELDS
+    return {name.strip() for name in requested.split(",") if name.strip()}
+
+
+class FieldDefinition(NamedTuple):
+    name: str
+    field_type: str
+    default: str | None
+
+
+class CustomFieldFilterError(ValueError):
+    """Raised when a ``cf_`` filter names an unknown field, an unsupported lookup or an unparseable value."""
+
+
+def field_definitions(content_type_id):
+    """Return ``{field_id: FieldDefinition}`` for a content type, read from the database once per version."""
+    key = (content_type_id, _version(content_type_id))
+    definitions = _definitions.get(key)
+    if definitions is None:
+        if len(_definitions) >= MAX_DEFINITIONS:
+            _definitions.clear()
+        rows = CustomField.objects.filter(content_type_id=content_type_id).values_list(
+            "pk",
+            "name",
+            "field_type",
+            "default_value",
+        )
+        definitions = _definitions[key] = {
+            pk: FieldDefinition(name, field_type, default or None) for pk, name, field_type, default in rows
+        }
+    return definitions
+
+
+def forget_definitions(content_type_id):
+    """Retire the cached definitions of a content type once the current transaction commits."""
+    transaction.on_commit(lambda: cache.set(_version_key(content_type_id), uuid.uuid4().hex, None))
+
+
+def custom_field_values(model, object_ids, names=ALL_FIELDS):
+    """Return ``{object_id: {field name: value}}`` for ``object_ids`` of ``model`` in one query."""
+    content_type_id = ContentType.objects.get_for_model(model).pk
+    definitions = {
+        pk: definition
+        for pk, definition in field_definitions(content_type_id).items()
+        if names == ALL_FIELDS or definition.name in names
+    }
+    values = defaultdict(dict)
+    if definitions and object_ids:
+        rows = CustomFieldValue.objects.filter(
+            content_type_id=content_type_id,
+            object_id__in=object_ids,
+            field_id__in=definitions,
+        ).values_list("object_id", "field_id", "value")
+        for object_id, field_id, value in rows:
+            values[object_id][field_id] = value
+
+    defaults = {pk: definition.default for pk, definition in definitions.items()}
+    return {
+        object_id: {definitions[pk].name: value for pk, value in (defaults | values[object_id]).items()}
+        for object_id in object_ids
+    }
+
+
+def custom_field_filter(model, params):
+    """Return a ``Q`` selecting the ``model`` rows that match every ``cf_<name>[__<lookup>]`` item of ``params``.
+
+    Each item becomes ``pk IN (SELECT object_id ... WHERE field_id = ... AND
+    <typed column> <op> <value>)``, a range scan of the field's partial index.
+    """
+    fields = {}
+    condition = Q()
+    for param, text in params.items():
+        if not param.startswith(FILTER_PREFIX):
+            continue
+        if not fields:
+            content_type_id = ContentType.objects.get_for_model(model).pk
+            fields = {
+                definition.name: (pk, definition) for pk, definition in field_definitions(content_type_id).items()
+            }
+        name, _, lookup = param.removeprefix(FILTER_PREFIX).partition("__")
+        if name not in fields:
+            msg = f"Unknown custom field: {name}"
+            raise CustomFieldFilterError(msg)
+
+        field_id, definition = fields[name]
+        column = TYPED_COLUMNS.get(definition.field_type, "value")
+        lookup = lookup or "exact"
+        if lookup not in COLUMN_LOOKUPS[column]:
+            msg = f"Custom field {name} supports {', '.join(sorted(COLUMN_LOOKUPS[column]))}, not {lookup}"
+            raise CustomFieldFilterError(msg)
+        try:
+            value = PARSERS[column](text.strip()) if column in PARSERS else text
+        except (ValueError, InvalidOperation) as e:
+            msg = f"Invalid value for custom field {name}: {text}"
+            raise CustomFieldFilterError(msg) from e
+
+        matches = CustomFieldValue.objects.filter(field_id=field_id, **{f"{column}__{lookup}": value})
+        condition &= Q(pk__in=matches.values("object_id"))
+    return condition
+
+
+def retype_values(field):
+    """Re-parse the stored values of ``field`` into its typed columns, after its type changed."""
+    values = field.values.only("pk", "value").order_by("pk")
+    for chunk in batched(values.iterator(chunk_size=RETYPE_BATCH_SIZE), RETYPE_BATCH_SIZE):
+        for value in chunk:
+            value.set_typed_value(field.field_type)
+        CustomFieldValue.objects.bulk_update(chunk, list(PARSERS))
+
+
+def _version(content_type_id):
+    return cache.get_or_set(_version_key(content_type_id), uuid.uuid4().hex, None)
+
+
+def _version_key(content_type_id):
+    return f"crm:custom-fields-version:{content_type_id}"
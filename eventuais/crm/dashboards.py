@@ -0,0 +1,99 @@
+"""Render every tile of a dashboard in one request.
+
+Items whose reports compile to the same configuration share one execution.
+Cached results are read for all of them in one cache round trip; only the
+reports missing from the cache run, concurrently on a bounded thread pool,
+each thread with its own database connection, so a dashboard takes about as
+long as its slowest uncached tile.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+from .reports import ReportConfigError
+from .reports import cached_results
+from .reports import report_cache_key
+from .reports import run_report
+
+
+def render_dashboard(dashboard):
+    """Run the reports of all ``dashboard`` items and return the combined payload."""
+    started = time.perf_counter()
+    items = list(dashboard.items.select_related("report").order_by("position_y", "position_x"))
+
+    item_keys = {}
+    reports = {}
+    for item in items:
+        try:
+            key = report_cache_key(item.report)
+        except ReportConfigError:
+            # Reports that do not compile run alone so their error is reported per item
+            key = f"invalid:{item.report_id}"
+        item_keys[item.pk] = key
+        reports.setdefault(key, item.report)
+
+    outcomes = _run_all(reports)
+
+    rendered = []
+    seen = set()
+    for item in items:
+        key = item_keys[item.pk]
+        rendered.append(
+            {
+                "id": str(item.pk),
+                "report_id": str(item.report_id),
+                "title": item.custom_title or item.report.name,
+                "position_x": item.position_x,
+                "position_y": item.position_y,
+                "width": item.width,
+                "height": item.height,
+                # Later items with the same report configuration reuse the first execution
+                "shared": key in seen,
+                **outcomes[key],
+            },
+        )
+        seen.add(key)
+
+    return {
+        "dashboard_id": str(dashboard.pk),
+        "name": dashboard.name,
+        "elapsed_ms": _elapsed_ms(started),
+        "items": rendered,
+    }
+
+
+def _run_all(reports):
+    started = time.perf_counter()
+    cached = cached_results(list(reports))
+    elapsed = _elapsed_ms(started)
+    outcomes = {key: {"results": results, "elapsed_ms": elapsed} for key, results in cached.items()}
+    missing = {key: report for key, report in reports.items() if key not in outcomes}
+
+    workers = min(settings.DASHBOARD_RENDER_WORKERS, len(missing))
+    if workers <= 1:
+        return {**outcomes, **{key: _timed_run(report) for key, report in missing.items()}}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dashboard-render") as pool:
+        futures = {key: pool.submit(_timed_run, report, in_thread=True) for key, report in missing.items()}
+        return {**outcomes, **{key: future.result() for key, future in futures.items()}}
+
+
+def _timed_run(report, *, in_thread=False):
+    started = time.perf_counter()
+    try:
+        outcome = {"results": run_report(report)}
+    except ReportConfigError as e:
+        outcome = {"error": str(e)}
+    finally:
+        if in_thread:
+            # Connections are per thread; do not leave one open per pool worker
+            connections.close_all()
+    outcome["elapsed_ms"] = _elapsed_ms(started)
+    return outcome
+
+
+def _elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 2)
@@ -0,0 +1,132 @@
+"""Drip sequences: the emails of a campaign after the first one.
+
+Each recipient waiting for a later step has one ``DripStep`` row holding the
+email and the time it is due: the previous send plus the step's
+``delay_days``. Rows are upserted when a recipient gets an email and removed
+after the last step, so the table only ever holds pending work and finding
+what is due is a range scan on the ``due_at`` index.
+
+Workers claim due rows with ``SELECT ... FOR UPDATE SKIP LOCKED`` in batches,
+so any number of them drain the queue in parallel without picking the same
+row twice. A batch is sent over one connection and its rows advanced to the
+next step in the same transaction. A step whose email fails to render or is
+refused stays on the same email, due again ``DRIP_RETRY_MINUTES`` later, and
+leaves the sequence after ``DRIP_MAX_ATTEMPTS`` failures, so a failing step
+never stays at the head of the queue blocking the others.
+"""
+
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .engagement import record_transitions
+from .models import Campaign
+from .models import CampaignRecipient
+from .models import DripStep
+from .models import MarketingEmail
+from .personalization import deliver
+from .reports import bump_data_version
+from .suppression import SUPPRESSING_STATUSES
+from .suppression import suppressed
+
+# Drips of paused or cancelled campaigns wait
+RUNNING_STATUSES = [Campaign.CampaignStatus.ACTIVE, Campaign.CampaignStatus.COMPLETED]
+
+# Recipients in these states get no further emails
+STOPPED_STATUSES = [*SUPPRESSING_STATUSES, CampaignRecipient.RecipientStatus.SUPPRESSED]
+
+
+def schedule_next_step(email, recipient_ids, sent_at):
+    """Queue the step after ``email`` for recipients who just got it, or drop them after the last step."""
+    if not recipient_ids:
+        return 0
+    next_email = (
+        MarketingEmail.objects.filter(campaign_id=email.campaign_id, sequence_order__gt=email.sequence_order)
+        .order_by("sequence_order")
+        .first()
+    )
+    if next_email is None:
+        DripStep.objects.filter(recipient_id__in=recipient_ids).delete()
+        return 0
+
+    due_at = sent_at + datetime.timedelta(days=next_email.delay_days)
+    DripStep.objects.bulk_create(
+        [DripStep(recipient_id=pk, email=next_email, due_at=due_at) for pk in recipient_ids],
+        update_conflicts=True,
+        unique_fields=["recipient"],
+        update_fields=["email", "due_at", "attempts", "updated_at"],
+    )
+    return len(recipient_ids)
+
+
+def due_steps(now=None):
+    return DripStep.objects.filter(
+        due_at__lte=now or timezone.now(),
+        recipient__campaign__status__in=RUNNING_STATUSES,
+    )
+
+
+def send_due_steps(batch_size):
+    """Claim up to ``batch_size`` due steps, send them and advance them; return how many were claimed."""
+    now = timezone.now()
+    with transaction.atomic():
+        steps = list(
+            due_steps(now)
+            # Lock only the queue rows, not the joined recipients and campaigns
+            .select_for_update(skip_locked=True, of=("self",))
+            .select_related("email__campaign", "recipient")
+            .order_by("due_at")[:batch_size],
+        )
+        if not steps:
+            return 0
+
+        addresses = dict(
+            CampaignRecipient.objects.filter(pk__in=[step.pk for step in steps], contact__email_opt_out=False)
+            .exclude(contact__email="")
+            .exclude(status__in=STOPPED_STATUSES)
+            .values_list("pk", "contact__email"),
+        )
+        blocked = suppressed(set(addresses.values()))
+        mailable = {pk for pk, address in addresses.items() if address not in blocked}
+        by_email = defaultdict(list)
+        for step in steps:
+            if step.pk in mailable:
+                by_email[step.email].append((step.pk, step.recipient.contact_id))
+
+        sent, failed = {}, []
+        for email, recipients in by_email.items():
+            sent[email], email_failed = deliver(email.campaign, email, recipients)
+            failed.extend(email_failed)
+
+        for email, recipient_ids in sent.items():
+            schedule_next_step(email, recipient_ids, now)
+        retry_failed_steps(failed, now)
+        # Stopped and suppressed recipients and vanished contacts leave the sequence
+        done = {pk for recipient_ids in sent.values() for pk in recipient_ids}.union(failed)
+        DripStep.objects.filter(pk__in=[step.pk for step in steps if step.pk not in done]).delete()
+
+        per_campaign = defaultdict(int)
+        for email, recipient_ids in sent.items():
+            per_campaign[email.campaign_id] += len(recipient_ids)
+        for campaign_id, count in per_campaign.items():
+            Campaign.objects.filter(pk=campaign_id).update(sent_count=F("sent_count") + count, updated_at=now)
+        record_transitions(
+            {(email.campaign_id, email.pk, "sent", now): len(recipient_ids) for email, recipient_ids in sent.items()},
+        )
+        bump_data_version(Campaign)
+    return len(steps)
+
+
+def retry_failed_steps(recipient_ids, now):
+    """Push the failed steps of ``recipient_ids`` back by ``DRIP_RETRY_MINUTES``, dropping those out of attempts."""
+    failed = DripStep.objects.filter(pk__in=recipient_ids)
+    failed.filter(attempts__gte=settings.DRIP_MAX_ATTEMPTS - 1).delete()
+    failed.update(
+        attempts=F("attempts") + 1,
+        due_at=now + datetime.timedelta(minutes=settings.DRIP_RETRY_MINUTES),
+        updated_at=now,
+    )
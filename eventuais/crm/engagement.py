@@ -0,0 +1,119 @@
+"""Minute/hour/day rollups of campaign engagement.
+
+``record_transitions`` is called wherever recipients change state in bulk
+(campaign batches for ``sent``, the tracking flush for ``opened`` and
+``clicked``). It adds the counts to the minute, hour and day buckets of each
+``(campaign, email)`` with one ``INSERT ... ON CONFLICT DO UPDATE`` that sums
+into existing rows, so concurrent writers never lose increments.
+
+``campaign_engagement`` answers reporting from those rows only: the funnel
+from the day buckets and a time series at the requested granularity.
+"""
+
+from collections import defaultdict
+from datetime import UTC
+
+from django.db import connection
+from django.db.models import Sum
+
+from .models import CampaignEngagement
+
+METRICS = ["sent", "opened", "clicked"]
+
+TRUNCATE = {
+    CampaignEngagement.Granularity.MINUTE: {"second": 0, "microsecond": 0},
+    CampaignEngagement.Granularity.HOUR: {"minute": 0, "second": 0, "microsecond": 0},
+    CampaignEngagement.Granularity.DAY: {"hour": 0, "minute": 0, "second": 0, "microsecond": 0},
+}
+
+# Series longer than this many buckets must be asked for at a coarser granularity
+MAX_SERIES_BUCKETS = 2000
+
+
+def bucket_start(moment, granularity):
+    return moment.astimezone(UTC).replace(**TRUNCATE[granularity])
+
+
+def record_transitions(transitions):
+    """Add ``{(campaign_id, email_id, metric, moment): count}`` to the rollups of every granularity."""
+    rows = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+    for (campaign_id, email_id, metric, moment), count in transitions.items():
+        if not count or email_id is None:
+            continue
+        for granularity in CampaignEngagement.Granularity.values:
+            rows[str(campaign_id), str(email_id), granularity, bucket_start(moment, granularity)][metric] += count
+    if not rows:
+        return 0
+
+    table = connection.ops.quote_name(CampaignEngagement._meta.db_table)  # noqa: SLF001
+    columns = ["campaign_id", "email_id", "granularity", "bucket", *METRICS]
+    placeholders = f"({', '.join(['%s'] * len(columns))})"
+    values = ", ".join([placeholders] * len(rows))
+    increments = ", ".join(f"{metric} = {table}.{metric} + EXCLUDED.{metric}" for metric in METRICS)
+    # A stable row order keeps concurrent upserts from deadlocking on each other
+    params = [
+        value for key, counts in sorted(rows.items()) for value in (*key, *(counts[metric] for metric in METRICS))
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES {values} "  # noqa: S608
+            f"ON CONFLICT (campaign_id, granularity, bucket, email_id) DO UPDATE SET {increments}",
+            params,
+        )
+    return len(rows)
+
+
+def campaign_engagement(campaign, granularity, since=None, until=None, email_id=None):
+    """Return the funnel, the per-email breakdown and the time series of a campaign from its rollups."""
+    rollups = CampaignEngagement.objects.filter(campaign=campaign)
+    if email_id is not None:
+        rollups = rollups.filter(email_id=email_id)
+
+    # Day buckets hold the same totals as the finer ones in far fewer rows
+    totals = rollups.filter(granularity=CampaignEngagement.Granularity.DAY)
+    if since is not None:
+        totals = totals.filter(bucket__gte=bucket_start(since, CampaignEngagement.Granularity.DAY))
+    if until is not None:
+        totals = totals.filter(bucket__lte=until)
+    by_email = list(
+        totals.values("email_id", "email__name", "email__sequence_order")
+        .annotate(**{metric: Sum(metric) for metric in METRICS})
+        .order_by("email__sequence_order"),
+    )
+
+    series = rollups.filter(granularity=granularity)
+    if since is not None:
+        series = series.filter(bucket__gte=bucket_start(since, granularity))
+    if until is not None:
+        series = series.filter(bucket__lte=until)
+    series = list(
+        series.values("bucket")
+        .annotate(**{metric: Sum(metric) for metric in METRICS})
+        .order_by("bucket")[:MAX_SERIES_BUCKETS],
+    )
+
+    funnel = {metric: sum(row[metric] for row in by_email) for metric in METRICS}
+    return {
+        "campaign_id": str(campaign.pk),
+        "granularity": granularity,
+        "funnel": {**funnel, **_rates(funnel)},
+        "emails": [
+            {
+                "email_id": str(row["email_id"]),
+                "name": row["email__name"],
+                "sequence_order": row["email__sequence_order"],
+                **{metric: row[metric] for metric in METRICS},
+                **_rates(row),
+            }
+            for row in by_email
+        ],
+        "series": series,
+    }
+
+
+def _rates(counts):
+    sent = counts["sent"]
+    return {
+        "open_rate": round(counts["opened"] / sent, 4) if sent else None,
+        "click_rate": round(counts["clicked"] / sent, 4) if sent else None,
+    }
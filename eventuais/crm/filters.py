@@ -0,0 +1,54 @@
+"""Filter backends shared by the CRM API views."""
+
+from django.contrib.postgres.search import SearchRank
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+from .custom_fields import CustomFieldFilterError
+from .custom_fields import custom_field_filter
+from .search import SEARCH_WEIGHTS
+from .search import prefix_query
+from .search import search_vector
+
+# Annotation holding the rank of full-text search hits; keyset pagination orders by it
+SEARCH_RANK = "search_rank"
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """``?search=`` over the model's indexed full-text vector, ranked by relevance.
+
+    Models without a vector in ``search.SEARCH_WEIGHTS`` fall back to the
+    view's ``search_fields`` like ``SearchFilter``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        label = queryset.model._meta.label  # noqa: SLF001
+        terms = self.get_search_terms(request)
+        if not terms or label not in SEARCH_WEIGHTS:
+            return super().filter_queryset(request, queryset, view)
+
+        query = prefix_query(terms)
+        if query is None:
+            return queryset.none()
+        vector = search_vector(label)
+        # ts_rank is a real; as double precision it survives the cursor round trip exactly
+        return (
+            queryset.alias(search_document=vector)
+            .filter(search_document=query)
+            .annotate(
+                **{SEARCH_RANK: Cast(SearchRank(vector, query), FloatField())},
+            )
+        )
+
+
+class CustomFieldFilter(filters.BaseFilterBackend):
+    """``?cf_<name>[__<lookup>]=`` filters on the model's custom fields (see ``custom_fields``)."""
+
+    def filter_queryset(self, request, queryset, view):
+        try:
+            condition = custom_field_filter(queryset.model, request.query_params)
+        except CustomFieldFilterError as e:
+            raise ValidationError({"error": str(e)}) from e
+        return queryset.filter(condition) if condition else queryset
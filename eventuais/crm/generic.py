@@ -0,0 +1,48 @@
+"""Batch loading of generic relation targets.
+
+Activities, custom field values and social profiles point at their subject
+through a ``GenericForeignKey``. Reading ``content_object`` row by row costs
+one query per row, and ``content_type`` one more unless it was joined in.
+
+:func:`load_generic_targets` resolves a whole page instead: rows are grouped
+by content type and each target model is read with one ``in_bulk``, content
+types come from the process-wide ``ContentType`` cache, and both are stored
+in the rows' relation caches, so later attribute access runs no query.
+Targets already in hand, such as the parent of a nested ``GenericRelation``
+list, are used as they are.
+"""
+
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+
+
+def load_generic_targets(rows, known=(), field="content_object"):
+    """Fill the content type and ``field`` target caches of ``rows``; return the rows as a list.
+
+    ``known`` objects are matched to rows before anything is queried; rows
+    whose target was deleted get ``None``.
+    """
+    rows = list(rows)
+    if not rows:
+        return rows
+    relation = rows[0]._meta.get_field(field)  # noqa: SLF001
+    targets = {(ContentType.objects.get_for_model(obj).pk, obj.pk): obj for obj in known}
+
+    wanted = defaultdict(set)
+    for row in rows:
+        content_type_id = getattr(row, f"{relation.ct_field}_id")
+        setattr(row, relation.ct_field, ContentType.objects.get_for_id(content_type_id))
+        if not relation.is_cached(row) and (content_type_id, getattr(row, relation.fk_field)) not in targets:
+            wanted[content_type_id].add(getattr(row, relation.fk_field))
+
+    for content_type_id, ids in wanted.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        found = model._base_manager.in_bulk(ids) if model is not None else {}  # noqa: SLF001
+        targets.update(((content_type_id, pk), obj) for pk, obj in found.items())
+
+    for row in rows:
+        if not relation.is_cached(row):
+            key = (getattr(row, f"{relation.ct_field}_id"), getattr(row, relation.fk_field))
+            relation.set_cached_value(row, targets.get(key))
+    return rows
@@ -0,0 +1,294 @@
+"""Bulk import of contacts and accounts from CSV/NDJSON files.
+
+Rows are validated and written in chunks. Each chunk costs a fixed number of
+queries however many rows it holds: one lookup for duplicate emails, one per
+referenced foreign key, a ``bulk_create``, a partial MPTT rebuild of the
+trees that received children and a rebuild of the account rollups of the
+trees the new rows landed in.
+
+Going through ``save()`` would run an MPTT insert per row, and each insert
+shifts ``lft``/``rght`` (or ``tree_id`` for roots, because of
+``order_insertion_by``) across the table. Instead, new roots get fresh tree
+ids appended after the current maximum, and new children get placeholder tree
+fields that ``partial_rebuild`` fixes once per affected tree and chunk.
+Appended roots are not re-sorted into ``order_insertion_by`` order among the
+existing trees; nothing reads the relative order of root trees. The maximum
+is read under ``lock_tree_ids``, which saves of new or re-parented nodes also
+take, so concurrent imports and saves never hand out the same tree id.
+
+Each chunk's rows and the job's progress (``processed_rows``, the number of
+file rows done) commit together. ``run_import`` stops after the chunk that
+passes its deadline; the Celery task then queues another run, which skips the
+rows already done, so a large file is imported by a chain of short tasks well
+within the Celery time limits, and a run whose worker died resumes after the
+last committed chunk.
+
+Rows are deduplicated on email, ignoring case, against the database and
+within the file; the email is stored as written. The database side compares
+``UPPER(email)``, the expression of the email prefix index. Rows without an
+email are always imported. A ``parent_id`` must point at a row that exists
+when its chunk is written, so parents go in an earlier chunk or an earlier
+import. Lines that are not valid UTF-8, JSON or CSV are reported as row
+errors like rows that fail validation.
+"""
+
+import codecs
+import csv
+import json
+import time
+from itertools import batched
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from .membership import refresh_contacts
+from .models import Account
+from .models import Contact
+from .models import ImportJob
+from .models import lock_tree_ids
+from .reports import bump_data_version
+from .rollups import rebuild_trees
+from .serializers import AccountImportSerializer
+from .serializers import ContactImportSerializer
+
+CHUNK_SIZE = 5000
+
+# Jobs in these states can be (re)started from their progress
+RESUMABLE_STATUSES = [ImportJob.JobStatus.PENDING, ImportJob.JobStatus.RUNNING]
+
+# Keep the stored error list small, the counter has the full number
+MAX_STORED_ERRORS = 100
+
+IMPORTERS = {
+    ImportJob.Kind.CONTACTS: {
+        "model": Contact,
+        "serializer": ContactImportSerializer,
+        "relations": {"account_id": Account, "parent_id": Contact},
+    },
+    ImportJob.Kind.ACCOUNTS: {
+        "model": Account,
+        "serializer": AccountImportSerializer,
+        "relations": {"parent_id": Account},
+    },
+}
+
+
+def iter_file_rows(job):
+    """Yield ``(row, error)`` for each row of an import file: the row as a dict, or why it could not be read.
+
+    Blank cells and lines are skipped.
+    """
+    undecodable = set()
+    with job.file.open("rb") as raw:
+        lines = _decode_lines(raw, undecodable)
+        if job.file_format == ImportJob.FileFormat.CSV:
+            yield from _csv_rows(lines, undecodable)
+        else:
+            yield from _ndjson_rows(lines, undecodable)
+
+
+def _decode_lines(raw, undecodable):
+    """Yield the lines of ``raw`` as text; a line that is not UTF-8 is decoded lossily and its number recorded."""
+    for number, line in enumerate(raw, start=1):
+        if number == 1:
+            line = line.removeprefix(codecs.BOM_UTF8)  # noqa: PLW2901
+        try:
+            yield line.decode("utf-8")
+        except UnicodeDecodeError:
+            undecodable.add(number)
+            yield line.decode("utf-8", errors="replace")
+
+
+def _csv_rows(lines, undecodable):
+    reader = csv.DictReader(lines)
+    read = 1
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield None, f"Line {reader.line_num} is not valid CSV: {e}"
+        else:
+            bad = sorted(undecodable.intersection(range(read + 1, reader.line_num + 1)))
+            if bad:
+                yield None, f"Line {bad[0]} is not valid UTF-8"
+            else:
+                yield {key.strip(): value for key, value in row.items() if key and value not in ("", None)}, None
+        read = reader.line_num
+
+
+def _ndjson_rows(lines, undecodable):
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        if number in undecodable:
+            yield None, f"Line {number} is not valid UTF-8"
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield None, f"Line {number} is not valid JSON: {e}"
+            continue
+        if isinstance(row, dict):
+            yield row, None
+        else:
+            yield None, f"Line {number} is not a JSON object"
+
+
+def run_import(job, deadline=None):
+    """Import the rows of ``job``'s file after the ones already processed, chunk by chunk.
+
+    Return the number of created rows once the whole file is done, or ``None``
+    when the ``time.monotonic()`` ``deadline`` passed first and rows are left.
+    """
+    importer = IMPORTERS[job.kind]
+    # Earlier chunks are committed, so the database check catches their emails
+    seen_emails = set()
+    try:
+        job.status = ImportJob.JobStatus.RUNNING
+        update_fields = ["status", "updated_at"]
+        if job.total_rows is None:
+            job.total_rows = sum(1 for _ in iter_file_rows(job))
+            update_fields.append("total_rows")
+        job.save(update_fields=update_fields)
+
+        for chunk in batched(islice(iter_file_rows(job), job.processed_rows, None), CHUNK_SIZE):
+            with transaction.atomic():
+                counts = import_chunk(job, importer, chunk, first_row=job.processed_rows + 1, seen_emails=seen_emails)
+                _record_progress(job, len(chunk), counts)
+            if deadline is not None and time.monotonic() >= deadline and job.processed_rows < job.total_rows:
+                return None
+    except Exception:
+        _finish(job, ImportJob.JobStatus.FAILED)
+        raise
+
+    _finish(job, ImportJob.JobStatus.COMPLETED)
+    return job.created_count
+
+
+def import_chunk(job, importer, rows, *, first_row, seen_emails):
+    """Validate and insert one chunk of rows and return its created/duplicate/error counts.
+
+    Runs in the caller's transaction, which also records the chunk's progress.
+    """
+    model = importer["model"]
+    valid, errors = _validate_rows(importer, rows, first_row)
+    for _, data in valid:
+        if data.get("email"):
+            data["email"] = data["email"].strip()
+    existing = set(
+        model.objects.annotate(email_key=Upper("email"))
+        .filter(email_key__in={data["email"].upper() for _, data in valid if data.get("email")})
+        .values_list("email_key", flat=True),
+    )
+
+    known = {
+        field: set(
+            related.objects.filter(pk__in={data[field] for _, data in valid if data.get(field)}).values_list(
+                "pk", flat=True
+            )
+        )
+        for field, related in importer["relations"].items()
+    }
+
+    duplicates = 0
+    accepted = []
+    for number, data in valid:
+        email = (data.get("email") or "").upper()
+        if email and (email in existing or email in seen_emails):
+            duplicates += 1
+            continue
+        missing = [field for field in known if data.get(field) and data[field] not in known[field]]
+        if missing:
+            errors.append({"row": number, "errors": {field: ["Does not exist."] for field in missing}})
+            continue
+        if email:
+            seen_emails.add(email)
+        accepted.append(model(**data, created_by=job.created_by))
+
+    created = _bulk_create_nodes(model, accepted)
+    # bulk_create sends no post_save, so retire cached reports and roll the new rows up here
+    bump_data_version(model)
+    rebuild_trees(_rollup_trees(model, created))
+
+    if model is Contact and created:
+        refresh_contacts([contact.pk for contact in created])
+
+    return {"created": len(created), "duplicates": duplicates, "errors": errors}
+
+
+def _validate_rows(importer, rows, first_row):
+    """Return ``(valid, errors)``: ``(row number, validated data)`` pairs and the errors of the other rows."""
+    valid = []
+    errors = []
+    for number, (row, unreadable) in enumerate(rows, start=first_row):
+        if unreadable:
+            errors.append({"row": number, "errors": {"non_field_errors": [unreadable]}})
+            continue
+        serializer = importer["serializer"](data=row)
+        if serializer.is_valid():
+            valid.append((number, serializer.validated_data))
+        else:
+            errors.append({"row": number, "errors": serializer.errors})
+    return valid, errors
+
+
+def _bulk_create_nodes(model, nodes):
+    """Insert MPTT nodes with one ``bulk_create`` and rebuild only the trees that got children."""
+    manager = model._tree_manager  # noqa: SLF001
+    opts = model._mptt_meta  # noqa: SLF001
+    parent_ids = {node.parent_id for node in nodes if node.parent_id}
+    parents = {
+        parent.pk: parent
+        for parent in model.objects.filter(pk__in=parent_ids).only("pk", opts.tree_id_attr, opts.level_attr)
+    }
+
+    lock_tree_ids(model)
+    next_tree_id = (manager.aggregate(top=Max(opts.tree_id_attr))["top"] or 0) + 1
+    affected_trees = set()
+    for node in nodes:
+        parent = parents.get(node.parent_id)
+        if parent is None:
+            tree_id, level = next_tree_id, 0
+            next_tree_id += 1
+        else:
+            tree_id, level = getattr(parent, opts.tree_id_attr), getattr(parent, opts.level_attr) + 1
+            affected_trees.add(tree_id)
+        setattr(node, opts.tree_id_attr, tree_id)
+        setattr(node, opts.level_attr, level)
+        setattr(node, opts.left_attr, 1)
+        setattr(node, opts.right_attr, 2)
+
+    created = model.objects.bulk_create(nodes, batch_size=1000)
+    for tree_id in affected_trees:
+        manager.partial_rebuild(tree_id)
+    return created
+
+
+def _rollup_trees(model, created):
+    """The account trees whose rollups the created accounts or contacts change."""
+    if model is Account:
+        return {account.tree_id for account in created}
+    account_ids = {contact.account_id for contact in created if contact.account_id}
+    return Account.objects.filter(pk__in=account_ids).values_list("tree_id", flat=True) if account_ids else ()
+
+
+def _record_progress(job, processed, counts):
+    job.processed_rows += processed
+    job.created_count += counts["created"]
+    job.duplicate_count += counts["duplicates"]
+    job.error_count += len(counts["errors"])
+    job.errors += counts["errors"][: max(MAX_STORED_ERRORS - len(job.errors), 0)]
+    job.save(
+        update_fields=["processed_rows", "created_count", "duplicate_count", "error_count", "errors", "updated_at"],
+    )
+
+
+def _finish(job, status):
+    job.status = status
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "finished_at", "updated_at"])
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.template import Context
+from django.template import Template
+from django.utils import timezone
+
+from eventuais.crm.models import MarketingEmail
+from eventuais.crm.personalization import email_sources
+from eventuais.crm.personalization import render_emails
+
+SUBJECT = "{{ first_name }}, news for {{ account.name }}"
+HTML = """
+<html><body>
+<p>Hello {{ first_name }} {{ last_name }},</p>
+{% if custom_fields.plan %}<p>Your {{ custom_fields.plan }} plan renews soon.</p>{% endif %}
+{% for i in items %}<p>Offer {{ forloop.counter }} for {{ contact.city|default:"you" }}</p>{% endfor %}
+<p>The {{ campaign.name }} team</p>
+</body></html>
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure personalized email renders per second: parsing per email, compiled once, compiled on a pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=20000, help="Emails to render per run")
+        parser.add_argument("--processes", type=int, default=4, help="Process pool size for the pool run")
+
+    def handle(self, *args, count, processes, **options):
+        email = MarketingEmail(subject=SUBJECT, html_content=HTML, updated_at=timezone.now())
+        contexts = [
+            {
+                "first_name": f"First{n}",
+                "last_name": f"Last{n}",
+                "email": f"contact{n}@example.com",
+                "contact": {"city": "Lisbon" if n % 2 else ""},
+                "account": {"name": f"Account {n % 100}"},
+                "custom_fields": {"plan": "pro"} if n % 3 else {},
+                "items": [1, 2, 3, 4, 5],
+            }
+            for n in range(count)
+        ]
+        extra = {"campaign": {"name": "Benchmark"}}
+
+        def parse_each():
+            for context in contexts:
+                for source in email_sources(email):
+                    Template(source).render(Context({**context, **extra}))
+
+        runs = [
+            ("parse per email", parse_each),
+            ("compiled, in process", lambda: render_emails(email, contexts, extra=extra, processes=1)),
+            (
+                f"compiled, {processes} processes",
+                lambda: render_emails(email, contexts, extra=extra, processes=processes),
+            ),
+        ]
+        # Start the pool before timing so its spawn cost is not counted
+        render_emails(email, contexts[:1000], extra=extra, processes=processes)
+
+        for label, run in runs:
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{label:<28} {count / elapsed:>10,.0f} renders/s  ({elapsed:.2f}s)")
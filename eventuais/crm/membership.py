@@ -0,0 +1,118 @@
+"""Materialized membership of dynamic segments.
+
+Dynamic segment membership is stored in :class:`SegmentMembership` rows so
+campaign sends and segment counts read precomputed rows instead of evaluating
+criteria. :func:`rebuild_segment` recomputes a whole segment when its criteria
+change; :func:`refresh_contacts` re-checks only the contacts touched by a write
+and is what the signal handlers in :mod:`eventuais.crm.signals` call.
+"""
+
+import logging
+from itertools import batched
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+
+from eventuais.crm.bitmaps import mark_bitmaps_stale
+from eventuais.crm.models import Contact
+from eventuais.crm.models import Segment
+from eventuais.crm.models import SegmentMembership
+from eventuais.crm.segments import SegmentCriteriaError
+from eventuais.crm.segments import criteria_dependencies
+from eventuais.crm.segments import segment_queryset
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+
+# Raised while building the query of criteria saved before their values were checked
+CRITERIA_ERRORS = (SegmentCriteriaError, ValidationError, ValueError, TypeError)
+
+
+def segment_contacts(segment):
+    """Return the contacts currently in a segment, reading materialized rows for dynamic segments."""
+    if segment.is_dynamic:
+        return Contact.objects.filter(segment_memberships__segment=segment)
+    return segment.static_contacts.all()
+
+
+def rebuild_segment(segment):
+    """Recompute the full membership of a segment and return its new contact count."""
+    if not segment.is_dynamic:
+        SegmentMembership.objects.filter(segment=segment).delete()
+        mark_bitmaps_stale([segment.pk])
+        return segment.contact_count
+
+    try:
+        matching = segment_queryset(segment, check_cost=False)
+    except CRITERIA_ERRORS:
+        logger.warning("Segment %s has invalid criteria, clearing its membership", segment.pk, exc_info=True)
+        matching = Contact.objects.none()
+
+    with transaction.atomic():
+        SegmentMembership.objects.filter(segment=segment).exclude(contact__in=matching.values("pk")).delete()
+
+        new_ids = matching.exclude(segment_memberships__segment=segment).values_list("pk", flat=True)
+        for chunk in batched(new_ids.iterator(chunk_size=BATCH_SIZE), BATCH_SIZE):
+            SegmentMembership.objects.bulk_create(
+                [SegmentMembership(segment=segment, contact_id=contact_id) for contact_id in chunk],
+                ignore_conflicts=True,
+            )
+
+        count = SegmentMembership.objects.filter(segment=segment).count()
+        Segment.objects.filter(pk=segment.pk).update(contact_count=count)
+        mark_bitmaps_stale([segment.pk])
+    return count
+
+
+def refresh_contacts(contact_ids, kinds=None):
+    """Re-check the given contacts against every dynamic segment.
+
+    ``kinds`` limits the check to segments whose criteria use one of the given
+    node kinds (see :func:`~eventuais.crm.segments.criteria_dependencies`), so a
+    tag change does not re-evaluate segments that only filter on fields.
+    """
+    segments = [
+        segment
+        for segment in Segment.objects.filter(is_dynamic=True).only("id", "criteria", "is_dynamic")
+        if kinds is None or criteria_dependencies(segment.criteria) & set(kinds)
+    ]
+    if not segments:
+        return
+
+    for chunk in batched(set(contact_ids), BATCH_SIZE):
+        for segment in segments:
+            _refresh_segment_contacts(segment, chunk)
+
+
+def _refresh_segment_contacts(segment, contact_ids):
+    try:
+        matching = set(
+            segment_queryset(segment, check_cost=False).filter(pk__in=contact_ids).values_list("pk", flat=True),
+        )
+    except CRITERIA_ERRORS:
+        # One broken segment must not fail every contact write
+        logger.warning("Segment %s has invalid criteria, skipping it", segment.pk, exc_info=True)
+        return
+
+    current = set(
+        SegmentMembership.objects.filter(segment=segment, contact_id__in=contact_ids).values_list(
+            "contact_id",
+            flat=True,
+        ),
+    )
+    added = matching - current
+    removed = current - matching
+    if not added and not removed:
+        return
+
+    if added:
+        SegmentMembership.objects.bulk_create(
+            [SegmentMembership(segment=segment, contact_id=contact_id) for contact_id in added],
+            ignore_conflicts=True,
+        )
+    if removed:
+        SegmentMembership.objects.filter(segment=segment, contact_id__in=removed).delete()
+    Segment.objects.filter(pk=segment.pk).update(contact_count=F("contact_count") + len(added) - len(removed))
+    mark_bitmaps_stale([segment.pk])
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.13 on 2026-10-16 23:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0002_campaign_dashboard_report_dashboarditem_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['status'], name='crm_contact_status_520462_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['created_at'], name='crm_contact_created_c67cc3_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.13 on 2026-10-16 23:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0003_contact_status_created_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SegmentMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('contact', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segment_memberships', to='crm.contact')),
+                ('segment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='crm.segment')),
+            ],
+            options={
+                'verbose_name': 'Segment Membership',
+                'verbose_name_plural': 'Segment Memberships',
+                'unique_together': {('segment', 'contact')},
+            },
+        ),
+    ]
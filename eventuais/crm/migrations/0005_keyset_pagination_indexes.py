@@ -0,0 +1,48 @@
+# Generated by Django 5.0.13 on 2026-10-16 23:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('crm', '0004_segmentmembership'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='contact',
+            name='crm_contact_last_na_cda0e5_idx',
+        ),
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['created_at', 'id'], name='crm_account_created_46a958_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['start_date', 'id'], name='crm_activit_start_d_2c7f57_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='campaignrecipient',
+            index=models.Index(fields=['created_at', 'id'], name='crm_campaig_created_d0b4d3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['last_name', 'first_name', 'id'], name='crm_contact_last_na_6afe06_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='opportunity',
+            index=models.Index(fields=['-expected_close_date', 'id'], name='crm_opportu_expecte_230484_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportticket',
+            index=models.Index(fields=['created_at', 'id'], name='crm_support_created_a8098d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticketmessage',
+            index=models.Index(fields=['created_at', 'id'], name='crm_ticketm_created_fe07ad_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.13 on 2026-10-16 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0006_importjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='campaignrecipient',
+            index=models.Index(fields=['campaign', 'status', 'id'], name='crm_campaig_campaig_3af869_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.13 on 2026-10-16 23:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0007_campaign_send_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignEngagement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour'), ('day', 'Day')], max_length=10, verbose_name='Granularity')),
+                ('bucket', models.DateTimeField(verbose_name='Bucket Start')),
+                ('sent', models.PositiveIntegerField(default=0, verbose_name='Sent')),
+                ('opened', models.PositiveIntegerField(default=0, verbose_name='Opened')),
+                ('clicked', models.PositiveIntegerField(default=0, verbose_name='Clicked')),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='engagement', to='crm.campaign')),
+                ('email', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='engagement', to='crm.marketingemail')),
+            ],
+            options={
+                'verbose_name': 'Campaign Engagement',
+                'verbose_name_plural': 'Campaign Engagement',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='campaignengagement',
+            constraint=models.UniqueConstraint(fields=('campaign', 'granularity', 'bucket', 'email'), name='crm_campaign_engagement_bucket'),
+        ),
+    ]
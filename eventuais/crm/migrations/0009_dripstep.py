@@ -0,0 +1,29 @@
+# Generated by Django 5.0.13 on 2026-10-16 23:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0008_campaignengagement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DripStep',
+            fields=[
+                ('recipient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='next_drip', serialize=False, to='crm.campaignrecipient')),
+                ('due_at', models.DateTimeField(verbose_name='Due At')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('email', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='due_drips', to='crm.marketingemail')),
+            ],
+            options={
+                'verbose_name': 'Drip Step',
+                'verbose_name_plural': 'Drip Steps',
+                'indexes': [models.Index(fields=['due_at'], name='crm_dripste_due_at_dd8866_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.13 on 2026-10-16 23:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0009_dripstep'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='campaignrecipient',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('opened', 'Opened'), ('clicked', 'Clicked'), ('bounced', 'Bounced'), ('unsubscribed', 'Unsubscribed'), ('suppressed', 'Suppressed')], default='pending', max_length=20, verbose_name='Status'),
+        ),
+    ]
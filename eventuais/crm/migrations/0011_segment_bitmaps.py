@@ -0,0 +1,38 @@
+# Generated by Django 5.0.13 on 2026-10-16 23:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0010_campaignrecipient_suppressed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SegmentBitmap',
+            fields=[
+                ('segment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='bitmap', serialize=False, to='crm.segment')),
+                ('bitmap', models.BinaryField()),
+                ('contact_count', models.PositiveIntegerField(default=0)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Segment Bitmap',
+                'verbose_name_plural': 'Segment Bitmaps',
+            },
+        ),
+        migrations.CreateModel(
+            name='ContactIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contact', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='bitmap_index', to='crm.contact')),
+            ],
+            options={
+                'verbose_name': 'Contact Index',
+                'verbose_name_plural': 'Contact Indexes',
+            },
+        ),
+    ]
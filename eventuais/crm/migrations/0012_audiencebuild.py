@@ -0,0 +1,41 @@
+# Generated by Django 5.0.13 on 2026-10-16 23:59
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0011_segment_bitmaps'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudienceBuild',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('expression', models.JSONField(verbose_name='Segment Expression')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='Status')),
+                ('cursor', models.UUIDField(blank=True, editable=False, null=True, verbose_name='Cursor')),
+                ('total_contacts', models.PositiveIntegerField(blank=True, null=True, verbose_name='Total Contacts')),
+                ('processed_contacts', models.PositiveIntegerField(default=0, verbose_name='Processed Contacts')),
+                ('added_count', models.PositiveIntegerField(default=0, verbose_name='Added')),
+                ('suppressed_count', models.PositiveIntegerField(default=0, verbose_name='Suppressed')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finished At')),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audience_builds', to='crm.campaign')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audience_builds', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Audience Build',
+                'verbose_name_plural': 'Audience Builds',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
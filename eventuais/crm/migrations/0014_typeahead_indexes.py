@@ -0,0 +1,37 @@
+# Generated by Django 5.0.13 on 2026-10-17 00:05
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0013_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='crm_account_name_prefix'),
+        ),
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='text_pattern_ops'), name='crm_account_email_prefix'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('first_name'), name='text_pattern_ops'), name='crm_contact_first_prefix'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('last_name'), name='text_pattern_ops'), name='crm_contact_last_prefix'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='text_pattern_ops'), name='crm_contact_email_prefix'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.13 on 2026-10-17 00:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('crm', '0014_typeahead_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['content_type', 'object_id', 'start_date'], name='crm_activit_content_fd789d_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.13 on 2026-10-17 00:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('crm', '0015_activity_subject_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customfieldvalue',
+            index=models.Index(fields=['content_type', 'object_id'], name='crm_customf_content_c566c7_idx'),
+        ),
+    ]
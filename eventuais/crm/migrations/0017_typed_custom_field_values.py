@@ -0,0 +1,153 @@
+# Generated by Django 5.0.13 on 2026-10-17 00:18
+
+import datetime
+import json
+from contextlib import suppress
+from decimal import Decimal
+from decimal import InvalidOperation
+from itertools import batched
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+BACKFILL_BATCH_SIZE = 2000
+
+# The parsing rules of eventuais.crm.typed_values as of this migration, frozen so later changes
+# to them do not change what it writes
+
+TYPED_COLUMNS = {
+    'number': 'number_value',
+    'date': 'date_value',
+    'datetime': 'datetime_value',
+    'boolean': 'bool_value',
+    'multiselect': 'json_value',
+}
+
+NUMBER_DIGITS = 24
+NUMBER_PLACES = 6
+
+TRUE_WORDS = {'true', '1', 'yes', 'on'}
+FALSE_WORDS = {'false', '0', 'no', 'off'}
+
+
+def parse_number(text):
+    number = Decimal(text)
+    if not number.is_finite() or number.adjusted() >= NUMBER_DIGITS - NUMBER_PLACES:
+        raise ValueError(text)
+    return number.quantize(Decimal(1).scaleb(-NUMBER_PLACES))
+
+
+def parse_datetime_value(text):
+    moment = parse_datetime(text)
+    if moment is None:
+        moment = datetime.datetime.combine(datetime.date.fromisoformat(text), datetime.time())
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def parse_bool(text):
+    word = text.lower()
+    if word not in TRUE_WORDS | FALSE_WORDS:
+        raise ValueError(text)
+    return word in TRUE_WORDS
+
+
+def parse_choices(text):
+    if text.startswith('['):
+        choices = json.loads(text)
+        if not isinstance(choices, list):
+            raise ValueError(text)
+        return [str(choice) for choice in choices]
+    return [choice.strip() for choice in text.split(',') if choice.strip()]
+
+
+PARSERS = {
+    'number_value': parse_number,
+    'date_value': datetime.date.fromisoformat,
+    'datetime_value': parse_datetime_value,
+    'bool_value': parse_bool,
+    'json_value': parse_choices,
+}
+
+
+def typed_columns(field_type, text):
+    columns = dict.fromkeys(PARSERS)
+    column = TYPED_COLUMNS.get(field_type)
+    if column is not None and text.strip():
+        with suppress(ValueError, InvalidOperation):
+            columns[column] = PARSERS[column](text.strip())
+    return columns
+
+
+def backfill_typed_values(apps, schema_editor):
+    CustomFieldValue = apps.get_model('crm', 'CustomFieldValue')
+    values = (
+        CustomFieldValue.objects.filter(field__field_type__in=TYPED_COLUMNS)
+        .select_related('field')
+        .only('pk', 'value', 'field__field_type')
+        .order_by('pk')
+    )
+    for chunk in batched(values.iterator(chunk_size=BACKFILL_BATCH_SIZE), BACKFILL_BATCH_SIZE):
+        for value in chunk:
+            for column, typed in typed_columns(value.field.field_type, value.value).items():
+                setattr(value, column, typed)
+        CustomFieldValue.objects.bulk_update(chunk, list(PARSERS))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('crm', '0016_custom_field_value_object_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customfieldvalue',
+            name='bool_value',
+            field=models.BooleanField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customfieldvalue',
+            name='date_value',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customfieldvalue',
+            name='datetime_value',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customfieldvalue',
+            name='json_value',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customfieldvalue',
+            name='number_value',
+            field=models.DecimalField(blank=True, decimal_places=6, editable=False, max_digits=24, null=True),
+        ),
+        # Backfill before building the indexes
+        migrations.RunPython(backfill_typed_values, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customfieldvalue',
+            index=models.Index(condition=models.Q(('number_value__isnull', False)), fields=['field', 'number_value'], name='crm_cfv_number'),
+        ),
+        migrations.AddIndex(
+            model_name='customfieldvalue',
+            index=models.Index(condition=models.Q(('date_value__isnull', False)), fields=['field', 'date_value'], name='crm_cfv_date'),
+        ),
+        migrations.AddIndex(
+            model_name='customfieldvalue',
+            index=models.Index(condition=models.Q(('datetime_value__isnull', False)), fields=['field', 'datetime_value'], name='crm_cfv_datetime'),
+        ),
+        migrations.AddIndex(
+            model_name='customfieldvalue',
+            index=models.Index(condition=models.Q(('bool_value__isnull', False)), fields=['field', 'bool_value'], name='crm_cfv_bool'),
+        ),
+        migrations.AddIndex(
+            model_name='customfieldvalue',
+            index=django.contrib.postgres.indexes.GinIndex(condition=models.Q(('json_value__isnull', False)), fields=['json_value'], name='crm_cfv_json'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.0.13 on 2026-10-17 00:24
+
+from itertools import batched
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+
+BACKFILL_TREES = 500
+
+# The aggregation of eventuais.crm.rollups as of this migration, frozen so later changes to it
+# do not change what it writes
+
+ROLLUP_FIELDS = ('annual_revenue', 'open_pipeline', 'ticket_count', 'contact_count')
+
+CLOSED_STAGES = ('closed_won', 'closed_lost')
+
+
+def per_account(rows, total):
+    return Subquery(
+        rows.filter(account=OuterRef('pk')).order_by().values('account').annotate(total=total).values('total'),
+    )
+
+
+def subtree_totals(accounts, opportunities, tickets, contacts):
+    nodes = (
+        accounts.annotate(
+            own_pipeline=per_account(opportunities.exclude(stage__in=CLOSED_STAGES), Sum('amount')),
+            own_tickets=per_account(tickets, Count('pk')),
+            own_contacts=per_account(contacts, Count('pk')),
+        )
+        .order_by('-lft')
+        .values_list('pk', 'parent_id', 'annual_revenue', 'own_pipeline', 'own_tickets', 'own_contacts')
+    )
+    totals = {}
+    parents = {}
+    for pk, parent_id, *own in nodes:
+        parents[pk] = parent_id
+        totals[pk] = {field: value or 0 for field, value in zip(ROLLUP_FIELDS, own, strict=True)}
+
+    # Descendants have larger lft than their ancestors, so each node is complete before its parent
+    for pk, parent_id in parents.items():
+        if parent_id in totals:
+            for field in ROLLUP_FIELDS:
+                totals[parent_id][field] += totals[pk][field]
+    return totals
+
+
+def backfill_rollups(apps, schema_editor):
+    Account = apps.get_model('crm', 'Account')
+    AccountRollup = apps.get_model('crm', 'AccountRollup')
+    Contact = apps.get_model('crm', 'Contact')
+    Opportunity = apps.get_model('crm', 'Opportunity')
+    SupportTicket = apps.get_model('crm', 'SupportTicket')
+    tree_ids = Account.objects.order_by('tree_id').values_list('tree_id', flat=True).distinct()
+    for chunk in batched(tree_ids.iterator(), BACKFILL_TREES):
+        totals = subtree_totals(
+            Account.objects.filter(tree_id__in=chunk),
+            Opportunity.objects.all(),
+            SupportTicket.objects.all(),
+            Contact.objects.all(),
+        )
+        AccountRollup.objects.bulk_create(
+            [AccountRollup(account_id=pk, **values) for pk, values in totals.items()],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['account'],
+            update_fields=list(ROLLUP_FIELDS),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0017_typed_custom_field_values'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountRollup',
+            fields=[
+                ('account', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='crm.account')),
+                ('annual_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Annual Revenue')),
+                ('open_pipeline', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Open Pipeline')),
+                ('ticket_count', models.PositiveIntegerField(default=0, verbose_name='Support Tickets')),
+                ('contact_count', models.PositiveIntegerField(default=0, verbose_name='Contacts')),
+            ],
+            options={
+                'verbose_name': 'Account Rollup',
+                'verbose_name_plural': 'Account Rollups',
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
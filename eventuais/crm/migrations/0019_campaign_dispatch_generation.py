@@ -0,0 +1,18 @@
+# Generated by Django 5.0.13 on 2026-10-17 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0018_account_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='dispatch_generation',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Dispatch Generation'),
+        ),
+    ]
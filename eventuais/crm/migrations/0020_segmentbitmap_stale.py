@@ -0,0 +1,18 @@
+# Generated by Django 5.0.13 on 2026-10-17 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0019_campaign_dispatch_generation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='segmentbitmap',
+            name='stale',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.13 on 2026-10-17 00:45
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0020_segmentbitmap_stale'),
+    ]
+
+    operations = [
+        migrations.RenameIndex(
+            model_name='activity',
+            new_name='crm_activity_subject',
+            old_name='crm_activit_content_fd789d_idx',
+        ),
+    ]
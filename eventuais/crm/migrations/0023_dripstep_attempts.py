@@ -0,0 +1,18 @@
+# Generated by Django 5.0.13 on 2026-10-17 01:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0022_campaignrecipient_failed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dripstep',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Attempts'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+from django.db.models import Prefetch
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .custom_fields import CUSTOM_FIELDS_PARAM
+from .custom_fields import requested_fields
+from .exports import export_response
+
+
+def apply_profile(queryset, profile):
+    """Apply a queryset profile's ``select_related``, ``prefetch_related`` and ``annotate`` entries."""
+    if profile.get("select_related"):
+        queryset = queryset.select_related(*profile["select_related"])
+    if profile.get("prefetch_related"):
+        queryset = queryset.prefetch_related(*profile["prefetch_related"])
+    if profile.get("annotate"):
+        queryset = queryset.annotate(**profile["annotate"])
+    return queryset
+
+
+class QuerysetProfileMixin:
+    """Load what the serializer of the current action needs in a fixed number of queries.
+
+    ``queryset_profiles`` maps an action name to a profile dict with optional
+    ``select_related``, ``prefetch_related`` and ``annotate`` entries. Actions
+    without their own profile use the ``"default"`` one.
+    """
+
+    queryset_profiles: dict = {}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        profile = self.queryset_profiles.get(self.action, self.queryset_profiles.get("default", {}))
+        return apply_profile(queryset, profile)
+
+
+class CustomFieldsMixin:
+    """Pass the fields asked for with ``?custom_fields=`` to serializers that inline them.
+
+    Pair with serializers using ``CustomFieldsSerializerMixin`` and
+    ``CustomFieldsListSerializer``; see :mod:`eventuais.crm.custom_fields`.
+    """
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), CUSTOM_FIELDS_PARAM: requested_fields(self.request)}
+
+
+def related_only(lookup, queryset):
+    """Prefetch a relation as bare rows, for serializer fields that only render primary keys."""
+    return Prefetch(lookup, queryset=queryset.only("pk"))
+
+
+class ExportMixin:
+    """Add an ``export`` list action that streams every filtered row.
+
+    ``export_columns`` lists the ``(column, lookup)`` pairs written for each
+    row; the action honours the same filter, search and ordering parameters as
+    the list endpoint. Give it an empty queryset profile, as rows are read with
+    ``values_list`` and never go through the serializer.
+    """
+
+    export_columns: list = []
+    export_filename = "export"
+
+    @action(detail=False, methods=["GET"])
+    def export(self, request):
+        """Stream the filtered rows as NDJSON, or as CSV with ``?export_format=csv``."""
+        queryset = self.filter_queryset(self.get_queryset())
+        export_format = request.query_params.get("export_format", "ndjson")
+        try:
+            return export_response(queryset, self.export_columns, export_format, self.export_filename)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
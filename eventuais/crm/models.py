@@ -1,14 +1,22 @@
 import uuid
+import zlib
 
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.fields import GenericRelation
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.indexes import GinIndex
 from django.core.exceptions import ValidationError
+from django.db import connection
 from django.db import models
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 from mptt.models import MPTTModel
 from mptt.models import TreeForeignKey
 
+from eventuais.crm.search import prefix_index
+from eventuais.crm.search import search_vector
+from eventuais.crm.typed_values import PARSERS
+from eventuais.crm.typed_values import typed_columns
 from eventuais.users.models import User
 
 
@@ -85,6 +93,11 @@ class Activity(models.Model):
         verbose_name = _("Activity")
         verbose_name_plural = _("Activities")
         ordering = ["-start_date"]
+        indexes = [
+            models.Index(fields=["start_date", "id"]),
+            models.Index(fields=["content_type", "object_id", "start_date"], name="crm_activity_subject"),
+            GinIndex(search_vector("crm.Activity"), name="crm_activity_search"),
+        ]
 
     def __str__(self):
         return f"{self.activity_type}: {self.subject}"
@@ -131,6 +144,13 @@ class CustomField(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_field_type_display()}) for {self.content_type.model}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Kept so that changing the type re-parses the stored values (see ``signals``)
+        instance.loaded_field_type = instance.__dict__.get("field_type")
+        return instance
+
     class Meta:  # type: ignore
         verbose_name = _("Custom Field")
         verbose_name_plural = _("Custom Fields")
@@ -156,16 +176,57 @@ class CustomFieldValue(models.Model):
     # The actual value of the custom field
     value = models.TextField(_("Value"), blank=True)
 
+    # The value parsed for its field type, filled in on save (see ``typed_values``)
+    number_value = models.DecimalField(max_digits=24, decimal_places=6, null=True, blank=True, editable=False)
+    date_value = models.DateField(null=True, blank=True, editable=False)
+    datetime_value = models.DateTimeField(null=True, blank=True, editable=False)
+    bool_value = models.BooleanField(null=True, blank=True, editable=False)
+    json_value = models.JSONField(null=True, blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.field.name}: {self.value}"
 
+    def save(self, *args, **kwargs):
+        self.set_typed_value(self.field.field_type)
+        if kwargs.get("update_fields") is not None and "value" in kwargs["update_fields"]:
+            kwargs["update_fields"] = {*kwargs["update_fields"], *PARSERS}
+        super().save(*args, **kwargs)
+
+    def set_typed_value(self, field_type):
+        for column, typed in typed_columns(field_type, self.value).items():
+            setattr(self, column, typed)
+
     class Meta:  # type: ignore
         verbose_name = _("Custom Field Value")
         verbose_name_plural = _("Custom Field Values")
         unique_together = [["field", "content_type", "object_id"]]
+        indexes = [
+            models.Index(fields=["content_type", "object_id"]),
+            models.Index(
+                fields=["field", "number_value"],
+                name="crm_cfv_number",
+                condition=models.Q(number_value__isnull=False),
+            ),
+            models.Index(
+                fields=["field", "date_value"],
+                name="crm_cfv_date",
+                condition=models.Q(date_value__isnull=False),
+            ),
+            models.Index(
+                fields=["field", "datetime_value"],
+                name="crm_cfv_datetime",
+                condition=models.Q(datetime_value__isnull=False),
+            ),
+            models.Index(
+                fields=["field", "bool_value"],
+                name="crm_cfv_bool",
+                condition=models.Q(bool_value__isnull=False),
+            ),
+            GinIndex(fields=["json_value"], name="crm_cfv_json", condition=models.Q(json_value__isnull=False)),
+        ]
 
 
 class SocialProfile(models.Model):
@@ -201,7 +262,53 @@ class SocialProfile(models.Model):
         unique_together = [["content_type", "object_id", "platform"]]
 
 
-class Account(MPTTModel):
+class RollupSourceMixin:
+    """Remembers the ``rollup_fields`` a row was loaded with.
+
+    Saving adjusts the account rollups by the difference between these and
+    the saved values (see ``rollups``). Rows loaded with one of the fields
+    deferred remember nothing.
+    """
+
+    rollup_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = {name: instance.__dict__[name] for name in cls.rollup_fields if name in instance.__dict__}
+        instance.loaded_rollup_values = loaded if len(loaded) == len(cls.rollup_fields) else None
+        return instance
+
+
+def lock_tree_ids(model):
+    """Take the transaction-scoped advisory lock guarding ``model``'s MPTT tree ids.
+
+    Tree ids are handed out as ``MAX(tree_id) + 1`` (by MPTT for new roots and
+    by the bulk import), so two writers reading the maximum at once would give
+    two trees the same id. Must run inside a transaction.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [zlib.crc32(model._meta.db_table.encode())])  # noqa: SLF001
+
+
+class TreeIdLockMixin:
+    """Serializes saves that may allocate or shift tree ids with ``lock_tree_ids``.
+
+    New nodes and nodes changing parent can become roots or move trees, so
+    they save under the lock; other saves stay within their own tree.
+    """
+
+    def save(self, *args, **kwargs):
+        parent_attr = self._mptt_meta.parent_attr
+        moved = self._mptt_cached_fields.get(parent_attr) != self._mptt_meta.get_raw_field_value(self, parent_attr)
+        if not (self._state.adding or moved):
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            lock_tree_ids(type(self))
+            return super().save(*args, **kwargs)
+
+
+class Account(RollupSourceMixin, TreeIdLockMixin, MPTTModel):
     """Account model with hierarchical structure."""
 
     class AccountType(models.TextChoices):
@@ -289,6 +396,8 @@ class Account(MPTTModel):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    rollup_fields = ("parent_id", "annual_revenue")
+
     def __str__(self):
         return self.name
 
@@ -300,9 +409,32 @@ class Account(MPTTModel):
     class Meta:  # type: ignore
         verbose_name = _("Account")
         verbose_name_plural = _("Accounts")
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            GinIndex(search_vector("crm.Account"), name="crm_account_search"),
+            prefix_index("name", "crm_account_name_prefix"),
+            prefix_index("email", "crm_account_email_prefix"),
+        ]
+
 
+class AccountRollup(models.Model):
+    """Totals of an account and all its descendant accounts, kept current as rows change (see ``rollups``)."""
 
-class Contact(MPTTModel):
+    account = models.OneToOneField(Account, on_delete=models.CASCADE, primary_key=True, related_name="rollup")
+    annual_revenue = models.DecimalField(_("Annual Revenue"), max_digits=20, decimal_places=2, default=0)
+    open_pipeline = models.DecimalField(_("Open Pipeline"), max_digits=20, decimal_places=2, default=0)
+    ticket_count = models.PositiveIntegerField(_("Support Tickets"), default=0)
+    contact_count = models.PositiveIntegerField(_("Contacts"), default=0)
+
+    class Meta:  # type: ignore # noqa: PGH003
+        verbose_name = _("Account Rollup")
+        verbose_name_plural = _("Account Rollups")
+
+    def __str__(self):
+        return f"Rollup of {self.account_id}"
+
+
+class Contact(RollupSourceMixin, TreeIdLockMixin, MPTTModel):
     """Contact model with hierarchical structure."""
 
     class Status(models.TextChoices):
@@ -372,6 +504,8 @@ class Contact(MPTTModel):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    rollup_fields = ("account_id",)
+
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
@@ -388,12 +522,18 @@ class Contact(MPTTModel):
         verbose_name = _("Contact")
         verbose_name_plural = _("Contacts")
         indexes = [
-            models.Index(fields=["last_name", "first_name"]),
+            models.Index(fields=["last_name", "first_name", "id"]),
             models.Index(fields=["email"]),
+            models.Index(fields=["status"]),
+            models.Index(fields=["created_at"]),
+            GinIndex(search_vector("crm.Contact"), name="crm_contact_search"),
+            prefix_index("first_name", "crm_contact_first_prefix"),
+            prefix_index("last_name", "crm_contact_last_prefix"),
+            prefix_index("email", "crm_contact_email_prefix"),
         ]
 
 
-class Opportunity(models.Model):
+class Opportunity(RollupSourceMixin, models.Model):
     """Opportunity model for sales pipeline management."""
 
     class Stage(models.TextChoices):
@@ -464,10 +604,16 @@ class Opportunity(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    rollup_fields = ("account_id", "stage", "amount")
+
     class Meta:  # type: ignore # noqa: PGH003
         verbose_name = _("Opportunity")
         verbose_name_plural = _("Opportunities")
         ordering = ["-expected_close_date"]
+        indexes = [
+            models.Index(fields=["-expected_close_date", "id"]),
+            GinIndex(search_vector("crm.Opportunity"), name="crm_opportunity_search"),
+        ]
 
     def __str__(self):
         return self.name
@@ -500,6 +646,9 @@ class Campaign(models.Model):
     bounce_count = models.PositiveIntegerField(_("Emails Bounced"), default=0)
     unsubscribe_count = models.PositiveIntegerField(_("Unsubscribes"), default=0)
 
+    # Bumped each time the campaign is (re)started; batches of an older dispatch stop
+    dispatch_generation = models.PositiveIntegerField(_("Dispatch Generation"), default=0, editable=False)
+
     # Ownership and metadata
     assigned_to = models.ForeignKey(
         User,
@@ -564,6 +713,66 @@ class Segment(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Kept so that only changed criteria rebuild the membership (see ``signals``)
+        instance.loaded_definition = instance.membership_definition()
+        return instance
+
+    def membership_definition(self):
+        """What the materialized membership depends on; ``None`` when a field was not loaded."""
+        if {"criteria", "is_dynamic"} - self.__dict__.keys():
+            return None
+        return self.criteria, self.is_dynamic
+
+
+class SegmentMembership(models.Model):
+    """Materialized membership of a contact in a dynamic segment."""
+
+    segment = models.ForeignKey(Segment, on_delete=models.CASCADE, related_name="memberships")
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name="segment_memberships")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:  # type: ignore # noqa: PGH003
+        verbose_name = _("Segment Membership")
+        verbose_name_plural = _("Segment Memberships")
+        unique_together = [["segment", "contact"]]
+
+    def __str__(self):
+        return f"{self.contact_id} in {self.segment_id}"
+
+
+class ContactIndex(models.Model):
+    """Dense integer position of a contact in segment bitmaps."""
+
+    contact = models.OneToOneField(Contact, on_delete=models.CASCADE, related_name="bitmap_index")
+
+    class Meta:  # type: ignore # noqa: PGH003
+        verbose_name = _("Contact Index")
+        verbose_name_plural = _("Contact Indexes")
+
+    def __str__(self):
+        return f"{self.contact_id} at {self.pk}"
+
+
+class SegmentBitmap(models.Model):
+    """Compressed membership bitmap of a segment over ``ContactIndex`` positions."""
+
+    segment = models.OneToOneField(Segment, on_delete=models.CASCADE, primary_key=True, related_name="bitmap")
+    bitmap = models.BinaryField()
+    contact_count = models.PositiveIntegerField(default=0)
+    built_at = models.DateTimeField(auto_now=True)
+    # The membership changed since it was built; served as is until the queued rebuild replaces it
+    stale = models.BooleanField(default=False)
+
+    class Meta:  # type: ignore # noqa: PGH003
+        verbose_name = _("Segment Bitmap")
+        verbose_name_plural = _("Segment Bitmaps")
+
+    def __str__(self):
+        return f"{self.segment_id} ({self.contact_count} contacts)"
+
 
 class MarketingEmail(models.Model):
     """Email template model for marketing campaigns."""
@@ -601,6 +810,9 @@ class MarketingEmail(models.Model):
         verbose_name_plural = _("Marketing Emails")
         ordering = ["campaign", "sequence_order"]
         unique_together = [["campaign", "sequence_order"]]
+        indexes = [
+            GinIndex(search_vector("crm.MarketingEmail"), name="crm_marketingemail_search"),
+        ]
 
     def __str__(self):
         return self.name
@@ -616,6 +828,8 @@ class CampaignRecipient(models.Model):
         CLICKED = "clicked", _("Clicked")
         BOUNCED = "bounced", _("Bounced")
         UNSUBSCRIBED = "unsubscribed", _("Unsubscribed")
+        SUPPRESSED = "suppressed", _("Suppressed")
+        FAILED = "failed", _("Failed")
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
@@ -644,12 +858,83 @@ class CampaignRecipient(models.Model):
         verbose_name = _("Campaign Recipient")
         verbose_name_plural = _("Campaign Recipients")
         unique_together = [["campaign", "contact"]]
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            # Keyset walk over the pending recipients of one campaign when sending
+            models.Index(fields=["campaign", "status", "id"]),
+        ]
 
     def __str__(self):
         return f"{self.id}"
 
 
-class SupportTicket(models.Model):
+class DripStep(models.Model):
+    """The next drip email due for a campaign recipient.
+
+    Only recipients with a step still to come have a row, so finding the due
+    ones is an index range scan on ``due_at`` whatever the campaign sizes.
+    """
+
+    recipient = models.OneToOneField(
+        CampaignRecipient,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="next_drip",
+    )
+    email = models.ForeignKey(MarketingEmail, on_delete=models.CASCADE, related_name="due_drips")
+    due_at = models.DateTimeField(_("Due At"))
+    # Failed sends of this step so far
+    attempts = models.PositiveSmallIntegerField(_("Attempts"), default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:  # type: ignore # noqa: PGH003
+        verbose_name = _("Drip Step")
+        verbose_name_plural = _("Drip Steps")
+        indexes = [
+            models.Index(fields=["due_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient_id} due {self.due_at:%Y-%m-%d %H:%M}"
+
+
+class CampaignEngagement(models.Model):
+    """Recipient transitions of one campaign email counted per time bucket.
+
+    Each transition is added to a minute, an hour and a day bucket, so
+    campaign reporting reads a few rollup rows instead of the recipients.
+    """
+
+    class Granularity(models.TextChoices):
+        MINUTE = "minute", _("Minute")
+        HOUR = "hour", _("Hour")
+        DAY = "day", _("Day")
+
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name="engagement")
+    email = models.ForeignKey(MarketingEmail, on_delete=models.CASCADE, related_name="engagement")
+    granularity = models.CharField(_("Granularity"), max_length=10, choices=Granularity.choices)
+    bucket = models.DateTimeField(_("Bucket Start"))
+
+    sent = models.PositiveIntegerField(_("Sent"), default=0)
+    opened = models.PositiveIntegerField(_("Opened"), default=0)
+    clicked = models.PositiveIntegerField(_("Clicked"), default=0)
+
+    class Meta:  # type: ignore # noqa: PGH003
+        verbose_name = _("Campaign Engagement")
+        verbose_name_plural = _("Campaign Engagement")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["campaign", "granularity", "bucket", "email"],
+                name="crm_campaign_engagement_bucket",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign_id} {self.granularity} {self.bucket:%Y-%m-%d %H:%M}"
+
+
+class SupportTicket(RollupSourceMixin, models.Model):
     """Customer support ticket model for handling customer inquiries and issues."""
 
     class TicketStatus(models.TextChoices):
@@ -708,10 +993,16 @@ class SupportTicket(models.Model):
     # Activity tracking
     activities = GenericRelation(Activity)
 
+    rollup_fields = ("account_id",)
+
     class Meta:  # type: ignore # noqa: PGH003
         verbose_name = _("Support Ticket")
         verbose_name_plural = _("Support Tickets")
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            GinIndex(search_vector("crm.SupportTicket"), name="crm_supportticket_search"),
+        ]
 
     def __str__(self):
         return f"{self.subject}"
@@ -739,6 +1030,9 @@ class TicketMessage(models.Model):
         verbose_name = _("Ticket Message")
         verbose_name_plural = _("Ticket Messages")
         ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+        ]
 
     def __str__(self):
         prefix = "Customer" if self.is_customer else str(self.sender)
@@ -862,3 +1156,84 @@ class DashboardItem(models.Model):
 
     def __str__(self):
         return self.id
+
+
+class ImportJob(models.Model):
+    """A bulk import of contacts or accounts from an uploaded CSV/NDJSON file."""
+
+    class Kind(models.TextChoices):
+        CONTACTS = "contacts", _("Contacts")
+        ACCOUNTS = "accounts", _("Accounts")
+
+    class FileFormat(models.TextChoices):
+        CSV = "csv", _("CSV")
+        NDJSON = "ndjson", _("NDJSON")
+
+    class JobStatus(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        RUNNING = "running", _("Running")
+        COMPLETED = "completed", _("Completed")
+        FAILED = "failed", _("Failed")
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(_("Kind"), max_length=20, choices=Kind.choices)
+    file = models.FileField(_("File"), upload_to="crm/imports/")
+    file_format = models.CharField(_("File Format"), max_length=10, choices=FileFormat.choices)
+    status = models.CharField(_("Status"), max_length=20, choices=JobStatus.choices, default=JobStatus.PENDING)
+
+    # Progress
+    total_rows = models.PositiveIntegerField(_("Total Rows"), null=True, blank=True)
+    processed_rows = models.PositiveIntegerField(_("Processed Rows"), default=0)
+    created_count = models.PositiveIntegerField(_("Created"), default=0)
+    duplicate_count = models.PositiveIntegerField(_("Duplicates"), default=0)
+    error_count = models.PositiveIntegerField(_("Errors"), default=0)
+    errors = models.JSONField(_("Errors"), default=list, blank=True)
+
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="import_jobs")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(_("Finished At"), null=True, blank=True)
+
+    class Meta:  # type: ignore # noqa: PGH003
+        verbose_name = _("Import Job")
+        verbose_name_plural = _("Import Jobs")
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} import {self.id}"
+
+
+class AudienceBuild(models.Model):
+    """A background job adding the contacts selected by a segment expression to a campaign."""
+
+    class JobStatus(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        RUNNING = "running", _("Running")
+        COMPLETED = "completed", _("Completed")
+        FAILED = "failed", _("Failed")
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name="audience_builds")
+    expression = models.JSONField(_("Segment Expression"))
+    status = models.CharField(_("Status"), max_length=20, choices=JobStatus.choices, default=JobStatus.PENDING)
+
+    # Progress; contacts are walked in primary key order and ``cursor`` is the last one done
+    cursor = models.UUIDField(_("Cursor"), null=True, blank=True, editable=False)
+    total_contacts = models.PositiveIntegerField(_("Total Contacts"), null=True, blank=True)
+    processed_contacts = models.PositiveIntegerField(_("Processed Contacts"), default=0)
+    added_count = models.PositiveIntegerField(_("Added"), default=0)
+    suppressed_count = models.PositiveIntegerField(_("Suppressed"), default=0)
+    error = models.TextField(_("Error"), blank=True)
+
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="audience_builds")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(_("Finished At"), null=True, blank=True)
+
+    class Meta:  # type: ignore # noqa: PGH003
+        verbose_name = _("Audience Build")
+        verbose_name_plural = _("Audience Builds")
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Audience build {self.id} for {self.campaign_id}"
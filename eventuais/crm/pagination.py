@@ -0,0 +1,180 @@
+"""Keyset pagination for the API list endpoints.
+
+Pages are addressed by the ordering values of the last row already seen, so
+fetching page 1000 is the same indexed range scan as fetching page one. The
+ordering must be unique, which is why every ordering ends with ``id``.
+"""
+
+import json
+from base64 import urlsafe_b64decode
+from base64 import urlsafe_b64encode
+from datetime import date
+from decimal import Decimal
+from uuid import UUID
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import remove_query_param
+from rest_framework.utils.urls import replace_query_param
+
+from .filters import SEARCH_RANK
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination over a composite ordering, without offsets.
+
+    The ordering comes from the view's ``cursor_ordering`` (falling back to
+    ``created_at, id``), its ``action_cursor_orderings`` entry for the current
+    action, or the full-text search rank when searching. A client
+    ``?ordering=`` is honoured when every field in it is a plain non-null
+    column, with ``id`` appended as a tie-breaker.
+    """
+
+    ordering = ("created_at", "id")
+    page_size_query_param = "page_size"
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        queryset = queryset.order_by(*(_flip(field) for field in self.ordering) if reverse else self.ordering)
+        if self.cursor is not None:
+            try:
+                queryset = queryset.filter(_keyset_filter(self.ordering, self.cursor.position, reverse=reverse))
+            except (TypeError, ValueError, ValidationError) as e:
+                raise NotFound(self.invalid_cursor_message) from e
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if reverse:
+            self.page.reverse()
+        self.has_next = True if reverse else has_more
+        self.has_previous = has_more if reverse else self.cursor is not None
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = self.ordering
+        view_queryset = getattr(view, "queryset", None)
+        # Nested actions such as ``/accounts/{id}/activities/`` paginate another model,
+        # in the default order unless they declare their own
+        if view_queryset is not None and view_queryset.model is queryset.model:
+            ordering = getattr(view, "cursor_ordering", ordering)
+        ordering = getattr(view, "action_cursor_orderings", {}).get(getattr(view, "action", None), ordering)
+        # Full-text search hits come best first unless the client asks for another order
+        if SEARCH_RANK in queryset.query.annotations:
+            ordering = (f"-{SEARCH_RANK}", "id")
+
+        for backend in getattr(view, "filter_backends", []):
+            if hasattr(backend, "get_ordering") and request.query_params.get(getattr(backend, "ordering_param", "")):
+                requested = backend().get_ordering(request, queryset, view) or ()
+                columns = [_keyset_column(queryset.model, field) for field in requested]
+                if requested and all(columns):
+                    tie_breaker = "-id" if requested[-1].startswith("-") else "id"
+                    ordering = [field for field in columns if field.lstrip("-") != "id"] + [tie_breaker]
+                break
+        return tuple(ordering)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            tokens = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            position = tokens["p"]
+            reverse = bool(tokens.get("r"))
+        except (TypeError, ValueError, KeyError) as e:
+            raise NotFound(self.invalid_cursor_message) from e
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        tokens = {"p": cursor.position}
+        if cursor.reverse:
+            tokens["r"] = 1
+        encoded = urlsafe_b64encode(json.dumps(tokens).encode()).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self._position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self._position(self.page[0])))
+
+    def _position(self, instance):
+        values = []
+        for field in self.ordering:
+            name = field.lstrip("-")
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(_encode_value(value))
+        return values
+
+
+def _flip(field):
+    return field[1:] if field.startswith("-") else f"-{field}"
+
+
+def _keyset_filter(ordering, position, *, reverse=False):
+    """Return rows strictly after ``position`` in ``ordering`` (before it when ``reverse``).
+
+    Expands the row comparison into ``a > x OR (a = x AND b > y) ...`` and adds
+    a redundant bound on the leading column so the database can start the
+    index range scan right at the cursor.
+    """
+    names = [field.lstrip("-") for field in ordering]
+    lookups = ["lt" if field.startswith("-") != reverse else "gt" for field in ordering]
+
+    after = Q()
+    for i, name in enumerate(names):
+        equal = {names[j]: position[j] for j in range(i)}
+        after |= Q(**equal, **{f"{name}__{lookups[i]}": position[i]})
+    return Q(**{f"{names[0]}__{lookups[0]}e": position[0]}) & after
+
+
+def _keyset_column(model, field):
+    """Return ``field`` as a plain non-null column of ``model``, or ``None`` when it is not one.
+
+    Foreign keys become their ``<name>_id`` column, so cursors hold the key rather than the related object.
+    """
+    name = field.lstrip("-")
+    if "__" in name:
+        return None
+    try:
+        model_field = model._meta.get_field(name)  # noqa: SLF001
+    except FieldDoesNotExist:
+        return None
+    if not model_field.concrete or model_field.many_to_many or model_field.null:
+        return None
+    return field.replace(name, model_field.attname, 1)
+
+
+def _encode_value(value):
+    # isoformat keeps microseconds, which the JSON encoders used by DRF drop
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, UUID | Decimal):
+        return str(value)
+    return value
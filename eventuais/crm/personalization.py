@@ -0,0 +1,232 @@
+"""Personalized rendering of campaign emails.
+
+Subject, text and HTML bodies are Django templates. Each email version (its
+primary key and ``updated_at``) is parsed once per process and the compiled
+templates are kept in memory, so rendering a recipient is only a render.
+
+Merge data for a chunk of recipients comes from one query: the contact's
+fields, its account name and its custom fields aggregated to JSON by a
+subquery. Templates see them as top-level variables (``{{ first_name }}``) and
+under ``contact``, ``account`` and ``custom_fields``. ``{{ open_url }}`` is
+the recipient's tracking pixel and ``{% track_click "https://..." %}`` a
+link through the click-tracking redirect; the tag is built into the engine
+campaign templates compile with, so they need no ``{% load %}``.
+
+With ``PERSONALIZATION_PROCESSES`` above one, chunks render on a process pool
+started once per worker. Daemonic processes such as Celery's prefork workers
+cannot have children; they render in process.
+
+A recipient whose email fails to render or is refused by the SMTP server is
+reported as failed by ``deliver`` and logged; the rest of the batch still
+goes out, so one bad template or address never holds up a campaign.
+"""
+
+import logging
+import multiprocessing
+import smtplib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import batched
+from itertools import repeat
+
+import django
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.aggregates import JSONBAgg
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail import get_connection
+from django.db.models import F
+from django.db.models import OuterRef
+from django.db.models import Subquery
+from django.db.models.functions import JSONObject
+from django.template import Context
+from django.template import Engine
+from django.template import Template
+from django.template import TemplateSyntaxError
+
+from .models import Contact
+from .models import CustomFieldValue
+from .tracking import open_url
+
+logger = logging.getLogger(__name__)
+
+# Contact fields available to templates as top-level variables
+MERGE_FIELDS = ["first_name", "last_name", "email", "title", "city", "state", "country"]
+
+# Recipients handed to one pool task
+RENDER_CHUNK_SIZE = 250
+
+# Email versions kept compiled per process
+MAX_COMPILED = 128
+
+# Tag libraries campaign templates use without loading them
+BUILTIN_TAGS = ["eventuais.crm.templatetags.campaign_tracking"]
+
+_compiled = {}
+
+
+def merge_data(contact_ids):
+    """Return the template context of each contact, keyed by contact id, in one query."""
+    custom_fields = (
+        CustomFieldValue.objects.filter(
+            content_type=ContentType.objects.get_for_model(Contact),
+            object_id=OuterRef("pk"),
+        )
+        .values("object_id")
+        .annotate(data=JSONBAgg(JSONObject(name="field__name", value="value")))
+        .values("data")
+    )
+    rows = (
+        Contact.objects.filter(pk__in=contact_ids)
+        .annotate(account_name=F("account__name"), custom_fields=Subquery(custom_fields))
+        .values("pk", "account_name", "custom_fields", *MERGE_FIELDS)
+    )
+
+    contexts = {}
+    for row in rows:
+        pk = row.pop("pk")
+        account = {"name": row.pop("account_name") or ""}
+        custom = {item["name"]: item["value"] for item in row.pop("custom_fields") or []}
+        contexts[pk] = {**row, "contact": row, "account": account, "custom_fields": custom}
+    return contexts
+
+
+def email_version(email):
+    return f"{email.pk}:{email.updated_at.isoformat()}"
+
+
+def email_sources(email):
+    return (email.subject, email.text_content or email.html_content, email.html_content)
+
+
+@lru_cache(maxsize=1)
+def template_engine():
+    """The engine campaign templates compile with: Django's defaults plus ``BUILTIN_TAGS``."""
+    return Engine(builtins=BUILTIN_TAGS)
+
+
+def compiled_templates(version, sources):
+    """Return the compiled ``(subject, text, html)`` templates of an email version, parsing them at most once."""
+    templates = _compiled.get(version)
+    if templates is None:
+        if len(_compiled) >= MAX_COMPILED:
+            _compiled.clear()
+        templates = _compiled[version] = tuple(Template(source, engine=template_engine()) for source in sources)
+    return templates
+
+
+def render_chunk(version, sources, contexts):
+    """Render ``(subject, text, html)`` for each context, or None where rendering fails.
+
+    Only the HTML body is autoescaped.
+    """
+    try:
+        templates = compiled_templates(version, sources)
+    except TemplateSyntaxError:
+        logger.warning("Email %s does not compile", version, exc_info=True)
+        return [None] * len(contexts)
+    return [_render(templates, context) for context in contexts]
+
+
+def _render(templates, context):
+    subject, text, html = templates
+    try:
+        return (
+            subject.render(Context(context, autoescape=False)).strip(),
+            text.render(Context(context, autoescape=False)),
+            html.render(Context(context)),
+        )
+    except Exception:
+        logger.warning("Could not render an email to %s", context.get("email"), exc_info=True)
+        return None
+
+
+def render_emails(email, contexts, extra=None, processes=None):
+    """Render ``email`` for each context, in order, merging ``extra`` into every context; None where it fails.
+
+    ``processes`` overrides ``PERSONALIZATION_PROCESSES``.
+    """
+    version, sources = email_version(email), email_sources(email)
+    chunks = [[{**context, **(extra or {})} for context in chunk] for chunk in batched(contexts, RENDER_CHUNK_SIZE)]
+    processes = settings.PERSONALIZATION_PROCESSES if processes is None else processes
+    pool = _process_pool(processes) if len(chunks) > 1 else None
+    if pool is None:
+        rendered = (render_chunk(version, sources, chunk) for chunk in chunks)
+    else:
+        rendered = pool.map(render_chunk, repeat(version), repeat(sources), chunks)
+    return [message for chunk in rendered for message in chunk]
+
+
+def build_messages(campaign, email, recipients):
+    """Return ``(recipient_id, message)`` for each ``(recipient_id, contact_id)`` whose contact still exists.
+
+    The message is None for recipients whose email failed to render.
+    """
+    contexts = merge_data([contact_id for _, contact_id in recipients])
+    recipients = [
+        (
+            pk,
+            {
+                **contexts[contact_id],
+                "open_url": open_url(campaign.pk, pk, email.pk),
+                # Read by ``{% track_click %}``
+                "click_tracking": (campaign.pk, pk, email.pk),
+            },
+        )
+        for pk, contact_id in recipients
+        if contact_id in contexts
+    ]
+    rendered = render_emails(
+        email, [context for _, context in recipients], extra={"campaign": {"name": campaign.name}}
+    )
+
+    messages = []
+    for (pk, context), parts in zip(recipients, rendered, strict=True):
+        if parts is None:
+            messages.append((pk, None))
+            continue
+        subject, text, html = parts
+        message = EmailMultiAlternatives(subject, text, settings.DEFAULT_FROM_EMAIL, [context["email"]])
+        message.attach_alternative(html, "text/html")
+        messages.append((pk, message))
+    return messages
+
+
+def deliver(campaign, email, recipients):
+    """Render and send ``email`` to ``(recipient_id, contact_id)`` pairs over one SMTP connection.
+
+    Return the ids of the recipients it went out to and of those whose
+    message failed to render or was refused; recipients whose contact no
+    longer exists are in neither.
+    """
+    sent, failed = [], []
+    messages = build_messages(campaign, email, recipients)
+    with get_connection() as connection:
+        for pk, message in messages:
+            if message is None:
+                failed.append(pk)
+                continue
+            try:
+                connection.send_messages([message])
+            except (smtplib.SMTPException, OSError):
+                logger.warning("Could not send email %s to recipient %s", email.pk, pk, exc_info=True)
+                failed.append(pk)
+            else:
+                sent.append(pk)
+    return sent, failed
+
+
+def _process_pool(processes):
+    if processes <= 1 or multiprocessing.current_process().daemon:
+        return None
+    return _start_pool(processes)
+
+
+@lru_cache(maxsize=2)
+def _start_pool(processes):
+    # Spawned children share no database connection with this process
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=django.setup,
+    )
@@ -0,0 +1,410 @@
+"""Compile ``Report`` configurations into aggregate queries and cache their results.
+
+A report reads one source table and groups it::
+
+    report_type   picks the source (``custom`` reports name it in ``query_params["source"]``)
+    query_params  {"group_by": ["stage"],
+                   "metrics": [{"name": "total", "function": "sum", "field": "amount"}],
+                   "period": {"field": "created_at", "unit": "month"},
+                   "limit": 100}
+    filters       [{"field": "stage", "op": "in", "value": ["proposal", "negotiation"]}]
+    display_columns / sort_by / sort_direction   shape the output rows
+
+Everything compiles to one ``values().annotate()`` query, so grouping and
+aggregation run in the database. Only whitelisted fields of each source may be
+grouped, filtered or aggregated.
+
+Results are cached under a key made of the compiled configuration and the
+current data version of every table the source reads. Writes to those tables
+replace the version (see ``bump_data_version``), which retires the old keys.
+"""
+
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Avg
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import Max
+from django.db.models import Min
+from django.db.models import Q
+from django.db.models import Sum
+from django.db.models.functions import TruncDay
+from django.db.models.functions import TruncMonth
+from django.db.models.functions import TruncQuarter
+from django.db.models.functions import TruncWeek
+from django.db.models.functions import TruncYear
+
+from eventuais.crm.models import Account
+from eventuais.crm.models import Activity
+from eventuais.crm.models import Campaign
+from eventuais.crm.models import CampaignRecipient
+from eventuais.crm.models import Contact
+from eventuais.crm.models import Opportunity
+from eventuais.crm.models import Report
+from eventuais.crm.models import SupportTicket
+
+from .segments import OPERATORS
+
+AGGREGATES = {"count": Count, "sum": Sum, "avg": Avg, "min": Min, "max": Max}
+
+PERIODS = {"day": TruncDay, "week": TruncWeek, "month": TruncMonth, "quarter": TruncQuarter, "year": TruncYear}
+
+DEFAULT_LIMIT = 1000
+
+# ``fields`` may be grouped on and filtered; ``numeric`` and ``dates`` also
+# allow aggregates and periods. ``tables`` are the models whose writes change
+# the result, used for the data-version part of the cache key.
+SOURCES = {
+    "opportunity": {
+        "model": Opportunity,
+        "tables": [Opportunity, Account],
+        "fields": {
+            "stage",
+            "account",
+            "account__name",
+            "account__industry",
+            "account__account_type",
+            "primary_contact",
+            "assigned_to",
+            "assigned_to__name",
+            "probability",
+            "amount",
+            "expected_close_date",
+            "created_at",
+        },
+        "numeric": {"amount", "probability"},
+        "dates": {"expected_close_date", "created_at"},
+        "group_by": ["stage"],
+        "metrics": [
+            {"name": "count", "function": "count"},
+            {"name": "total_amount", "function": "sum", "field": "amount"},
+        ],
+    },
+    "activity": {
+        "model": Activity,
+        "tables": [Activity],
+        "fields": {
+            "activity_type",
+            "is_completed",
+            "content_type__model",
+            "performed_by",
+            "performed_by__name",
+            "assigned_to",
+            "assigned_to__name",
+            "start_date",
+            "due_date",
+            "created_at",
+        },
+        "numeric": set(),
+        "dates": {"start_date", "due_date", "completion_date", "created_at"},
+        "group_by": ["activity_type"],
+        "metrics": [{"name": "count", "function": "count"}],
+    },
+    "contact": {
+        "model": Contact,
+        "tables": [Contact, Account],
+        "fields": {
+            "status",
+            "city",
+            "state",
+            "country",
+            "account",
+            "account__name",
+            "account__industry",
+            "assigned_to",
+            "assigned_to__name",
+            "email_opt_out",
+            "created_at",
+        },
+        "numeric": set(),
+        "dates": {"created_at"},
+        "group_by": ["status"],
+        "metrics": [{"name": "count", "function": "count"}],
+    },
+    "account": {
+        "model": Account,
+        "tables": [Account],
+        "fields": {
+            "account_type",
+            "industry",
+            "city",
+            "state",
+            "country",
+            "assigned_to",
+            "assigned_to__name",
+            "annual_revenue",
+            "employee_count",
+            "created_at",
+        },
+        "numeric": {"annual_revenue", "employee_count"},
+        "dates": {"created_at"},
+        "group_by": ["account_type"],
+        "metrics": [{"name": "count", "function": "count"}],
+    },
+    "campaign_recipient": {
+        "model": CampaignRecipient,
+        "tables": [CampaignRecipient, Campaign],
+        "fields": {
+            "campaign",
+            "campaign__name",
+            "campaign__status",
+            "status",
+            "sent_at",
+            "opened_at",
+            "clicked_at",
+            "created_at",
+        },
+        "numeric": set(),
+        "dates": {"sent_at", "opened_at", "clicked_at", "created_at"},
+        "group_by": ["campaign__name", "status"],
+        "metrics": [{"name": "count", "function": "count"}],
+    },
+    "support_ticket": {
+        "model": SupportTicket,
+        "tables": [SupportTicket, Account],
+        "fields": {
+            "status",
+            "priority",
+            "category",
+            "is_overdue",
+            "account",
+            "account__name",
+            "assigned_to",
+            "assigned_to__name",
+            "resolved_at",
+            "created_at",
+        },
+        "numeric": set(),
+        "dates": {"resolved_at", "due_by", "created_at"},
+        "group_by": ["status", "priority"],
+        "metrics": [{"name": "count", "function": "count"}],
+    },
+}
+
+TYPE_SOURCES = {
+    Report.ReportType.SALES: "opportunity",
+    Report.ReportType.ACTIVITY: "activity",
+    Report.ReportType.CONTACT: "contact",
+    Report.ReportType.CAMPAIGN: "campaign_recipient",
+    Report.ReportType.SUPPORT: "support_ticket",
+}
+
+
+# Report fields that change what ``compile_report`` produces
+REPORT_CONFIG_FIELDS = ["report_type", "query_params", "filters", "display_columns", "sort_by", "sort_direction"]
+
+
+class ReportConfigError(ValueError):
+    """Raised when a report configuration cannot be compiled."""
+
+
+def report_source(report):
+    """Return the name of the source table a report reads."""
+    if report.report_type == Report.ReportType.CUSTOM:
+        source = (report.query_params or {}).get("source")
+    else:
+        source = TYPE_SOURCES.get(report.report_type)
+    if source not in SOURCES:
+        msg = f"Unknown report source {source!r}; expected one of {', '.join(sorted(SOURCES))}"
+        raise ReportConfigError(msg)
+    return source
+
+
+def compile_report(report):
+    """Return ``(queryset, columns)`` computing the report rows in a single aggregate query."""
+    source_name = report_source(report)
+    source = SOURCES[source_name]
+    params = report.query_params or {}
+
+    queryset = source["model"].objects.filter(_compile_filters(source, report.filters or []))
+
+    group_by = params.get("group_by", source["group_by"])
+    if not isinstance(group_by, list) or not all(isinstance(field, str) for field in group_by):
+        msg = "group_by must be a list of field names"
+        raise ReportConfigError(msg)
+    for field in group_by:
+        _check_field(source, field)
+
+    expressions = {}
+    if params.get("period"):
+        expressions["period"] = _compile_period(source, params["period"])
+    columns = [*group_by, *expressions]
+
+    metrics = _compile_metrics(source, params.get("metrics", source["metrics"]), taken=columns)
+    queryset = queryset.annotate(**expressions).values(*columns).annotate(**metrics)
+    columns += list(metrics)
+
+    queryset = queryset.order_by(*_compile_ordering(report, columns, group_by + list(expressions)))
+
+    limit = params.get("limit", DEFAULT_LIMIT)
+    if not isinstance(limit, int) or not 0 < limit <= DEFAULT_LIMIT:
+        msg = f"limit must be an integer between 1 and {DEFAULT_LIMIT}"
+        raise ReportConfigError(msg)
+
+    display = report.display_columns or columns
+    unknown = [column for column in display if column not in columns]
+    if unknown:
+        msg = f"Unknown display columns: {', '.join(unknown)}"
+        raise ReportConfigError(msg)
+    return queryset[:limit], display
+
+
+def run_report(report):
+    """Return the report rows, from the cache when no source table changed since the last run."""
+    queryset, columns = compile_report(report)
+    key = report_cache_key(report)
+    cached = cache.get(key)
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    data = [{column: row[column] for column in columns} for row in queryset]
+    # Round-trip through JSON so cached and fresh results look the same to the caller
+    result = json.loads(json.dumps({"columns": columns, "data": data, "count": len(data)}, cls=DjangoJSONEncoder))
+    cache.set(key, result, settings.REPORT_CACHE_TIMEOUT)
+    return {**result, "cached": False}
+
+
+def cached_results(keys):
+    """Return the cached rows of the report cache ``keys`` that have them, as ``run_report`` would, in one read."""
+    return {key: {**result, "cached": True} for key, result in cache.get_many(keys).items()}
+
+
+def report_cache_key(report):
+    source = SOURCES[report_source(report)]
+    config = {field: getattr(report, field) for field in REPORT_CONFIG_FIELDS}
+    config["versions"] = data_versions(source["tables"])
+    digest = hashlib.sha256(json.dumps(config, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()
+    return f"crm:report:{digest}"
+
+
+def data_versions(models):
+    """Return the current data version stamp of each model's table."""
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_data_version(model):
+    """Give ``model``'s table a new data version once the current transaction commits."""
+    transaction.on_commit(lambda: cache.set(_version_key(model), uuid.uuid4().hex, None))
+
+
+def _version_key(model):
+    return f"crm:data-version:{model._meta.label_lower}"  # noqa: SLF001
+
+
+def _check_field(source, field, allowed=None):
+    if field not in (allowed if allowed is not None else source["fields"]):
+        msg = f"Field {field!r} is not available for this report"
+        raise ReportConfigError(msg)
+
+
+def _compile_filters(source, filters):
+    if not isinstance(filters, list):
+        msg = "filters must be a list"
+        raise ReportConfigError(msg)
+
+    q = Q()
+    for node in filters:
+        if not isinstance(node, dict) or "field" not in node:
+            msg = f"Invalid filter {node!r}"
+            raise ReportConfigError(msg)
+        _check_field(source, node["field"], source["fields"] | source["dates"])
+        op = node.get("op", "eq")
+        if op not in OPERATORS:
+            msg = f"Unknown operator {op!r}"
+            raise ReportConfigError(msg)
+        value = _filter_value(source["model"], node["field"], op, node.get("value"))
+        condition = Q(**{f"{node['field']}__{OPERATORS[op]}": value})
+        q &= ~condition if op == "ne" else condition
+    return q
+
+
+def _filter_value(model, path, op, value):
+    """Return a filter value converted to the Python type of the field at ``path``.
+
+    A value the field cannot hold fails here, not when the query runs.
+    """
+    if op == "isnull" and isinstance(value, bool):
+        return value
+    if op in {"startswith", "contains"} and isinstance(value, str):
+        return value
+    if op == "in" and not isinstance(value, list):
+        msg = "'in' expects a list value"
+        raise ReportConfigError(msg)
+
+    *relations, name = path.split("__")
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model  # noqa: SLF001
+    field = model._meta.get_field(name)  # noqa: SLF001
+    try:
+        if op == "in":
+            return [field.to_python(item) for item in value]
+        if op in {"isnull", "startswith", "contains"}:
+            msg = f"{op!r} expects a {'boolean' if op == 'isnull' else 'string'} value"
+            raise ValidationError(msg)
+        return field.to_python(value)
+    except (ValidationError, TypeError, ValueError) as e:
+        msg = f"Invalid value {value!r} for {path!r}"
+        raise ReportConfigError(msg) from e
+
+
+def _compile_period(source, period):
+    if not isinstance(period, dict) or period.get("unit") not in PERIODS:
+        msg = f"period needs a field and a unit among {', '.join(PERIODS)}"
+        raise ReportConfigError(msg)
+    _check_field(source, period.get("field"), source["dates"])
+    return PERIODS[period["unit"]](period["field"])
+
+
+def _compile_metrics(source, metrics, taken):
+    if not isinstance(metrics, list) or not metrics:
+        msg = "metrics must be a non-empty list"
+        raise ReportConfigError(msg)
+
+    # Annotations may not shadow the grouped columns or any field of the model
+    reserved = set(taken)
+    for model_field in source["model"]._meta.get_fields():  # noqa: SLF001
+        reserved.update({model_field.name, getattr(model_field, "attname", model_field.name)})
+    compiled = {}
+    for metric in metrics:
+        function = AGGREGATES.get(metric.get("function")) if isinstance(metric, dict) else None
+        name = metric.get("name") if isinstance(metric, dict) else None
+        if function is None or not name or not str(name).isidentifier():
+            msg = f"Invalid metric {metric!r}"
+            raise ReportConfigError(msg)
+        if name in reserved or name in compiled:
+            msg = f"Metric name {name!r} is already a column or a field of this report's source"
+            raise ReportConfigError(msg)
+
+        field = metric.get("field")
+        if function is Count:
+            if field is not None:
+                _check_field(source, field)
+            compiled[name] = Count(field or "pk", distinct=bool(metric.get("distinct")))
+        else:
+            _check_field(source, field, source["numeric"])
+            compiled[name] = function(field)
+    return compiled
+
+
+def _compile_ordering(report, columns, default):
+    if not report.sort_by:
+        return default or columns[:1]
+    if report.sort_by not in columns:
+        msg = f"Cannot sort by {report.sort_by!r}; it is not a report column"
+        raise ReportConfigError(msg)
+    if report.sort_direction == "asc":
+        return [F(report.sort_by).asc(nulls_last=True)]
+    return [F(report.sort_by).desc(nulls_last=True)]
@@ -0,0 +1,179 @@
+"""Materialized totals of account hierarchies.
+
+``AccountRollup`` holds, for every account, the totals of the account and
+all its MPTT descendants: annual revenue, open pipeline (the amount of
+opportunities not closed won or lost), support tickets and contacts. The
+org tree reads them with the accounts, instead of aggregating each node's
+``get_descendants()`` per request.
+
+They are kept current incrementally. A saved or deleted contact, ticket or
+opportunity adds the difference it makes to its account and the account's
+ancestors, in one ``UPDATE ... SET x = x + delta`` over the ancestors'
+``tree_id``/``lft``/``rght`` range. The values a row was loaded with come
+from ``RollupSourceMixin``. An account moved to another parent takes its
+totals from the old ancestors to the new ones. Deleting an account, which
+cascades through its subtree and ``SET_NULL``\\s its contacts without
+signals, rebuilds the tree once the cascade is done, as do the bulk imports.
+
+The rollups live in their own table so that saving an ``Account`` never
+writes back totals it read before a concurrent increment.
+"""
+
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import OuterRef
+from django.db.models import Subquery
+from django.db.models import Sum
+
+from .models import Account
+from .models import AccountRollup
+from .models import Contact
+from .models import Opportunity
+from .models import SupportTicket
+
+ROLLUP_FIELDS = ("annual_revenue", "open_pipeline", "ticket_count", "contact_count")
+
+# Opportunities that no longer count towards the open pipeline
+CLOSED_STAGES = (Opportunity.Stage.CLOSED_WON, Opportunity.Stage.CLOSED_LOST)
+
+
+def _amounts(model, values):
+    """The account a contact, ticket or opportunity with ``values`` hangs off and what it adds to its rollups."""
+    if model is Opportunity:
+        is_open = values["stage"] not in CLOSED_STAGES
+        return values["account_id"], {"open_pipeline": (values["amount"] or 0) if is_open else 0}
+    if model is SupportTicket:
+        return values["account_id"], {"ticket_count": 1}
+    return values["account_id"], {"contact_count": 1}
+
+
+def adjust(account_id, deltas):
+    """Add ``deltas`` to the rollups of ``account_id`` and all its ancestors, in one query."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if account_id is None or not deltas:
+        return
+    node = Account.objects.filter(pk=account_id)
+    ancestors = Account.objects.filter(
+        tree_id=Subquery(node.values("tree_id")),
+        lft__lte=Subquery(node.values("lft")),
+        rght__gte=Subquery(node.values("rght")),
+    )
+    AccountRollup.objects.filter(account__in=ancestors.values("pk")).update(
+        **{field: F(field) + delta for field, delta in deltas.items()},
+    )
+
+
+def _negated(deltas):
+    return {field: -delta for field, delta in deltas.items()}
+
+
+def remember_loaded(instance):
+    """Read the rollup fields of a row that was not loaded from the database, before it is saved over."""
+    if instance._state.adding or getattr(instance, "loaded_rollup_values", None) is not None:  # noqa: SLF001
+        return
+    model = type(instance)
+    rows = model._base_manager.filter(pk=instance.pk)  # noqa: SLF001
+    instance.loaded_rollup_values = rows.values(*model.rollup_fields).first()
+
+
+def record_save(instance, *, created):
+    """Adjust the rollups by the difference a saved row makes."""
+    model = type(instance)
+    loaded = None if created else getattr(instance, "loaded_rollup_values", None)
+    saved = {name: getattr(instance, name) for name in model.rollup_fields}
+    instance.loaded_rollup_values = saved
+
+    if model is Account:
+        _record_account_save(instance, loaded, saved)
+        return
+    old_account, old_amounts = _amounts(model, loaded) if loaded else (None, {})
+    new_account, new_amounts = _amounts(model, saved)
+    if old_account == new_account:
+        adjust(new_account, {field: new_amounts[field] - old_amounts.get(field, 0) for field in new_amounts})
+    else:
+        adjust(old_account, _negated(old_amounts))
+        adjust(new_account, new_amounts)
+
+
+def _record_account_save(account, loaded, saved):
+    revenue = saved["annual_revenue"] or 0
+    if loaded is None:
+        AccountRollup.objects.create(account=account, annual_revenue=revenue)
+        adjust(saved["parent_id"], {"annual_revenue": revenue})
+        return
+
+    if loaded["parent_id"] != saved["parent_id"]:
+        # The subtree keeps its totals; they move from the old ancestors to the new ones
+        totals = AccountRollup.objects.filter(account=account).values(*ROLLUP_FIELDS).first() or {}
+        adjust(loaded["parent_id"], _negated(totals))
+        adjust(saved["parent_id"], totals)
+    adjust(account.pk, {"annual_revenue": revenue - (loaded["annual_revenue"] or 0)})
+
+
+def record_delete(instance, origin):
+    """Take a deleted row out of the rollups."""
+    if isinstance(instance, Account):
+        # Once per deleted subtree, after its cascade; a queryset delete rebuilds per account
+        if not isinstance(origin, Account) or origin.pk == instance.pk:
+            rebuild_trees([instance.tree_id])
+        return
+    if isinstance(origin, Account) or getattr(origin, "model", None) is Account:
+        # The account cascade rebuilds the tree afterwards
+        return
+    values = getattr(instance, "loaded_rollup_values", None) or {
+        name: getattr(instance, name) for name in type(instance).rollup_fields
+    }
+    account_id, amounts = _amounts(type(instance), values)
+    adjust(account_id, _negated(amounts))
+
+
+def _per_account(rows, total):
+    """``total`` over the ``rows`` of the outer account, as a correlated subquery."""
+    return Subquery(
+        rows.filter(account=OuterRef("pk")).order_by().values("account").annotate(total=total).values("total"),
+    )
+
+
+def subtree_totals(accounts, opportunities, tickets, contacts):
+    """Return ``{account_id: {rollup field: total}}`` for ``accounts``, whole trees, in one query."""
+    nodes = (
+        accounts.annotate(
+            own_pipeline=_per_account(opportunities.exclude(stage__in=CLOSED_STAGES), Sum("amount")),
+            own_tickets=_per_account(tickets, Count("pk")),
+            own_contacts=_per_account(contacts, Count("pk")),
+        )
+        .order_by("-lft")
+        .values_list("pk", "parent_id", "annual_revenue", "own_pipeline", "own_tickets", "own_contacts")
+    )
+    totals = {}
+    parents = {}
+    for pk, parent_id, *own in nodes:
+        parents[pk] = parent_id
+        totals[pk] = {field: value or 0 for field, value in zip(ROLLUP_FIELDS, own, strict=True)}
+
+    # Descendants have larger ``lft`` than their ancestors, so each node is complete before its parent
+    for pk, parent_id in parents.items():
+        if parent_id in totals:
+            for field in ROLLUP_FIELDS:
+                totals[parent_id][field] += totals[pk][field]
+    return totals
+
+
+def rebuild_trees(tree_ids):
+    """Recompute the rollups of every account in the trees ``tree_ids``."""
+    tree_ids = set(tree_ids)
+    if not tree_ids:
+        return
+    totals = subtree_totals(
+        Account.objects.filter(tree_id__in=tree_ids),
+        Opportunity.objects.all(),
+        SupportTicket.objects.all(),
+        Contact.objects.all(),
+    )
+    AccountRollup.objects.bulk_create(
+        [AccountRollup(account_id=pk, **values) for pk, values in totals.items()],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["account"],
+        update_fields=list(ROLLUP_FIELDS),
+    )
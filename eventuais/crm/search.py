@@ -0,0 +1,84 @@
+"""Full-text search vectors and queries.
+
+Each searchable model has a weighted ``tsvector`` built from its text columns
+(``SEARCH_WEIGHTS``) and a GIN index on that very expression, declared in the
+model's ``Meta``. Expression indexes are maintained by Postgres itself, so
+``save()``, ``bulk_create``, ``update()`` and raw SQL all keep them current
+and rows carry no extra column.
+
+The ``simple`` configuration lowercases words without stemming or stop
+words, which suits names, emails and mixed-language text. Queries match
+every term as a word prefix (``ana`` finds ``Anabela``), and results are
+ranked with ``ts_rank`` so hits in A-weighted columns come first.
+
+Plain prefix lookups (see ``typeahead``) use btree indexes from
+:func:`prefix_index` instead.
+"""
+
+import operator
+import re
+from functools import reduce
+
+from django.contrib.postgres.indexes import OpClass
+from django.contrib.postgres.search import SearchQuery
+from django.contrib.postgres.search import SearchVector
+from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Replace
+from django.db.models.functions import Upper
+
+SEARCH_CONFIG = "simple"
+
+
+def _email(field):
+    # The parser keeps a whole address as one word; the split copy makes "ana@exa" match it too
+    return [field, Replace(field, Value("@"), Value(" "))]
+
+
+# Columns (or expressions) of each model's search vector by weight, A ranking highest
+SEARCH_WEIGHTS = {
+    "crm.Account": {"A": ["name", *_email("email")], "B": ["phone"], "C": ["city", "country"], "D": ["description"]},
+    "crm.Activity": {"A": ["subject"], "D": ["description"]},
+    "crm.Contact": {
+        "A": ["first_name", "last_name", *_email("email")],
+        "B": ["phone", "mobile"],
+        "C": ["city", "country"],
+        "D": ["description"],
+    },
+    "crm.MarketingEmail": {"A": ["name", "subject"], "D": ["text_content", "html_content"]},
+    "crm.Opportunity": {"A": ["name"], "B": ["next_step"], "D": ["description"]},
+    "crm.SupportTicket": {"A": ["subject"], "B": ["category"], "D": ["description"]},
+}
+
+# Longest search input turned into a query
+MAX_SEARCH_TERMS = 8
+
+_WORD = re.compile(r"\w")
+
+
+def search_vector(label):
+    """The weighted ``tsvector`` expression of a model, identical in its index and in queries."""
+    return reduce(
+        operator.add,
+        (
+            SearchVector(*fields, weight=weight, config=SEARCH_CONFIG)
+            for weight, fields in SEARCH_WEIGHTS[label].items()
+        ),
+    )
+
+
+def prefix_query(terms):
+    """AND together every term as a quoted prefix match, or return ``None`` if no term has a word in it."""
+    quoted = [
+        "'{}':*".format(term.replace("\\", "\\\\").replace("'", "''"))
+        for term in terms[:MAX_SEARCH_TERMS]
+        if _WORD.search(term)
+    ]
+    if not quoted:
+        return None
+    return SearchQuery(" & ".join(quoted), search_type="raw", config=SEARCH_CONFIG)
+
+
+def prefix_index(field, name):
+    """An index answering case-insensitive prefix matches (``field__istartswith``) on ``field``."""
+    return models.Index(OpClass(Upper(field), name="text_pattern_ops"), name=name)
@@ -0,0 +1,331 @@
+"""Compile ``Segment.criteria`` into a single queryset over :class:`Contact`.
+
+Criteria are a JSON tree made of the following nodes::
+
+    {"and": [node, ...]}
+    {"or": [node, ...]}
+    {"not": node}
+    {"field": "status", "op": "eq", "value": "lead"}
+    {"tag": "vip"}  # or {"tag": ["vip", "partner"]} for any of several tags
+    {"custom_field": "Tier", "op": "eq", "value": "gold"}
+    {"activity": {"within_days": 30, "type": "email"}}
+
+Tag, custom field and activity nodes compile to ``EXISTS`` sub-queries, so the
+whole tree is evaluated by the database in one statement. Custom fields of a
+typed kind (number, date, boolean, ...) compare the value parsed into their
+typed column, as ``custom_fields.custom_field_filter`` does, so ``"10"`` is
+greater than ``"9"``.
+
+Every node also gets a rough cost: predicates that an index can drive are cheap,
+everything else is a full scan of the contacts table. A tree is rejected when
+the planner would have no choice but to scan, i.e. when an ``and`` has no cheap
+child, an ``or`` has an expensive branch, or the root is a ``not``.
+"""
+
+from datetime import timedelta
+from decimal import InvalidOperation
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db.models import Exists
+from django.db.models import OuterRef
+from django.db.models import Q
+from django.utils import timezone
+
+from eventuais.crm.custom_fields import field_definitions
+from eventuais.crm.models import Activity
+from eventuais.crm.models import Contact
+from eventuais.crm.models import CustomFieldValue
+from eventuais.crm.typed_values import COLUMN_LOOKUPS
+from eventuais.crm.typed_values import PARSERS
+from eventuais.crm.typed_values import TYPED_COLUMNS
+
+# Comparison operators accepted in field and custom field nodes, mapped to ORM lookups
+OPERATORS = {
+    "eq": "exact",
+    "ne": "exact",
+    "in": "in",
+    "gt": "gt",
+    "gte": "gte",
+    "lt": "lt",
+    "lte": "lte",
+    "startswith": "startswith",
+    "contains": "icontains",
+    "isnull": "isnull",
+}
+
+# Operators a b-tree index can serve
+INDEXABLE_OPERATORS = {"eq", "in", "gt", "gte", "lt", "lte", "startswith"}
+
+# Contact fields that may appear in field nodes
+FILTERABLE_FIELDS = {
+    "id",
+    "first_name",
+    "last_name",
+    "title",
+    "email",
+    "phone",
+    "mobile",
+    "city",
+    "state",
+    "postal_code",
+    "country",
+    "status",
+    "date_of_birth",
+    "email_opt_out",
+    "phone_opt_out",
+    "account",
+    "assigned_to",
+    "created_by",
+    "parent",
+    "created_at",
+    "updated_at",
+    "account__name",
+    "account__industry",
+    "account__account_type",
+}
+
+# Fields backed by an index on the contacts table (the leading column of one)
+INDEXED_FIELDS = {
+    "id",
+    "email",
+    "last_name",
+    "status",
+    "account",
+    "assigned_to",
+    "created_by",
+    "parent",
+    "created_at",
+}
+
+INDEX_COST = 1
+SCAN_COST = 100
+
+
+class SegmentCriteriaError(ValueError):
+    """Raised when segment criteria are malformed or too expensive to run."""
+
+
+def compile_criteria(criteria, *, check_cost=True):
+    """Return a ``Q`` object selecting the contacts matched by ``criteria``."""
+    if not criteria:
+        msg = "Dynamic segment criteria must contain at least one filter."
+        raise SegmentCriteriaError(msg)
+
+    query, cost = _compile_node(criteria)
+    if check_cost and cost >= SCAN_COST:
+        msg = (
+            "Segment criteria would require a full scan of contacts. "
+            f"Combine them with a filter on an indexed field ({', '.join(sorted(INDEXED_FIELDS))}), "
+            "a tag or a custom field."
+        )
+        raise SegmentCriteriaError(msg)
+    return query
+
+
+def estimate_cost(criteria):
+    """Return the estimated cost of running ``criteria``; ``SCAN_COST`` or more means a full scan."""
+    return _compile_node(criteria)[1]
+
+
+def criteria_dependencies(criteria):
+    """Return the node kinds (``field``, ``tag``, ``custom_field``, ``activity``) used by ``criteria``.
+
+    Field nodes on the contact's account (``account__*``) also add ``account``.
+    """
+    if not isinstance(criteria, dict):
+        return set()
+    for key in ("and", "or"):
+        if isinstance(criteria.get(key), list):
+            return set().union(*(criteria_dependencies(child) for child in criteria[key]))
+    if "not" in criteria:
+        return criteria_dependencies(criteria["not"])
+    kinds = {kind for kind in ("field", "tag", "custom_field", "activity") if kind in criteria}
+    if str(criteria.get("field", "")).startswith("account__"):
+        kinds.add("account")
+    return kinds
+
+
+def segment_queryset(segment, *, check_cost=True):
+    """Return the contacts matching a segment's criteria, evaluated live."""
+    return Contact.objects.filter(compile_criteria(segment.criteria, check_cost=check_cost))
+
+
+def _compile_node(node):
+    if not isinstance(node, dict) or not node:
+        msg = f"Invalid criteria node: {node!r}"
+        raise SegmentCriteriaError(msg)
+
+    if "and" in node:
+        children = [_compile_node(child) for child in _node_list(node, "and")]
+        query = Q()
+        for child_query, _ in children:
+            query &= child_query
+        return query, min(cost for _, cost in children)
+
+    if "or" in node:
+        children = [_compile_node(child) for child in _node_list(node, "or")]
+        query = Q()
+        for child_query, _ in children:
+            query |= child_query
+        return query, min(SCAN_COST, sum(cost for _, cost in children))
+
+    if "not" in node:
+        child_query, _ = _compile_node(node["not"])
+        return ~child_query, SCAN_COST
+
+    if "field" in node:
+        return _compile_field(node)
+
+    if "tag" in node:
+        return _compile_tag(node["tag"])
+
+    if "custom_field" in node:
+        return _compile_custom_field(node)
+
+    if "activity" in node:
+        return _compile_activity(node["activity"])
+
+    msg = f"Unknown criteria node: {next(iter(node))!r}"
+    raise SegmentCriteriaError(msg)
+
+
+def _node_list(node, key):
+    children = node[key]
+    if not isinstance(children, list) or not children:
+        msg = f"'{key}' expects a non-empty list of nodes"
+        raise SegmentCriteriaError(msg)
+    return children
+
+
+def _lookup(node):
+    op = node.get("op", "eq")
+    if op not in OPERATORS:
+        msg = f"Unknown operator {op!r}; expected one of {', '.join(OPERATORS)}"
+        raise SegmentCriteriaError(msg)
+    if "value" not in node:
+        msg = f"Criteria node {node!r} has no value"
+        raise SegmentCriteriaError(msg)
+
+    value = node["value"]
+    if op == "in" and not isinstance(value, list):
+        msg = "'in' expects a list value"
+        raise SegmentCriteriaError(msg)
+    return op, OPERATORS[op], value
+
+
+def _compile_field(node):
+    field = node["field"]
+    if field not in FILTERABLE_FIELDS:
+        msg = f"Cannot filter contacts on {field!r}"
+        raise SegmentCriteriaError(msg)
+
+    op, lookup, value = _lookup(node)
+    query = Q(**{f"{field}__{lookup}": _field_value(field, op, value)})
+    if op == "ne":
+        query = ~query
+
+    cost = INDEX_COST if field in INDEXED_FIELDS and op in INDEXABLE_OPERATORS else SCAN_COST
+    return query, cost
+
+
+def _field_value(path, op, value):
+    """Return a field node's value converted to the Python type of the contact field at ``path``.
+
+    A value the field cannot hold fails when the criteria compile, not when the query runs.
+    """
+    if op == "isnull" and isinstance(value, bool):
+        return value
+    if op in {"startswith", "contains"} and isinstance(value, str):
+        return value
+
+    model = Contact
+    *relations, name = path.split("__")
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model  # noqa: SLF001
+    field = model._meta.get_field(name)  # noqa: SLF001
+    try:
+        if op == "in":
+            return [field.to_python(item) for item in value]
+        if op in {"isnull", "startswith", "contains"}:
+            msg = f"{op!r} expects a {'boolean' if op == 'isnull' else 'string'} value"
+            raise ValidationError(msg)
+        return field.to_python(value)
+    except (ValidationError, TypeError, ValueError) as e:
+        msg = f"Invalid value {value!r} for {path!r}"
+        raise SegmentCriteriaError(msg) from e
+
+
+def _compile_tag(value):
+    names = value if isinstance(value, list) else [value]
+    if not names or not all(isinstance(name, str) for name in names):
+        msg = "'tag' expects a tag name or a list of tag names"
+        raise SegmentCriteriaError(msg)
+
+    tagged = Contact.tags.through.objects.filter(contact_id=OuterRef("pk"), tag__name__in=names)
+    return Q(Exists(tagged)), INDEX_COST
+
+
+def _compile_custom_field(node):
+    op, lookup, value = _lookup(node)
+    name = node["custom_field"]
+    content_type = ContentType.objects.get_for_model(Contact)
+    definitions = {definition.name: definition for definition in field_definitions(content_type.pk).values()}
+    column = TYPED_COLUMNS.get(definitions[name].field_type, "value") if name in definitions else "value"
+    if column != "value":
+        lookup, value = _typed_lookup(name, column, op, lookup, value)
+
+    values = CustomFieldValue.objects.filter(
+        content_type=content_type,
+        object_id=OuterRef("pk"),
+        field__content_type=content_type,
+        field__name=name,
+        **{f"{column}__{lookup}": value},
+    )
+    if op == "ne":
+        return ~Q(Exists(values)), SCAN_COST
+    # The (field, content_type, object_id) unique index narrows the search to one field's values
+    return Q(Exists(values)), INDEX_COST
+
+
+def _typed_lookup(name, column, op, lookup, value):
+    """Return the lookup and parsed value comparing a typed custom field's column."""
+    if column == "json_value" and op == "contains":
+        # A multi-select contains every given choice
+        lookup = "contains"
+    allowed = COLUMN_LOOKUPS[column] | ({"in"} if "exact" in COLUMN_LOOKUPS[column] else set())
+    if lookup not in allowed:
+        msg = f"Custom field {name!r} does not support the {op!r} operator"
+        raise SegmentCriteriaError(msg)
+
+    parse = PARSERS[column]
+    try:
+        if lookup == "in":
+            return lookup, [parse(str(item).strip()) for item in value]
+        return lookup, parse(str(value).strip())
+    except (ValueError, InvalidOperation) as e:
+        msg = f"Invalid value for custom field {name!r}: {value!r}"
+        raise SegmentCriteriaError(msg) from e
+
+
+def _compile_activity(value):
+    if not isinstance(value, dict) or "within_days" not in value:
+        msg = "'activity' expects an object with 'within_days'"
+        raise SegmentCriteriaError(msg)
+
+    try:
+        days = int(value["within_days"])
+    except (TypeError, ValueError) as e:
+        msg = "'within_days' must be an integer"
+        raise SegmentCriteriaError(msg) from e
+
+    activities = Activity.objects.filter(
+        content_type=ContentType.objects.get_for_model(Contact),
+        object_id=OuterRef("pk"),
+        start_date__gte=timezone.now() - timedelta(days=days),
+    )
+    if value.get("type"):
+        activities = activities.filter(activity_type=value["type"])
+
+    # The (content_type, object_id, start_date) index looks up one contact at a time; recency alone still scans
+    return Q(Exists(activities)), SCAN_COST
@@ -0,0 +1,155 @@
+"""Deliver a campaign's first email to its pending recipients.
+
+Starting a campaign bumps its ``dispatch_generation`` and queues one
+``send_campaign`` task for its first batch. Each batch reads the next
+``CAMPAIGN_SEND_BATCH_SIZE`` pending recipients after the primary key the
+previous one stopped at, in one index range scan, and when done queues the
+task for the batch after it. Chaining keeps a single message per campaign on
+the broker, with a countdown of at most one batch interval (a few seconds at
+the default ``CAMPAIGN_SEND_RATE`` of 200 emails per second), well below the
+Redis ``visibility_timeout``; countdowns spanning the whole campaign would be
+redelivered, and so sent twice, once past it. At the default rate 500k
+recipients take about 40 minutes.
+
+A batch renders and sends its messages with ``personalization.deliver``
+over one SMTP connection and marks the delivered rows ``sent`` with a single
+``UPDATE`` by primary key, so nothing holds locks on the recipients table
+while mail is going out. Recipients whose email fails to render or is refused
+are marked ``failed`` and the chain moves on, so the campaign still
+completes. Delivery is at least once: a worker
+dying between the SMTP transaction and the update resends that batch when the
+campaign is dispatched again.
+
+Addresses on the suppression list are checked for the whole batch at once
+(see ``suppression``); their recipients are marked ``suppressed`` instead of
+being sent to. Pausing or cancelling a campaign stops the chain at its next
+batch. A batch only runs while the campaign is active and still on the
+generation it was queued for, so resuming a paused campaign starts a new chain
+and a batch left over from the old one exits instead of sending alongside it.
+Recipients that got the first email are queued for the next drip step (see
+``drips``).
+"""
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .drips import schedule_next_step
+from .engagement import record_transitions
+from .models import Campaign
+from .models import CampaignRecipient
+from .personalization import deliver
+from .reports import bump_data_version
+from .suppression import suppressed
+
+# Campaigns in these states may be (re)started
+STARTABLE_STATUSES = [Campaign.CampaignStatus.DRAFT, Campaign.CampaignStatus.SCHEDULED, Campaign.CampaignStatus.PAUSED]
+
+
+def sendable_recipients(campaign_id):
+    """Pending recipients whose contact has an email address and has not opted out."""
+    return CampaignRecipient.objects.filter(
+        campaign_id=campaign_id,
+        status=CampaignRecipient.RecipientStatus.PENDING,
+        contact__email_opt_out=False,
+    ).exclude(contact__email="")
+
+
+def first_email(campaign):
+    """The email a campaign send delivers; later ones in the sequence are for drips."""
+    return campaign.emails.order_by("sequence_order").first()
+
+
+def start_campaign(campaign):
+    """Mark ``campaign`` active if it may be started; return the dispatch generation this call started, or None.
+
+    The status change is a conditional ``UPDATE`` so two concurrent requests
+    cannot both dispatch the same campaign.
+    """
+    started = Campaign.objects.filter(pk=campaign.pk, status__in=STARTABLE_STATUSES).update(
+        status=Campaign.CampaignStatus.ACTIVE,
+        start_date=campaign.start_date or timezone.now(),
+        dispatch_generation=F("dispatch_generation") + 1,
+        updated_at=timezone.now(),
+    )
+    if not started:
+        return None
+    return Campaign.objects.filter(pk=campaign.pk).values_list("dispatch_generation", flat=True).get()
+
+
+def batch_countdown(elapsed):
+    """Seconds to wait before the next batch, given the last one took ``elapsed``, to stay under the send rate."""
+    return max(round(settings.CAMPAIGN_SEND_BATCH_SIZE / settings.CAMPAIGN_SEND_RATE - elapsed, 3), 0)
+
+
+def send_batch(campaign_id, generation, after, batch_size):
+    """Send the campaign email to the next ``batch_size`` sendable recipients after the primary key ``after``.
+
+    Return how many went out and the primary key the next batch starts
+    after, which is None once no recipient is left or the campaign is no
+    longer active on dispatch ``generation``.
+    """
+    campaign = Campaign.objects.filter(
+        pk=campaign_id,
+        status=Campaign.CampaignStatus.ACTIVE,
+        dispatch_generation=generation,
+    ).first()
+    email = campaign and first_email(campaign)
+    if email is None:
+        return 0, None
+
+    recipients = sendable_recipients(campaign.pk).order_by("pk")
+    if after is not None:
+        recipients = recipients.filter(pk__gt=after)
+    recipients = list(recipients.values_list("pk", "contact_id", "contact__email")[:batch_size])
+    if not recipients:
+        complete_if_done(campaign.pk)
+        return 0, None
+    # A short page is the last one
+    next_after = recipients[-1][0] if len(recipients) == batch_size else None
+
+    blocked = suppressed({address for _, _, address in recipients})
+    now = timezone.now()
+    CampaignRecipient.objects.filter(
+        pk__in=[pk for pk, _, address in recipients if address in blocked],
+        status=CampaignRecipient.RecipientStatus.PENDING,
+    ).update(status=CampaignRecipient.RecipientStatus.SUPPRESSED, updated_at=now)
+    delivered, failed = deliver(
+        campaign,
+        email,
+        [(pk, contact_id) for pk, contact_id, address in recipients if address not in blocked],
+    )
+
+    CampaignRecipient.objects.filter(
+        pk__in=failed,
+        status=CampaignRecipient.RecipientStatus.PENDING,
+    ).update(status=CampaignRecipient.RecipientStatus.FAILED, updated_at=now)
+    sent = CampaignRecipient.objects.filter(
+        pk__in=delivered,
+        status=CampaignRecipient.RecipientStatus.PENDING,
+    ).update(
+        status=CampaignRecipient.RecipientStatus.SENT,
+        sent_at=now,
+        updated_at=now,
+    )
+    Campaign.objects.filter(pk=campaign.pk).update(sent_count=F("sent_count") + sent, updated_at=now)
+    record_transitions({(campaign.pk, email.pk, "sent", now): sent})
+    schedule_next_step(email, delivered, now)
+    if next_after is None:
+        complete_if_done(campaign.pk)
+    # update() sends no post_save, so retire cached reports here
+    bump_data_version(CampaignRecipient)
+    bump_data_version(Campaign)
+    return sent, next_after
+
+
+def complete_if_done(campaign_id):
+    """Mark an active campaign completed once no sendable recipient is left."""
+    if sendable_recipients(campaign_id).exists():
+        return False
+    return bool(
+        Campaign.objects.filter(pk=campaign_id, status=Campaign.CampaignStatus.ACTIVE).update(
+            status=Campaign.CampaignStatus.COMPLETED,
+            updated_at=timezone.now(),
+        ),
+    )
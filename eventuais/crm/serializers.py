@@ -1,8 +1,12 @@
 from django.contrib.contenttypes.models import ContentType
+from django.db.models.manager import BaseManager
+from django.template import TemplateSyntaxError
 from rest_framework import serializers
 
 from eventuais.crm.models import Account
+from eventuais.crm.models import AccountRollup
 from eventuais.crm.models import Activity
+from eventuais.crm.models import AudienceBuild
 from eventuais.crm.models import Campaign
 from eventuais.crm.models import CampaignRecipient
 from eventuais.crm.models import Contact
@@ -10,6 +14,7 @@ from eventuais.crm.models import CustomField
 from eventuais.crm.models import CustomFieldValue
 from eventuais.crm.models import Dashboard
 from eventuais.crm.models import DashboardItem
+from eventuais.crm.models import ImportJob
 from eventuais.crm.models import MarketingEmail
 from eventuais.crm.models import Opportunity
 from eventuais.crm.models import Report
@@ -19,6 +24,62 @@ from eventuais.crm.models import SupportTicket
 from eventuais.crm.models import Tag
 from eventuais.crm.models import TicketMessage
 
+from .custom_fields import CUSTOM_FIELDS_PARAM
+from .custom_fields import custom_field_values
+from .generic import load_generic_targets
+from .personalization import template_engine
+from .reports import REPORT_CONFIG_FIELDS
+from .reports import ReportConfigError
+from .reports import compile_report
+from .segments import SegmentCriteriaError
+from .segments import compile_criteria
+
+
+class GenericBatchListSerializer(serializers.ListSerializer):
+    """List serializer that loads the generic relation targets of all its rows at once."""
+
+    def to_representation(self, data):
+        # A nested ``GenericRelation`` list points back at the object being serialized
+        known = [data.instance] if isinstance(data, BaseManager) and hasattr(data, "instance") else []
+        rows = data.all() if isinstance(data, BaseManager) else data
+        return super().to_representation(load_generic_targets(rows, known=known))
+
+
+class GenericTargetField(serializers.Field):
+    """Read-only ``{type, id, label}`` of a generic relation target, or ``None`` once it is deleted."""
+
+    def __init__(self, **kwargs):
+        super().__init__(read_only=True, **kwargs)
+
+    def to_representation(self, value):
+        return {"type": value._meta.model_name, "id": str(value.pk), "label": str(value)}  # noqa: SLF001
+
+
+class CustomFieldsListSerializer(serializers.ListSerializer):
+    """List serializer that adds the requested ``custom_fields`` of all its rows with one query."""
+
+    def to_representation(self, data):
+        names = self.context.get(CUSTOM_FIELDS_PARAM)
+        if names is None:
+            return super().to_representation(data)
+        rows = list(data.all() if isinstance(data, BaseManager) else data)
+        values = custom_field_values(self.child.Meta.model, [row.pk for row in rows], names)
+        representation = super().to_representation(rows)
+        for item, row in zip(representation, rows, strict=True):
+            item[CUSTOM_FIELDS_PARAM] = values[row.pk]
+        return representation
+
+
+class CustomFieldsSerializerMixin:
+    """Add the requested ``custom_fields`` to a single object; lists go through ``CustomFieldsListSerializer``."""
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        names = self.context.get(CUSTOM_FIELDS_PARAM)
+        if names is not None and not isinstance(self.parent, CustomFieldsListSerializer):
+            data[CUSTOM_FIELDS_PARAM] = custom_field_values(self.Meta.model, [instance.pk], names)[instance.pk]
+        return data
+
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:  # type: ignore
@@ -28,10 +89,25 @@ class TagSerializer(serializers.ModelSerializer):
 
 class SocialProfileSerializer(serializers.ModelSerializer):
     platform_display = serializers.CharField(source="get_platform_display", read_only=True)
+    content_type_name = serializers.CharField(source="content_type.model", read_only=True)
+    content_object = GenericTargetField()
 
     class Meta:  # type: ignore
         model = SocialProfile
-        fields = ["id", "platform", "platform_display", "url", "username", "created_at", "updated_at"]
+        list_serializer_class = GenericBatchListSerializer
+        fields = [
+            "id",
+            "content_type",
+            "content_type_name",
+            "object_id",
+            "content_object",
+            "platform",
+            "platform_display",
+            "url",
+            "username",
+            "created_at",
+            "updated_at",
+        ]
 
 
 class ActivitySerializer(serializers.ModelSerializer):
@@ -40,14 +116,17 @@ class ActivitySerializer(serializers.ModelSerializer):
     assigned_to_name = serializers.CharField(source="assigned_to.name", read_only=True)
     performed_by_name = serializers.CharField(source="performed_by.name", read_only=True)
     content_type_name = serializers.CharField(source="content_type.model", read_only=True)
+    content_object = GenericTargetField()
 
     class Meta:  # type: ignore
         model = Activity
+        list_serializer_class = GenericBatchListSerializer
         fields = [
             "id",
             "content_type",
             "content_type_name",
             "object_id",
+            "content_object",
             "activity_type",
             "activity_type_display",
             "subject",
@@ -95,9 +174,11 @@ class CustomFieldValueSerializer(serializers.ModelSerializer):
     field_name = serializers.CharField(source="field.name", read_only=True)
     field_type = serializers.CharField(source="field.field_type", read_only=True)
     content_type_name = serializers.CharField(source="content_type.model", read_only=True)
+    content_object = GenericTargetField()
 
     class Meta:  # type: ignore
         model = CustomFieldValue
+        list_serializer_class = GenericBatchListSerializer
         fields = [
             "id",
             "field",
@@ -106,6 +187,7 @@ class CustomFieldValueSerializer(serializers.ModelSerializer):
             "content_type",
             "content_type_name",
             "object_id",
+            "content_object",
             "value",
             "created_at",
             "updated_at",
@@ -133,7 +215,26 @@ class AccountListSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "account_type", "account_type_display", "industry", "industry_display", "website"]
 
 
-class AccountSerializer(serializers.ModelSerializer):
+class AccountRollupSerializer(serializers.ModelSerializer):
+    """Totals of an account and its descendant accounts."""
+
+    class Meta:  # type: ignore # noqa: PGH003
+        model = AccountRollup
+        fields = ["annual_revenue", "open_pipeline", "ticket_count", "contact_count"]
+
+
+class AccountTreeSerializer(serializers.ModelSerializer):
+    """Serializer for the nodes of an account's org tree, with their rollups."""
+
+    level = serializers.IntegerField(read_only=True)
+    rollup = AccountRollupSerializer(read_only=True)
+
+    class Meta:  # type: ignore # noqa: PGH003
+        model = Account
+        fields = ["id", "name", "account_type", "parent", "level", "annual_revenue", "rollup"]
+
+
+class AccountSerializer(CustomFieldsSerializerMixin, serializers.ModelSerializer):
     account_type_display = serializers.CharField(source="get_account_type_display", read_only=True)
     industry_display = serializers.CharField(source="get_industry_display", read_only=True)
     assigned_to_name = serializers.CharField(source="assigned_to.name", read_only=True)
@@ -144,9 +245,11 @@ class AccountSerializer(serializers.ModelSerializer):
     parent_name = serializers.CharField(source="parent.name", read_only=True)
     level = serializers.IntegerField(read_only=True)
     social_profiles = SocialProfileSerializer(many=True, read_only=True)
+    rollup = AccountRollupSerializer(read_only=True)
 
     class Meta:  # type: ignore
         model = Account
+        list_serializer_class = CustomFieldsListSerializer
         fields = [
             "id",
             "name",
@@ -174,6 +277,7 @@ class AccountSerializer(serializers.ModelSerializer):
             "description",
             "annual_revenue",
             "employee_count",
+            "rollup",
             "contacts",
             "social_profiles",
             "created_by",
@@ -184,7 +288,7 @@ class AccountSerializer(serializers.ModelSerializer):
         read_only_fields = ["created_by", "created_at", "updated_at", "level"]
 
 
-class ContactSerializer(serializers.ModelSerializer):
+class ContactSerializer(CustomFieldsSerializerMixin, serializers.ModelSerializer):
     status_display = serializers.CharField(source="get_status_display", read_only=True)
     assigned_to_name = serializers.CharField(source="assigned_to.name", read_only=True)
     created_by_name = serializers.CharField(source="created_by.name", read_only=True)
@@ -197,6 +301,7 @@ class ContactSerializer(serializers.ModelSerializer):
 
     class Meta:  # type: ignore  # type: ignore
         model = Contact
+        list_serializer_class = CustomFieldsListSerializer
         fields = [
             "id",
             "first_name",
@@ -246,7 +351,7 @@ class OpportunityListSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "stage", "stage_display", "amount", "probability", "expected_close_date"]
 
 
-class OpportunitySerializer(serializers.ModelSerializer):
+class OpportunitySerializer(CustomFieldsSerializerMixin, serializers.ModelSerializer):
     stage_display = serializers.CharField(source="get_stage_display", read_only=True)
     assigned_to_name = serializers.CharField(source="assigned_to.name", read_only=True)
     created_by_name = serializers.CharField(source="created_by.name", read_only=True)
@@ -256,6 +361,7 @@ class OpportunitySerializer(serializers.ModelSerializer):
 
     class Meta:  # type: ignore
         model = Opportunity
+        list_serializer_class = CustomFieldsListSerializer
         fields = [
             "id",
             "name",
@@ -357,6 +463,17 @@ class SegmentSerializer(serializers.ModelSerializer):
     def get_static_contacts_count(self, obj):
         return obj.static_contacts.count()
 
+    def validate(self, data):
+        """Reject dynamic segments whose criteria cannot be compiled into an indexed query."""
+        is_dynamic = data.get("is_dynamic", self.instance.is_dynamic if self.instance else True)
+        criteria = data.get("criteria", self.instance.criteria if self.instance else None)
+        if is_dynamic:
+            try:
+                compile_criteria(criteria)
+            except SegmentCriteriaError as e:
+                raise serializers.ValidationError({"criteria": str(e)}) from e
+        return data
+
     class Meta:  # type: ignore
         model = Segment
         fields = [
@@ -381,6 +498,20 @@ class MarketingEmailSerializer(serializers.ModelSerializer):
     created_by_name = serializers.CharField(source="created_by.name", read_only=True)
     campaign_name = serializers.CharField(source="campaign.name", read_only=True)
 
+    def validate(self, data):
+        """Reject subjects and bodies that do not compile with the engine campaign emails render with."""
+        errors = {}
+        for field in ("subject", "text_content", "html_content"):
+            if field not in data:
+                continue
+            try:
+                template_engine().from_string(data[field])
+            except TemplateSyntaxError as e:
+                errors[field] = str(e)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return data
+
     class Meta:  # type: ignore
         model = MarketingEmail
         fields = [
@@ -495,6 +626,15 @@ class ReportSerializer(serializers.ModelSerializer):
     def get_shared_with_count(self, obj):
         return obj.shared_with.count()
 
+    def validate(self, data):
+        """Reject report configurations the report engine cannot compile."""
+        config = {field: data.get(field, getattr(self.instance, field, None)) for field in REPORT_CONFIG_FIELDS}
+        try:
+            compile_report(Report(**{field: value for field, value in config.items() if value is not None}))
+        except ReportConfigError as e:
+            raise serializers.ValidationError({"query_params": str(e)}) from e
+        return data
+
     class Meta:  # type: ignore
         model = Report
         fields = [
@@ -575,3 +715,141 @@ class DashboardSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
         read_only_fields = ["created_by", "created_at", "updated_at"]
+
+
+class ContactImportSerializer(serializers.ModelSerializer):
+    """Validates one row of a contact import; foreign keys are checked per chunk by the importer."""
+
+    account_id = serializers.UUIDField(required=False, allow_null=True)
+    parent_id = serializers.UUIDField(required=False, allow_null=True)
+
+    class Meta:  # type: ignore
+        model = Contact
+        fields = [
+            "first_name",
+            "last_name",
+            "title",
+            "email",
+            "phone",
+            "mobile",
+            "status",
+            "account_id",
+            "parent_id",
+            "use_account_address",
+            "address_line1",
+            "address_line2",
+            "city",
+            "state",
+            "postal_code",
+            "country",
+            "description",
+            "date_of_birth",
+            "email_opt_out",
+            "phone_opt_out",
+        ]
+
+
+class AccountImportSerializer(serializers.ModelSerializer):
+    """Validates one row of an account import; foreign keys are checked per chunk by the importer."""
+
+    parent_id = serializers.UUIDField(required=False, allow_null=True)
+
+    class Meta:  # type: ignore
+        model = Account
+        fields = [
+            "name",
+            "account_type",
+            "industry",
+            "website",
+            "parent_id",
+            "phone",
+            "email",
+            "address_line1",
+            "address_line2",
+            "city",
+            "state",
+            "postal_code",
+            "country",
+            "description",
+            "annual_revenue",
+            "employee_count",
+        ]
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    kind_display = serializers.CharField(source="get_kind_display", read_only=True)
+    status_display = serializers.CharField(source="get_status_display", read_only=True)
+    file = serializers.FileField(write_only=True)
+    file_format = serializers.ChoiceField(choices=ImportJob.FileFormat.choices, required=False)
+
+    def validate(self, data):
+        if not data.get("file_format"):
+            extension = data["file"].name.rsplit(".", 1)[-1].lower()
+            formats = {
+                "csv": ImportJob.FileFormat.CSV,
+                "ndjson": ImportJob.FileFormat.NDJSON,
+                "jsonl": ImportJob.FileFormat.NDJSON,
+            }
+            if extension not in formats:
+                raise serializers.ValidationError({"file_format": "Cannot tell the format from the file name"})
+            data["file_format"] = formats[extension]
+        return data
+
+    class Meta:  # type: ignore
+        model = ImportJob
+        fields = [
+            "id",
+            "kind",
+            "kind_display",
+            "file",
+            "file_format",
+            "status",
+            "status_display",
+            "total_rows",
+            "processed_rows",
+            "created_count",
+            "duplicate_count",
+            "error_count",
+            "errors",
+            "created_by",
+            "created_at",
+            "updated_at",
+            "finished_at",
+        ]
+        read_only_fields = [
+            "status",
+            "total_rows",
+            "processed_rows",
+            "created_count",
+            "duplicate_count",
+            "error_count",
+            "errors",
+            "created_by",
+            "created_at",
+            "updated_at",
+            "finished_at",
+        ]
+
+
+class AudienceBuildSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source="get_status_display", read_only=True)
+
+    class Meta:  # type: ignore
+        model = AudienceBuild
+        fields = [
+            "id",
+            "campaign",
+            "expression",
+            "status",
+            "status_display",
+            "total_contacts",
+            "processed_contacts",
+            "added_count",
+            "suppressed_count",
+            "error",
+            "created_by",
+            "created_at",
+            "updated_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
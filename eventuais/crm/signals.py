@@ -0,0 +1,249 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F
+from django.db.models import Q
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.db.models.signals import pre_delete
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+
+from eventuais.crm.access import forget_access
+from eventuais.crm.bitmaps import mark_bitmaps_stale
+from eventuais.crm.custom_fields import forget_definitions
+from eventuais.crm.custom_fields import retype_values
+from eventuais.crm.membership import refresh_contacts
+from eventuais.crm.models import Account
+from eventuais.crm.models import Activity
+from eventuais.crm.models import Campaign
+from eventuais.crm.models import CampaignRecipient
+from eventuais.crm.models import Contact
+from eventuais.crm.models import CustomField
+from eventuais.crm.models import CustomFieldValue
+from eventuais.crm.models import Dashboard
+from eventuais.crm.models import Opportunity
+from eventuais.crm.models import Report
+from eventuais.crm.models import Segment
+from eventuais.crm.models import SupportTicket
+from eventuais.crm.models import Tag
+from eventuais.crm.reports import bump_data_version
+from eventuais.crm.rollups import record_delete
+from eventuais.crm.rollups import record_save
+from eventuais.crm.rollups import remember_loaded
+from eventuais.crm.suppression import SUPPRESSING_STATUSES
+from eventuais.crm.suppression import release
+from eventuais.crm.suppression import suppress
+from eventuais.crm.suppression import update_on_commit
+from eventuais.crm.tasks import rebuild_segment_membership
+
+
+def _is_contact(content_type_id):
+    return content_type_id == ContentType.objects.get_for_model(Contact).pk
+
+
+@receiver(post_save, sender=Contact)
+def refresh_contact_segments(sender, instance, raw=False, **kwargs):
+    """Re-check a saved contact against the dynamic segments."""
+    if not raw:
+        refresh_contacts([instance.pk])
+
+
+@receiver(post_save, sender=Contact)
+def sync_contact_suppression(sender, instance, raw=False, **kwargs):
+    """Suppress the address of a contact that opted out, or release it once nothing suppresses it any more."""
+    if not raw and instance.email:
+        update_on_commit(suppress if instance.email_opt_out else release, [instance.email])
+
+
+@receiver(post_save, sender=CampaignRecipient)
+def suppress_stopped_recipient(sender, instance, raw=False, **kwargs):
+    """A bounce or an unsubscribe suppresses the address for every campaign."""
+    if not raw and instance.status in SUPPRESSING_STATUSES and instance.contact.email:
+        update_on_commit(suppress, [instance.contact.email])
+
+
+@receiver(pre_delete, sender=Contact)
+def release_contact_segments(sender, instance, **kwargs):
+    """Decrement the counts of the segments a deleted contact belonged to and flag their bitmaps as stale."""
+    Segment.objects.filter(memberships__contact=instance).update(contact_count=F("contact_count") - 1)
+    mark_bitmaps_stale(
+        Segment.objects.filter(Q(memberships__contact=instance) | Q(static_contacts=instance)).values("pk"),
+    )
+
+
+@receiver(post_save, sender=Account)
+def refresh_account_contacts(sender, instance, created=False, raw=False, **kwargs):
+    """A renamed or reclassified account can move its contacts in or out of segments on ``account__*``."""
+    if not created and not raw:
+        refresh_contacts(instance.contacts.values_list("pk", flat=True), kinds={"account"})
+
+
+@receiver(pre_delete, sender=Account)
+def remember_deleted_account_contacts(sender, instance, **kwargs):
+    instance._segment_contact_ids = list(instance.contacts.values_list("pk", flat=True))  # noqa: SLF001
+
+
+@receiver(post_delete, sender=Account)
+def refresh_deleted_account_contacts(sender, instance, **kwargs):
+    """The contacts of a deleted account lose it without a save of their own."""
+    refresh_contacts(getattr(instance, "_segment_contact_ids", []), kinds={"field"})
+
+
+@receiver(m2m_changed, sender=Segment.static_contacts.through)
+def flag_static_segment_bitmaps(sender, instance, action, reverse, pk_set, **kwargs):
+    """Flag the bitmaps of static segments whose contacts were added, removed or cleared as stale."""
+    if action == "pre_clear" and reverse:
+        # The contact's segments are gone by post_clear
+        mark_bitmaps_stale(instance.static_segments.values("pk"))
+    elif action in {"post_add", "post_remove", "post_clear"}:
+        mark_bitmaps_stale((pk_set or []) if reverse else [instance.pk])
+
+
+@receiver(m2m_changed, sender=Contact.tags.through)
+def refresh_tagged_contacts(sender, instance, action, reverse, pk_set, **kwargs):
+    """Re-check contacts whose tags were added, removed or cleared."""
+    if action == "pre_clear" and reverse:
+        # The cleared contacts are gone by post_clear, so remember them now
+        instance._segment_contact_ids = list(instance.contacts.values_list("pk", flat=True))  # noqa: SLF001
+        return
+    if action not in {"post_add", "post_remove", "post_clear"}:
+        return
+
+    if not reverse:
+        contact_ids = [instance.pk]
+    elif action == "post_clear":
+        contact_ids = getattr(instance, "_segment_contact_ids", [])
+    else:
+        contact_ids = pk_set or []
+    refresh_contacts(contact_ids, kinds={"tag"})
+
+
+@receiver(post_save, sender=Tag)
+def refresh_renamed_tag(sender, instance, created, raw=False, **kwargs):
+    """A renamed tag can move its contacts in or out of segments that filter by tag name."""
+    if not created and not raw:
+        refresh_contacts(instance.contacts.values_list("pk", flat=True), kinds={"tag"})
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_deleted_tag_contacts(sender, instance, **kwargs):
+    instance._segment_contact_ids = list(instance.contacts.values_list("pk", flat=True))  # noqa: SLF001
+
+
+@receiver(post_delete, sender=Tag)
+def refresh_deleted_tag_contacts(sender, instance, **kwargs):
+    refresh_contacts(getattr(instance, "_segment_contact_ids", []), kinds={"tag"})
+
+
+@receiver(post_save, sender=CustomField)
+@receiver(post_delete, sender=CustomField)
+def retire_custom_field_definitions(sender, instance, raw=False, **kwargs):
+    """Inlined custom fields pick up added, renamed and removed definitions."""
+    if not raw:
+        forget_definitions(instance.content_type_id)
+
+
+@receiver(post_save, sender=CustomField)
+def retype_custom_field_values(sender, instance, created=False, raw=False, **kwargs):
+    """Re-parse a field's stored values into the typed column of its new type."""
+    loaded = getattr(instance, "loaded_field_type", instance.field_type)
+    if not raw and not created and loaded != instance.field_type:
+        retype_values(instance)
+    instance.loaded_field_type = instance.field_type
+
+
+@receiver(post_save, sender=CustomFieldValue)
+@receiver(post_delete, sender=CustomFieldValue)
+def refresh_custom_field_contact(sender, instance, raw=False, **kwargs):
+    """Re-check the contact a custom field value belongs to."""
+    if not raw and _is_contact(instance.content_type_id):
+        refresh_contacts([instance.object_id], kinds={"custom_field"})
+
+
+@receiver(post_save, sender=Activity)
+@receiver(post_delete, sender=Activity)
+def refresh_activity_contact(sender, instance, raw=False, **kwargs):
+    """Re-check the contact an activity was logged against."""
+    if not raw and _is_contact(instance.content_type_id):
+        refresh_contacts([instance.object_id], kinds={"activity"})
+
+
+@receiver(post_save, sender=Segment)
+def rebuild_saved_segment(sender, instance, created=False, raw=False, **kwargs):
+    """Rebuild a segment's membership in the background once new criteria are committed."""
+    definition = instance.membership_definition()
+    changed = created or definition is None or getattr(instance, "loaded_definition", None) != definition
+    instance.loaded_definition = definition
+    if not raw and changed:
+        transaction.on_commit(lambda: rebuild_segment_membership.delay(str(instance.pk)))
+
+
+def bump_report_data_version(sender, **kwargs):
+    """Retire cached report results that read the written table."""
+    bump_data_version(sender)
+
+
+for model in (Account, Activity, Campaign, CampaignRecipient, Contact, Opportunity, SupportTicket):
+    post_save.connect(bump_report_data_version, sender=model, dispatch_uid=f"report-version-save-{model.__name__}")
+    post_delete.connect(bump_report_data_version, sender=model, dispatch_uid=f"report-version-delete-{model.__name__}")
+
+
+@receiver(pre_save, sender=Account)
+@receiver(pre_save, sender=Contact)
+@receiver(pre_save, sender=Opportunity)
+@receiver(pre_save, sender=SupportTicket)
+def remember_rollup_values(sender, instance, raw=False, **kwargs):
+    if not raw:
+        remember_loaded(instance)
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_save, sender=Contact)
+@receiver(post_save, sender=Opportunity)
+@receiver(post_save, sender=SupportTicket)
+def roll_up_saved(sender, instance, created=False, raw=False, **kwargs):
+    """Carry a saved account, contact, ticket or opportunity into the rollups of the accounts above it."""
+    if not raw:
+        record_save(instance, created=created)
+
+
+@receiver(post_delete, sender=Account)
+@receiver(post_delete, sender=Contact)
+@receiver(post_delete, sender=Opportunity)
+@receiver(post_delete, sender=SupportTicket)
+def roll_up_deleted(sender, instance, origin=None, **kwargs):
+    """Take a deleted row out of the rollups of the accounts above it."""
+    record_delete(instance, origin)
+
+
+@receiver(post_save, sender=Report)
+@receiver(post_save, sender=Dashboard)
+@receiver(post_delete, sender=Report)
+@receiver(post_delete, sender=Dashboard)
+def retire_access_sets(sender, instance, raw=False, update_fields=None, **kwargs):
+    """A created, deleted or edited report/dashboard can change what every user sees."""
+    if raw or (update_fields and set(update_fields) <= {"last_run_at"}):
+        return
+    bump_data_version(sender)
+
+
+@receiver(m2m_changed, sender=Report.shared_with.through)
+@receiver(m2m_changed, sender=Dashboard.shared_with.through)
+def forget_shared_access(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """Drop the cached access sets of the users a report/dashboard was shared with or unshared from."""
+    shared_model = model if reverse else type(instance)
+    if action == "pre_clear" and not reverse:
+        # The users are gone by post_clear, so remember them now
+        instance._access_user_ids = list(instance.shared_with.values_list("pk", flat=True))  # noqa: SLF001
+        return
+    if action not in {"post_add", "post_remove", "post_clear"}:
+        return
+
+    if reverse:
+        user_ids = [instance.pk]
+    elif action == "post_clear":
+        user_ids = getattr(instance, "_access_user_ids", [])
+    else:
+        user_ids = pk_set or []
+    forget_access(shared_model, user_ids)
@@ -0,0 +1,226 @@
+"""Suppression list: the addresses no campaign email may be sent to.
+
+An address is suppressed when a contact with it opted out of email, or when a
+campaign recipient with it bounced or unsubscribed. Addresses are compared
+trimmed and lowercased.
+
+Redis keeps the 16-byte BLAKE2 digests of the suppressed addresses in a set,
+plus a log of the digests added since the set was last rebuilt from the
+database. Every process mirrors the set in a Bloom filter and catches up on
+the log with one round trip per check, so most addresses of a batch are
+cleared in memory and only the few the filter flags are confirmed with one
+``SMISMEMBER``. Until the set has been built, or when Redis cannot be reached,
+checks fall back to the database.
+
+``suppress`` and ``release`` keep the set current as opt-outs, bounces and
+unsubscribes are saved; ``rebuild`` (run by Celery beat) recomputes it from
+the database and catches anything they missed. Addresses suppressed while it
+reads the database are replayed from the log into the new set before it
+replaces the old one, so the swap never drops them.
+"""
+
+import hashlib
+import logging
+import math
+from functools import lru_cache
+from itertools import batched
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.db.models.functions import Trim
+
+from .models import CampaignRecipient
+from .models import Contact
+
+logger = logging.getLogger(__name__)
+
+SET_KEY = "crm:suppression:digests"
+LOG_KEY = "crm:suppression:log"
+EPOCH_KEY = "crm:suppression:epoch"
+
+# Recipient states that suppress the address for every campaign
+SUPPRESSING_STATUSES = [CampaignRecipient.RecipientStatus.BOUNCED, CampaignRecipient.RecipientStatus.UNSUBSCRIBED]
+
+# Digests written to Redis per command when rebuilding
+REBUILD_CHUNK_SIZE = 10_000
+
+# The filter this process mirrors, the rebuild it was loaded from and how much of the log it has read
+_local = {"bloom": None, "epoch": None, "offset": 0}
+
+
+class BloomFilter:
+    """Set membership with no false negatives and ``error_rate`` false positives at ``capacity`` items."""
+
+    def __init__(self, capacity, error_rate):
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.size / 8))
+
+    def _positions(self, digest):
+        # Double hashing over the two halves of a digest that is already uniformly distributed
+        first, second = int.from_bytes(digest[:8]), int.from_bytes(digest[8:16]) | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, digest):
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+def email_digest(email):
+    return hashlib.blake2b(normalize_email(email).encode(), digest_size=16).digest()
+
+
+@lru_cache(maxsize=1)
+def get_redis():
+    return redis.Redis.from_url(settings.REDIS_URL, socket_timeout=settings.SUPPRESSION_REDIS_TIMEOUT)
+
+
+def suppressed(emails):
+    """Return the subset of ``emails`` that is suppressed, with one or two Redis round trips."""
+    digests = {email: email_digest(email) for email in emails if email}
+    if not digests:
+        return set()
+    try:
+        client = get_redis()
+        bloom = _sync(client)
+        if bloom is None:
+            return _suppressed_in_db(digests)
+        maybe = [email for email, digest in digests.items() if digest in bloom]
+        if not maybe:
+            return set()
+        flags = client.smismember(SET_KEY, [digests[email] for email in maybe])
+    except redis.RedisError:
+        logger.warning("Suppression list unavailable, checking %s addresses in the database", len(digests))
+        return _suppressed_in_db(digests)
+    return {email for email, flag in zip(maybe, flags, strict=True) if flag}
+
+
+def suppress(emails):
+    """Add addresses to the suppression list; every process picks them up on its next check."""
+    digests = {email_digest(email) for email in emails if email}
+    if not digests:
+        return 0
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.sadd(SET_KEY, *digests)
+    pipe.rpush(LOG_KEY, *digests)
+    pipe.execute()
+    if _local["bloom"] is not None:
+        for digest in digests:
+            _local["bloom"].add(digest)
+    return len(digests)
+
+
+def release(emails):
+    """Remove listed addresses that the database no longer suppresses, such as a contact opting back in."""
+    digests = {email_digest(email): email for email in emails if email}
+    if not digests:
+        return 0
+    client = get_redis()
+    listed = [digest for digest, flag in zip(digests, client.smismember(SET_KEY, list(digests)), strict=True) if flag]
+    if not listed:
+        return 0
+    still = _suppressed_in_db([digests[digest] for digest in listed])
+    released = [digest for digest in listed if digests[digest] not in still]
+    if released:
+        # Filters elsewhere keep the bits; the exact check behind them no longer matches
+        client.srem(SET_KEY, *released)
+    return len(released)
+
+
+def update_on_commit(update, emails):
+    """Run ``suppress`` or ``release`` for ``emails`` once the current transaction commits."""
+
+    def run():
+        try:
+            update(emails)
+        except redis.RedisError:
+            # The next rebuild picks the change up from the database
+            logger.warning("Suppression list unavailable, %s of %s addresses deferred", update.__name__, len(emails))
+
+    transaction.on_commit(run)
+
+
+def rebuild():
+    """Recompute the Redis set from the database and start a new epoch; return how many addresses it holds."""
+    client = get_redis()
+    building = f"{SET_KEY}:building"
+    client.delete(building)
+    # Suppressions logged from here on may have committed after the database was read
+    start = client.llen(LOG_KEY)
+    count = 0
+    for chunk in batched((email_digest(email) for email in _suppressed_emails().iterator()), REBUILD_CHUNK_SIZE):
+        client.sadd(building, *chunk)
+        count += len(chunk)
+
+    def swap(pipe):
+        newer = pipe.lrange(LOG_KEY, start, -1)
+        pipe.multi()
+        if newer:
+            pipe.sadd(building, *newer)
+        if count or newer:
+            pipe.rename(building, SET_KEY)
+        else:
+            pipe.delete(SET_KEY)
+        # Only what was replayed; an append would have restarted the transaction
+        pipe.ltrim(LOG_KEY, start + len(newer), -1)
+        pipe.incr(EPOCH_KEY)
+        pipe.scard(SET_KEY)
+
+    # Retried if a suppression is logged between reading the log and swapping the set
+    return client.transaction(swap, LOG_KEY)[-1]
+
+
+def _sync(client):
+    """Bring this process's filter up to date and return it, or ``None`` before the first rebuild."""
+    pipe = client.pipeline(transaction=False)
+    pipe.get(EPOCH_KEY)
+    pipe.lrange(LOG_KEY, _local["offset"], -1)
+    epoch, added = pipe.execute()
+    if epoch is None:
+        return None
+
+    if _local["bloom"] is None or epoch != _local["epoch"]:
+        # A new rebuild: reload the whole set, and the log length, as one snapshot
+        pipe = client.pipeline(transaction=True)
+        pipe.get(EPOCH_KEY)
+        pipe.smembers(SET_KEY)
+        pipe.llen(LOG_KEY)
+        epoch, members, offset = pipe.execute()
+        bloom = BloomFilter(
+            max(settings.SUPPRESSION_BLOOM_CAPACITY, 2 * len(members)),
+            settings.SUPPRESSION_BLOOM_ERROR_RATE,
+        )
+        for digest in members:
+            bloom.add(digest)
+        _local.update(bloom=bloom, epoch=epoch, offset=offset)
+        return bloom
+
+    for digest in added:
+        _local["bloom"].add(digest)
+    _local["offset"] += len(added)
+    return _local["bloom"]
+
+
+def _suppressed_emails(among=None):
+    """Normalized suppressed addresses according to the database, optionally only those in ``among``."""
+    contacts = Contact.objects.exclude(email="").annotate(address=Lower(Trim("email")))
+    if among is not None:
+        contacts = contacts.filter(address__in=among)
+    opted_out = contacts.filter(email_opt_out=True).values_list("address", flat=True)
+    stopped = contacts.filter(campaign_interactions__status__in=SUPPRESSING_STATUSES).values_list("address", flat=True)
+    return opted_out.union(stopped)
+
+
+def _suppressed_in_db(emails):
+    """Exact check of ``emails`` against the database."""
+    addresses = set(_suppressed_emails(among={normalize_email(email) for email in emails}))
+    return {email for email in emails if normalize_email(email) in addresses}
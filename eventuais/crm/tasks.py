@@ -0,0 +1,119 @@
+import time
+
+from celery import shared_task
+from django.conf import settings
+
+from .audiences import RESUMABLE_STATUSES
+from .audiences import run_audience_build
+from .bitmaps import rebuild_stale_bitmaps
+from .drips import due_steps
+from .drips import send_due_steps
+from .imports import RESUMABLE_STATUSES as IMPORT_RESUMABLE_STATUSES
+from .imports import run_import
+from .membership import rebuild_segment
+from .models import AudienceBuild
+from .models import ImportJob
+from .models import Segment
+from .segments import criteria_dependencies
+from .sending import batch_countdown
+from .sending import send_batch
+from .suppression import rebuild as rebuild_suppression
+from .tracking import flush_events
+
+
+@shared_task()
+def rebuild_segment_membership(segment_id):
+    """Recompute the materialized membership of one segment."""
+    segment = Segment.objects.filter(pk=segment_id).first()
+    if segment is None:
+        return None
+    return rebuild_segment(segment)
+
+
+@shared_task()
+def rebuild_segment_bitmaps(segment_ids):
+    """Rebuild the stale membership bitmaps of the given segments."""
+    return rebuild_stale_bitmaps(segment_ids)
+
+
+@shared_task()
+def rebuild_time_based_segments():
+    """Rebuild dynamic segments whose criteria depend on activity recency, which drifts with time."""
+    rebuilt = 0
+    for segment in Segment.objects.filter(is_dynamic=True):
+        if "activity" in criteria_dependencies(segment.criteria):
+            rebuild_segment(segment)
+            rebuilt += 1
+    return rebuilt
+
+
+# Acknowledged only once done, so an import whose worker died is redelivered and resumes from its progress
+@shared_task(acks_late=True)
+def run_import_job(job_id):
+    """Run a contact/account bulk import for ``IMPORT_TASK_SECONDS``, then queue the rest as a new task."""
+    job = ImportJob.objects.filter(pk=job_id, status__in=IMPORT_RESUMABLE_STATUSES).first()
+    if job is None:
+        return None
+    created = run_import(job, deadline=time.monotonic() + settings.IMPORT_TASK_SECONDS)
+    if created is None:
+        run_import_job.delay(job_id)
+    return created
+
+
+@shared_task()
+def send_campaign(campaign_id, generation, after=None):
+    """Send one batch of a started campaign over a single SMTP connection, then queue the next one."""
+    started = time.monotonic()
+    sent, after = send_batch(campaign_id, generation, after, settings.CAMPAIGN_SEND_BATCH_SIZE)
+    if after is not None:
+        send_campaign.apply_async(
+            (campaign_id, generation, str(after)),
+            countdown=batch_countdown(time.monotonic() - started),
+        )
+    return sent
+
+
+@shared_task()
+def flush_tracking_events():
+    """Apply the opens and clicks queued in Redis to recipients and campaign counters."""
+    return flush_events()
+
+
+@shared_task()
+def dispatch_drip_steps():
+    """Start enough drain tasks for the drip steps due now, up to ``DRIP_WORKERS``."""
+    batch_size = settings.DRIP_BATCH_SIZE
+    # Bounded count: never read more rows than the workers could claim
+    due = due_steps().values("pk")[: settings.DRIP_WORKERS * batch_size].count()
+    workers = -(-due // batch_size)
+    for _ in range(workers):
+        drain_drip_steps.delay()
+    return workers
+
+
+@shared_task()
+def drain_drip_steps():
+    """Send due drip steps batch after batch until none is left or the run budget is spent."""
+    claimed = 0
+    for _ in range(settings.DRIP_MAX_BATCHES):
+        batch = send_due_steps(settings.DRIP_BATCH_SIZE)
+        if not batch:
+            break
+        claimed += batch
+    return claimed
+
+
+@shared_task()
+def rebuild_suppression_list():
+    """Recompute the Redis suppression list from opt-outs, bounces and unsubscribes in the database."""
+    return rebuild_suppression()
+
+
+# Acknowledged only once done, so a build whose worker died is redelivered and resumes from its cursor
+@shared_task(acks_late=True)
+def build_campaign_audience(build_id):
+    """Add the contacts of a campaign audience build to its campaign."""
+    build = AudienceBuild.objects.select_related("campaign").filter(pk=build_id, status__in=RESUMABLE_STATUSES).first()
+    if build is None:
+        return None
+    return run_audience_build(build)
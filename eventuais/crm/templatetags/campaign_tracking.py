@@ -0,0 +1,19 @@
+"""Template tags for campaign emails, built into the engine they compile with (see ``personalization``)."""
+
+from django import template
+
+from eventuais.crm.tracking import click_url
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def track_click(context, target):
+    """``{% track_click "https://..." %}``: the recipient's tracked link to ``target``.
+
+    Outside a send, as in a preview, there is no recipient and ``target`` is returned as is.
+    """
+    tracking = context.get("click_tracking")
+    if tracking is None:
+        return target
+    return click_url(*tracking, target)
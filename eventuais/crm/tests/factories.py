@@ -0,0 +1,173 @@
+from django.utils import timezone
+from factory import Faker
+from factory import LazyFunction
+from factory import SelfAttribute
+from factory import Sequence
+from factory import SubFactory
+from factory.django import DjangoModelFactory
+
+from eventuais.crm.models import Account
+from eventuais.crm.models import Activity
+from eventuais.crm.models import Campaign
+from eventuais.crm.models import CampaignRecipient
+from eventuais.crm.models import Contact
+from eventuais.crm.models import CustomField
+from eventuais.crm.models import CustomFieldValue
+from eventuais.crm.models import Dashboard
+from eventuais.crm.models import DashboardItem
+from eventuais.crm.models import MarketingEmail
+from eventuais.crm.models import Opportunity
+from eventuais.crm.models import Report
+from eventuais.crm.models import Segment
+from eventuais.crm.models import SupportTicket
+from eventuais.crm.models import Tag
+from eventuais.crm.models import TicketMessage
+from eventuais.users.tests.factories import UserFactory
+
+
+class TagFactory(DjangoModelFactory[Tag]):
+    name = Sequence(lambda n: f"tag-{n}")
+
+    class Meta:  # type: ignore
+        model = Tag
+        django_get_or_create = ["name"]
+
+
+class AccountFactory(DjangoModelFactory[Account]):
+    name = Faker("company")
+    created_by = SubFactory(UserFactory)
+
+    class Meta:  # type: ignore
+        model = Account
+
+
+class ContactFactory(DjangoModelFactory[Contact]):
+    first_name = Faker("first_name")
+    last_name = Faker("last_name")
+    email = Faker("email")
+    created_by = SubFactory(UserFactory)
+
+    class Meta:  # type: ignore
+        model = Contact
+
+
+class CustomFieldFactory(DjangoModelFactory[CustomField]):
+    name = Sequence(lambda n: f"field-{n}")
+    field_type = CustomField.FieldType.TEXT
+
+    class Meta:  # type: ignore
+        model = CustomField
+
+
+class CustomFieldValueFactory(DjangoModelFactory[CustomFieldValue]):
+    field = SubFactory(CustomFieldFactory)
+
+    class Meta:  # type: ignore
+        model = CustomFieldValue
+
+
+class ActivityFactory(DjangoModelFactory[Activity]):
+    activity_type = Activity.ActivityType.EMAIL
+    subject = Faker("sentence")
+    start_date = LazyFunction(timezone.now)
+    performed_by = SubFactory(UserFactory)
+    created_by = SubFactory(UserFactory)
+
+    class Meta:  # type: ignore
+        model = Activity
+
+
+class CampaignFactory(DjangoModelFactory[Campaign]):
+    name = Faker("catch_phrase")
+    created_by = SubFactory(UserFactory)
+
+    class Meta:  # type: ignore
+        model = Campaign
+
+
+class CampaignRecipientFactory(DjangoModelFactory[CampaignRecipient]):
+    campaign = SubFactory(CampaignFactory)
+    contact = SubFactory(ContactFactory)
+
+    class Meta:  # type: ignore
+        model = CampaignRecipient
+
+
+class SegmentFactory(DjangoModelFactory[Segment]):
+    name = Faker("word")
+    criteria = {}
+    is_dynamic = False
+    created_by = SubFactory(UserFactory)
+
+    class Meta:  # type: ignore
+        model = Segment
+
+
+class OpportunityFactory(DjangoModelFactory[Opportunity]):
+    name = Faker("bs")
+    account = SubFactory(AccountFactory)
+    primary_contact = SubFactory(ContactFactory, account=SelfAttribute("..account"))
+    expected_close_date = LazyFunction(timezone.localdate)
+    created_by = SubFactory(UserFactory)
+
+    class Meta:  # type: ignore
+        model = Opportunity
+
+
+class MarketingEmailFactory(DjangoModelFactory[MarketingEmail]):
+    name = Faker("word")
+    subject = Faker("sentence")
+    html_content = "<p>Hello {{ first_name }}</p>"
+    campaign = SubFactory(CampaignFactory)
+    sequence_order = Sequence(lambda n: n)
+    created_by = SubFactory(UserFactory)
+
+    class Meta:  # type: ignore
+        model = MarketingEmail
+
+
+class SupportTicketFactory(DjangoModelFactory[SupportTicket]):
+    subject = Faker("sentence")
+    description = Faker("paragraph")
+    account = SubFactory(AccountFactory)
+    contact = SubFactory(ContactFactory, account=SelfAttribute("..account"))
+    created_by = SubFactory(UserFactory)
+
+    class Meta:  # type: ignore
+        model = SupportTicket
+
+
+class TicketMessageFactory(DjangoModelFactory[TicketMessage]):
+    ticket = SubFactory(SupportTicketFactory)
+    content = Faker("paragraph")
+    sender = SubFactory(UserFactory)
+
+    class Meta:  # type: ignore
+        model = TicketMessage
+
+
+class ReportFactory(DjangoModelFactory[Report]):
+    name = Faker("catch_phrase")
+    report_type = Report.ReportType.CONTACT
+    created_by = SubFactory(UserFactory)
+
+    class Meta:  # type: ignore
+        model = Report
+
+
+class DashboardFactory(DjangoModelFactory[Dashboard]):
+    name = Faker("catch_phrase")
+    created_by = SubFactory(UserFactory)
+
+    class Meta:  # type: ignore
+        model = Dashboard
+
+
+class DashboardItemFactory(DjangoModelFactory[DashboardItem]):
+    dashboard = SubFactory(DashboardFactory)
+    report = SubFactory(ReportFactory, created_by=SelfAttribute("..dashboard.created_by"))
+    position_x = Sequence(lambda n: n)
+    position_y = 0
+
+    class Meta:  # type: ignore
+        model = DashboardItem
@@ -0,0 +1,115 @@
+import itertools
+from collections import defaultdict
+
+import redis
+
+
+class InMemoryRedis:
+    """The few Redis commands the CRM uses; there is no Redis server in the test environment."""
+
+    def __init__(self):
+        self.strings = {}
+        self.hashes = defaultdict(dict)
+        self.sets = defaultdict(set)
+        self.lists = defaultdict(list)
+        self.stream = []
+        self.ids = itertools.count(1)
+
+    def pipeline(self, transaction=True):
+        return InMemoryPipeline(self)
+
+    def transaction(self, func, *watches):
+        # Nothing runs concurrently here, so the watched keys never change and ``func`` runs once
+        pipe = InMemoryPipeline(self, immediate=True)
+        func(pipe)
+        return pipe.execute()
+
+    def get(self, name):
+        return self.strings.get(name)
+
+    def incr(self, name):
+        value = int(self.strings.get(name, 0)) + 1
+        self.strings[name] = str(value).encode()
+        return value
+
+    def delete(self, *names):
+        for name in names:
+            for store in (self.strings, self.hashes, self.sets, self.lists):
+                store.pop(name, None)
+
+    def rename(self, src, dst):
+        if src not in self.sets:
+            msg = "no such key"
+            raise redis.ResponseError(msg)
+        self.sets[dst] = self.sets.pop(src)
+
+    def hincrby(self, name, key, amount):
+        self.hashes[name][key] = self.hashes[name].get(key, 0) + amount
+
+    def hgetall(self, name):
+        return {key.encode(): str(value).encode() for key, value in self.hashes[name].items()}
+
+    def sadd(self, name, *values):
+        self.sets[name].update(values)
+
+    def srem(self, name, *values):
+        self.sets[name].difference_update(values)
+
+    def smembers(self, name):
+        return set(self.sets.get(name, ()))
+
+    def smismember(self, name, values):
+        return [int(value in self.sets.get(name, ())) for value in values]
+
+    def scard(self, name):
+        return len(self.sets.get(name, ()))
+
+    def rpush(self, name, *values):
+        self.lists[name].extend(values)
+
+    def lrange(self, name, start, end):
+        values = self.lists.get(name, [])
+        return values[start:] if end == -1 else values[start : end + 1]
+
+    def llen(self, name):
+        return len(self.lists.get(name, []))
+
+    def ltrim(self, name, start, end):
+        self.lists[name] = self.lrange(name, start, end)
+
+    def xadd(self, name, fields, maxlen=None, approximate=True):
+        self.stream.append((f"{next(self.ids)}-0".encode(), {k.encode(): str(v).encode() for k, v in fields.items()}))
+
+    def xrange(self, name, min, max, count=None):
+        return self.stream[:count]
+
+    def xdel(self, name, *ids):
+        self.stream = [entry for entry in self.stream if entry[0] not in ids]
+
+
+class InMemoryPipeline:
+    """Queues commands and runs them on ``execute``, like a Redis pipeline."""
+
+    def __init__(self, client, immediate=False):
+        self.client = client
+        self.commands = []
+        # Commands before ``multi`` in a watched transaction run straight away
+        self.immediate = immediate
+
+    def multi(self):
+        self.immediate = False
+
+    def __getattr__(self, name):
+        if self.immediate:
+            return getattr(self.client, name)
+
+        def queue(*args, **kwargs):
+            self.commands.append((getattr(self.client, name), args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self):
+        results = [command(*args, **kwargs) for command, args, kwargs in self.commands]
+        self.commands = []
+        return results
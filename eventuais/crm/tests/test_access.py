@@ -0,0 +1,83 @@
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from eventuais.crm.access import accessible_ids
+from eventuais.crm.models import Dashboard
+from eventuais.crm.models import Report
+from eventuais.crm.tests.factories import DashboardFactory
+from eventuais.crm.tests.factories import DashboardItemFactory
+from eventuais.crm.tests.factories import ReportFactory
+from eventuais.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def _listed(client, url):
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    return {row["id"] for row in response.data["results"]}
+
+
+def test_public_own_and_shared_reports_are_listed_once(user):
+    own_and_shared = ReportFactory(created_by=user)
+    own_and_shared.shared_with.add(user)
+    public = ReportFactory(is_public=True)
+    shared = ReportFactory()
+    shared.shared_with.add(user)
+    ReportFactory()
+
+    response = _client(user).get("/api/crm/reports/")
+
+    ids = [row["id"] for row in response.data["results"]]
+    assert sorted(ids) == sorted(str(report.pk) for report in [own_and_shared, public, shared])
+
+
+def test_access_set_is_cached(user, django_assert_num_queries):
+    ReportFactory(created_by=user)
+    accessible_ids(user, Report)
+
+    with django_assert_num_queries(0):
+        assert len(accessible_ids(user, Report)) == 1
+
+
+def test_sharing_retires_only_the_named_users(user, django_capture_on_commit_callbacks, django_assert_num_queries):
+    other = UserFactory()
+    owner = UserFactory()
+    dashboard = DashboardFactory(created_by=owner)
+    DashboardItemFactory(dashboard=dashboard)
+    client = _client(user)
+    assert _listed(client, "/api/crm/dashboards/") == set()
+    accessible_ids(other, Dashboard)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = _client(owner).post(
+            f"/api/crm/dashboards/{dashboard.pk}/share/", {"user_ids": [user.pk]}, format="json"
+        )
+    assert response.data["shared_with_count"] == 1
+
+    assert _listed(client, "/api/crm/dashboards/") == {str(dashboard.pk)}
+    assert len(_listed(client, "/api/crm/dashboard-items/")) == 1
+    with django_assert_num_queries(0):
+        accessible_ids(other, Dashboard)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        dashboard.shared_with.clear()
+    assert _listed(client, "/api/crm/dashboards/") == set()
+
+
+def test_publishing_retires_every_access_set(user, django_capture_on_commit_callbacks):
+    report = ReportFactory()
+    assert accessible_ids(user, Report) == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        report.is_public = True
+        report.save()
+
+    assert accessible_ids(user, Report) == [report.pk]
@@ -0,0 +1,125 @@
+from unittest import mock
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from eventuais.crm import audiences
+from eventuais.crm.membership import rebuild_segment
+from eventuais.crm.models import AudienceBuild
+from eventuais.crm.models import CampaignRecipient
+from eventuais.crm.models import Contact
+from eventuais.crm.tests.factories import CampaignFactory
+from eventuais.crm.tests.factories import CampaignRecipientFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import SegmentFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def campaign():
+    return CampaignFactory()
+
+
+@pytest.fixture
+def expression():
+    """(leads ∪ static) − excluded, over contacts set up so each filter removes someone."""
+    leads = ContactFactory.create_batch(4, status=Contact.Status.LEAD)
+    others = ContactFactory.create_batch(3, status=Contact.Status.ACTIVE)
+    dynamic = SegmentFactory(is_dynamic=True, criteria={"field": "status", "value": "lead"})
+    rebuild_segment(dynamic)
+    static = SegmentFactory()
+    static.static_contacts.set(others)
+    excluded = SegmentFactory()
+    excluded.static_contacts.set([leads[0]])
+
+    # Opted out, bounced in another campaign, no email
+    Contact.objects.filter(pk=leads[1].pk).update(email_opt_out=True)
+    CampaignRecipientFactory(contact=others[0], status=CampaignRecipient.RecipientStatus.BOUNCED)
+    Contact.objects.filter(pk=others[1].pk).update(email="")
+    return {"except": [{"union": [str(dynamic.pk), str(static.pk)]}, str(excluded.pk)]}, [
+        leads[2],
+        leads[3],
+        others[2],
+    ]
+
+
+def _build(api_client, campaign, data):
+    return api_client.post(f"/api/crm/campaigns/{campaign.pk}/audience/", data, format="json")
+
+
+def test_audience_build_adds_the_expression_minus_suppressed_contacts(
+    api_client,
+    campaign,
+    expression,
+    django_capture_on_commit_callbacks,
+):
+    expression, expected = expression
+    CampaignRecipientFactory(campaign=campaign, contact=expected[0])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = _build(api_client, campaign, {"expression": expression})
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    build = AudienceBuild.objects.get(pk=response.data["id"])
+    assert build.status == AudienceBuild.JobStatus.COMPLETED
+    # The existing recipient is not counted; the bounced address is found suppressed while adding
+    assert (build.total_contacts, build.added_count, build.suppressed_count) == (3, 2, 1)
+    assert set(campaign.recipients.values_list("contact_id", flat=True)) == {contact.pk for contact in expected}
+
+    listing = api_client.get(f"/api/crm/campaigns/{campaign.pk}/audience/")
+    assert [item["id"] for item in listing.data["results"]] == [str(build.pk)]
+
+
+def test_failed_build_resumes_after_its_last_chunk(
+    api_client,
+    campaign,
+    expression,
+    monkeypatch,
+    django_capture_on_commit_callbacks,
+):
+    expression, expected = expression
+    monkeypatch.setattr(audiences, "CHUNK_SIZE", 1)
+    add_chunk = audiences.add_chunk
+    calls = []
+
+    def flaky(build, chunk):
+        calls.append(chunk)
+        if len(calls) == 2:  # noqa: PLR2004
+            msg = "worker lost"
+            raise RuntimeError(msg)
+        add_chunk(build, chunk)
+
+    with mock.patch.object(audiences, "add_chunk", flaky), pytest.raises(RuntimeError):
+        with django_capture_on_commit_callbacks(execute=True):
+            _build(api_client, campaign, {"expression": expression})
+
+    build = AudienceBuild.objects.get()
+    assert (build.status, build.processed_contacts, build.error) == (AudienceBuild.JobStatus.FAILED, 1, "worker lost")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = _build(api_client, campaign, {"build_id": str(build.pk)})
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    build.refresh_from_db()
+    assert build.status == AudienceBuild.JobStatus.COMPLETED
+    assert build.processed_contacts == 4  # noqa: PLR2004
+    assert set(campaign.recipients.values_list("contact_id", flat=True)) == {contact.pk for contact in expected}
+
+    response = _build(api_client, campaign, {"build_id": str(build.pk)})
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+
+def test_invalid_expressions_are_rejected(api_client, campaign):
+    for data in [{}, {"expression": {"union": ["nope"]}}, {"expression": str(CampaignFactory().pk)}]:
+        response = _build(api_client, campaign, data)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST, data
+    assert not AudienceBuild.objects.exists()
@@ -0,0 +1,125 @@
+from unittest import mock
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from eventuais.crm import bitmaps
+from eventuais.crm.bitmaps import evaluate
+from eventuais.crm.bitmaps import segment_bitmaps
+from eventuais.crm.bulk import add_segment_contacts
+from eventuais.crm.membership import rebuild_segment
+from eventuais.crm.models import Contact
+from eventuais.crm.models import SegmentBitmap
+from eventuais.crm.tasks import rebuild_segment_bitmaps
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import SegmentFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def segments():
+    leads = ContactFactory.create_batch(4, status=Contact.Status.LEAD)
+    others = ContactFactory.create_batch(3, status=Contact.Status.ACTIVE)
+    dynamic = SegmentFactory(is_dynamic=True, criteria={"field": "status", "value": "lead"})
+    rebuild_segment(dynamic)
+    first = SegmentFactory()
+    first.static_contacts.set([*leads[:2], *others[:2]])
+    second = SegmentFactory()
+    second.static_contacts.set([leads[0], others[2]])
+    return dynamic, first, second
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def _ids(*segments):
+    return [str(segment.pk) for segment in segments]
+
+
+def test_set_algebra_matches_the_memberships(segments):
+    dynamic, first, second = segments
+
+    assert evaluate({"union": _ids(dynamic, first, second)}).bit_count() == 7  # noqa: PLR2004
+    assert evaluate({"intersect": _ids(dynamic, first)}).bit_count() == 2  # noqa: PLR2004
+    assert evaluate({"except": _ids(first, dynamic, second)}).bit_count() == 2  # noqa: PLR2004
+    assert evaluate({"except": [{"union": _ids(first, second)}, str(dynamic.pk)]}).bit_count() == 3  # noqa: PLR2004
+
+
+def test_built_bitmaps_answer_without_rebuilding(segments, django_assert_num_queries):
+    segment_bitmaps([segment.pk for segment in segments])
+
+    # The segments, then the bitmap versions; decoded bitmaps are reused
+    with django_assert_num_queries(2):
+        segment_bitmaps([segment.pk for segment in segments])
+
+
+def test_a_full_decode_cache_still_answers_the_whole_request(segments):
+    dynamic, first, second = segments
+    expected = segment_bitmaps([segment.pk for segment in segments])
+    cached = {key: bitmap for key, bitmap in bitmaps._decoded.items() if key[0] == dynamic.pk}  # noqa: SLF001
+    filler = {(pk, None): 0 for pk in range(bitmaps.MAX_DECODED - len(cached))}
+
+    with mock.patch.dict(bitmaps._decoded, {**cached, **filler}, clear=True):  # noqa: SLF001
+        assert segment_bitmaps([segment.pk for segment in segments]) == expected
+
+
+def test_membership_changes_rebuild_the_bitmap_in_the_background(segments, django_capture_on_commit_callbacks):
+    dynamic, first, _ = segments
+    evaluate({"union": _ids(dynamic, first)})
+    assert SegmentBitmap.objects.count() == 2  # noqa: PLR2004
+
+    with mock.patch.object(rebuild_segment_bitmaps, "delay") as delay:
+        with django_capture_on_commit_callbacks(execute=True):
+            add_segment_contacts(first, [str(ContactFactory().pk)])
+            ContactFactory(status=Contact.Status.LEAD)
+            ContactFactory(status=Contact.Status.LEAD)
+
+    # One rebuild per segment however many changes; until it runs the old bitmaps are served
+    assert sorted(call.args[0] for call in delay.call_args_list) == sorted([[str(first.pk)], [str(dynamic.pk)]])
+    assert set(SegmentBitmap.objects.values_list("stale", flat=True)) == {True}
+    assert evaluate(str(first.pk)).bit_count() == 4  # noqa: PLR2004
+    assert evaluate(str(dynamic.pk)).bit_count() == 4  # noqa: PLR2004
+
+    for call in delay.call_args_list:
+        rebuild_segment_bitmaps(*call.args)
+    assert set(SegmentBitmap.objects.values_list("stale", flat=True)) == {False}
+    assert evaluate(str(first.pk)).bit_count() == 5  # noqa: PLR2004
+    assert evaluate(str(dynamic.pk)).bit_count() == 6  # noqa: PLR2004
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Contact.objects.filter(status=Contact.Status.LEAD).first().delete()
+    assert evaluate(str(dynamic.pk)).bit_count() == 5  # noqa: PLR2004
+
+
+def test_overlap_endpoint(api_client, segments):
+    dynamic, first, second = segments
+
+    response = api_client.get(f"/api/crm/segments/overlap/?segments={','.join(_ids(dynamic, first, second))}")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["segments"] == {str(dynamic.pk): 4, str(first.pk): 4, str(second.pk): 2}
+    counts = {frozenset(item["segments"]): item["count"] for item in response.data["overlaps"]}
+    assert counts == {
+        frozenset(_ids(dynamic, first)): 2,
+        frozenset(_ids(dynamic, second)): 1,
+        frozenset(_ids(first, second)): 1,
+    }
+
+
+def test_combine_endpoint(api_client, segments):
+    dynamic, first, second = segments
+    expression = {"except": [{"union": _ids(dynamic, first)}, str(second.pk)]}
+
+    response = api_client.post("/api/crm/segments/combine/", {"expression": expression}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["contact_count"] == 5  # noqa: PLR2004
+
+    for invalid in [{"xor": _ids(first)}, {"union": []}, "not-a-uuid", str(ContactFactory().pk)]:
+        response = api_client.post("/api/crm/segments/combine/", {"expression": invalid}, format="json")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST, invalid
@@ -0,0 +1,127 @@
+import json
+import uuid
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from eventuais.crm.models import CampaignRecipient
+from eventuais.crm.tests.factories import CampaignFactory
+from eventuais.crm.tests.factories import CampaignRecipientFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import SegmentFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def test_add_campaign_recipients_counts(api_client, django_assert_max_num_queries):
+    campaign = CampaignFactory()
+    contacts = ContactFactory.create_batch(5)
+    CampaignRecipientFactory(campaign=campaign, contact=contacts[0])
+    contact_ids = [str(contact.pk) for contact in contacts] + [str(uuid.uuid4()), "not-a-uuid"]
+
+    with django_assert_max_num_queries(10):
+        response = api_client.post(
+            "/api/crm/campaign-recipients/add_contacts/",
+            {"campaign_id": str(campaign.pk), "contact_ids": contact_ids},
+            format="json",
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert (response.data["added"], response.data["existing"], response.data["missing"]) == (4, 1, 2)
+    assert campaign.recipients.count() == len(contacts)
+
+
+def test_add_campaign_recipients_from_ndjson(api_client):
+    campaign = CampaignFactory()
+    contacts = ContactFactory.create_batch(3)
+    body = "\n".join(
+        [
+            json.dumps(str(contacts[0].pk)),
+            json.dumps({"contact_id": str(contacts[1].pk)}),
+            "",
+            json.dumps(str(contacts[2].pk)),
+        ],
+    )
+
+    response = api_client.generic(
+        "POST",
+        f"/api/crm/campaign-recipients/add_contacts/?campaign_id={campaign.pk}",
+        body,
+        content_type="application/x-ndjson",
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["added"] == len(contacts)
+
+
+def test_remove_campaign_recipients_keeps_sent_rows(api_client):
+    campaign = CampaignFactory()
+    pending = CampaignRecipientFactory(campaign=campaign)
+    sent = CampaignRecipientFactory(campaign=campaign, status=CampaignRecipient.RecipientStatus.SENT)
+
+    response = api_client.post(
+        "/api/crm/campaign-recipients/remove_contacts/",
+        {"campaign_id": str(campaign.pk), "contact_ids": [str(pending.contact_id), str(sent.contact_id)]},
+        format="json",
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert (response.data["removed"], response.data["missing"]) == (1, 1)
+    assert list(campaign.recipients.all()) == [sent]
+
+
+def test_static_segment_bulk_add_and_remove(api_client, django_assert_max_num_queries):
+    segment = SegmentFactory(is_dynamic=False)
+    contacts = ContactFactory.create_batch(4)
+    segment.static_contacts.add(contacts[0])
+    contact_ids = [str(contact.pk) for contact in contacts]
+
+    with django_assert_max_num_queries(12):
+        response = api_client.post(
+            f"/api/crm/segments/{segment.pk}/add_contacts/",
+            {"contact_ids": [*contact_ids, str(uuid.uuid4())]},
+            format="json",
+        )
+
+    assert (response.data["added"], response.data["existing"], response.data["missing"]) == (3, 1, 1)
+    assert response.data["contact_count"] == len(contacts)
+
+    response = api_client.post(
+        f"/api/crm/segments/{segment.pk}/remove_contacts/",
+        {"contact_ids": [*contact_ids[:2], str(uuid.uuid4())]},
+        format="json",
+    )
+
+    assert (response.data["removed"], response.data["missing"]) == (2, 1)
+    segment.refresh_from_db()
+    assert segment.contact_count == len(contacts) - 2
+    assert set(segment.static_contacts.all()) == set(contacts[2:])
+
+
+def test_bulk_endpoints_validate_input(api_client):
+    segment = SegmentFactory(is_dynamic=False)
+
+    missing_ids = api_client.post(f"/api/crm/segments/{segment.pk}/add_contacts/", {}, format="json")
+    bad_ndjson = api_client.generic(
+        "POST",
+        f"/api/crm/segments/{segment.pk}/add_contacts/",
+        "{not json",
+        content_type="application/x-ndjson",
+    )
+    missing_campaign = api_client.post(
+        "/api/crm/campaign-recipients/add_contacts/",
+        {"campaign_id": "nope", "contact_ids": [str(uuid.uuid4())]},
+        format="json",
+    )
+
+    assert missing_ids.status_code == status.HTTP_400_BAD_REQUEST
+    assert bad_ndjson.status_code == status.HTTP_400_BAD_REQUEST
+    assert missing_campaign.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,209 @@
+from decimal import Decimal
+from importlib import import_module
+
+import pytest
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from eventuais.crm.models import Contact
+from eventuais.crm.models import CustomField
+from eventuais.crm.models import CustomFieldValue
+from eventuais.crm.models import Opportunity
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import CustomFieldFactory
+from eventuais.crm.tests.factories import CustomFieldValueFactory
+from eventuais.crm.tests.factories import OpportunityFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def contact_fields():
+    content_type = ContentType.objects.get_for_model(Contact)
+    tier = CustomFieldFactory(name="Tier", content_type=content_type)
+    CustomFieldFactory(name="Region", content_type=content_type, default_value="EU")
+    return tier
+
+
+def _set(field, obj, value):
+    CustomFieldValueFactory(
+        field=field,
+        content_type=ContentType.objects.get_for_model(obj),
+        object_id=obj.pk,
+        value=value,
+    )
+
+
+def _by_id(response):
+    assert response.status_code == 200, response.content  # noqa: PLR2004
+    return {row["id"]: row for row in response.data["results"]}
+
+
+def test_list_inlines_values_and_defaults_only_when_asked(api_client, contact_fields):
+    gold, plain = ContactFactory(), ContactFactory()
+    _set(contact_fields, gold, "gold")
+
+    rows = _by_id(api_client.get("/api/crm/contacts/", {"custom_fields": "all"}))
+    tier_only = _by_id(api_client.get("/api/crm/contacts/", {"custom_fields": "Tier, Unknown"}))
+
+    assert rows[str(gold.pk)]["custom_fields"] == {"Tier": "gold", "Region": "EU"}
+    assert rows[str(plain.pk)]["custom_fields"] == {"Tier": None, "Region": "EU"}
+    assert tier_only[str(gold.pk)]["custom_fields"] == {"Tier": "gold"}
+    assert "custom_fields" not in _by_id(api_client.get("/api/crm/contacts/"))[str(gold.pk)]
+
+
+def test_detail_and_other_models_inline_their_own_fields(api_client, contact_fields):
+    contact = ContactFactory()
+    _set(contact_fields, contact, "silver")
+    opportunity = OpportunityFactory()
+    _set(
+        CustomFieldFactory(name="Source", content_type=ContentType.objects.get_for_model(Opportunity)),
+        opportunity,
+        "fair",
+    )
+
+    detail = api_client.get(f"/api/crm/contacts/{contact.pk}/", {"custom_fields": "all", "detailed": "1"})
+    opportunities = _by_id(api_client.get("/api/crm/opportunities/", {"custom_fields": "all"}))
+
+    assert detail.data["custom_fields"] == {"Tier": "silver", "Region": "EU"}
+    assert opportunities[str(opportunity.pk)]["custom_fields"] == {"Source": "fair"}
+
+
+def test_a_page_costs_one_extra_query(api_client, contact_fields):
+    def count_queries(params):
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get("/api/crm/contacts/", params)
+        assert response.status_code == 200  # noqa: PLR2004
+        return len(context.captured_queries)
+
+    for _ in range(5):
+        _set(contact_fields, ContactFactory(), "gold")
+    # The first request loads the field definitions
+    count_queries({"custom_fields": "all"})
+
+    assert count_queries({"custom_fields": "all"}) == count_queries({}) + 1
+
+
+def test_definition_changes_reach_the_cached_definitions(
+    api_client,
+    contact_fields,
+    django_capture_on_commit_callbacks,
+):
+    contact = ContactFactory()
+    rows = _by_id(api_client.get("/api/crm/contacts/", {"custom_fields": "all"}))
+    assert set(rows[str(contact.pk)]["custom_fields"]) == {"Tier", "Region"}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        contact_fields.name = "Level"
+        contact_fields.save()
+
+    rows = _by_id(api_client.get("/api/crm/contacts/", {"custom_fields": "all"}))
+    assert set(rows[str(contact.pk)]["custom_fields"]) == {"Level", "Region"}
+
+
+@pytest.fixture
+def typed_fields():
+    content_type = ContentType.objects.get_for_model(Contact)
+    return {
+        field_type: CustomFieldFactory(name=name, field_type=field_type, content_type=content_type)
+        for name, field_type in [
+            ("Revenue", CustomField.FieldType.NUMBER),
+            ("Since", CustomField.FieldType.DATE),
+            ("Active", CustomField.FieldType.BOOLEAN),
+            ("Interests", CustomField.FieldType.MULTISELECT),
+            ("Tier", CustomField.FieldType.TEXT),
+        ]
+    }
+
+
+def _ids(response):
+    assert response.status_code == 200, response.content  # noqa: PLR2004
+    return {row["id"] for row in response.data["results"]}
+
+
+def test_values_are_stored_typed(typed_fields):
+    contact = ContactFactory()
+    _set(typed_fields[CustomField.FieldType.NUMBER], contact, " 1500.5 ")
+    _set(typed_fields[CustomField.FieldType.MULTISELECT], contact, "golf, sailing")
+    _set(typed_fields[CustomField.FieldType.DATE], contact, "not a date")
+
+    values = {value.field.name: value for value in CustomFieldValue.objects.select_related("field")}
+
+    assert values["Revenue"].number_value == Decimal("1500.5")
+    assert values["Interests"].json_value == ["golf", "sailing"]
+    # Unparseable text is kept, just not typed
+    assert values["Since"].value == "not a date"
+    assert values["Since"].date_value is None
+
+
+def test_list_filters_compare_typed_values(api_client, typed_fields):
+    big, small = ContactFactory(), ContactFactory()
+    for contact, revenue, since, active, interests, tier in [
+        (big, "1500", "2020-05-01", "yes", "golf,sailing", "gold"),
+        (small, "200", "2024-01-10", "no", "chess", "silver"),
+    ]:
+        for field_type, value in zip(typed_fields, [revenue, since, active, interests, tier], strict=True):
+            _set(typed_fields[field_type], contact, value)
+
+    def ids(**params):
+        return _ids(api_client.get("/api/crm/contacts/", params))
+
+    assert ids(cf_Revenue__gte="1000") == {str(big.pk)}
+    assert ids(cf_Revenue__lt="1000", cf_Active="false") == {str(small.pk)}
+    assert ids(cf_Since__gt="2021-01-01") == {str(small.pk)}
+    assert ids(cf_Interests__contains="sailing") == {str(big.pk)}
+    assert ids(cf_Tier="gold") == {str(big.pk)}
+    assert ids(cf_Revenue__gte="1000", cf_Tier="silver") == set()
+
+
+@pytest.mark.parametrize(
+    "params",
+    [{"cf_Unknown": "1"}, {"cf_Revenue__contains": "1"}, {"cf_Revenue__gte": "lots"}, {"cf_Active": "maybe"}],
+)
+def test_invalid_filters_are_rejected(api_client, typed_fields, params):
+    response = api_client.get("/api/crm/contacts/", params)
+
+    assert response.status_code == 400  # noqa: PLR2004
+    assert "error" in response.data
+
+
+def test_changing_the_field_type_retypes_its_values(typed_fields):
+    field = CustomField.objects.get(pk=typed_fields[CustomField.FieldType.TEXT].pk)
+    _set(field, ContactFactory(), "42")
+
+    field.field_type = CustomField.FieldType.NUMBER
+    field.save()
+
+    assert CustomFieldValue.objects.get(field=field).number_value == Decimal(42)
+
+
+def test_migration_backfills_the_typed_columns(typed_fields):
+    _set(typed_fields[CustomField.FieldType.NUMBER], ContactFactory(), "7.25")
+    _set(typed_fields[CustomField.FieldType.BOOLEAN], ContactFactory(), "TRUE")
+    CustomFieldValue.objects.update(number_value=None, bool_value=None)
+
+    import_module("eventuais.crm.migrations.0017_typed_custom_field_values").backfill_typed_values(apps, None)
+
+    assert CustomFieldValue.objects.get(number_value__isnull=False).number_value == Decimal("7.25")
+    assert CustomFieldValue.objects.filter(bool_value=True).count() == 1
+
+
+def test_number_filters_use_the_partial_index(typed_fields):
+    field = typed_fields[CustomField.FieldType.NUMBER]
+    queryset = CustomFieldValue.objects.filter(field=field, number_value__gte=1000).values("object_id")
+    with connection.cursor() as cursor:
+        # Leave bitmap scans, which only an index matching the filter can serve
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("SET LOCAL enable_indexscan = off")
+
+    assert "crm_cfv_number" in queryset.explain()
@@ -0,0 +1,101 @@
+from unittest import mock
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from eventuais.crm import dashboards
+from eventuais.crm.models import Report
+from eventuais.crm.tests.factories import AccountFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import DashboardFactory
+from eventuais.crm.tests.factories import DashboardItemFactory
+from eventuais.crm.tests.factories import ReportFactory
+
+
+def _render(dashboard):
+    client = APIClient()
+    client.force_authenticate(dashboard.created_by)
+    response = client.get(f"/api/crm/dashboards/{dashboard.pk}/render/")
+    assert response.status_code == status.HTTP_200_OK
+    return response.data
+
+
+@pytest.mark.django_db
+def test_identical_reports_run_once(settings):
+    settings.DASHBOARD_RENDER_WORKERS = 1
+    ContactFactory.create_batch(3)
+    dashboard = DashboardFactory()
+    first = DashboardItemFactory(dashboard=dashboard, custom_title="Contacts")
+    # Same configuration under another report row shares the first execution
+    DashboardItemFactory(dashboard=dashboard, report=ReportFactory(created_by=dashboard.created_by))
+    DashboardItemFactory(
+        dashboard=dashboard,
+        report=ReportFactory(report_type=Report.ReportType.CUSTOM, query_params={"source": "nope"}),
+    )
+
+    payload = _render(dashboard)
+
+    assert payload["dashboard_id"] == str(dashboard.pk)
+    assert payload["elapsed_ms"] >= 0
+    contacts, shared, broken = payload["items"]
+    assert contacts["title"] == "Contacts"
+    assert contacts["report_id"] == str(first.report_id)
+    assert contacts["shared"] is False
+    assert contacts["results"]["data"] == [{"status": "active", "count": 3}]
+    assert contacts["elapsed_ms"] >= 0
+    assert shared["shared"] is True
+    assert shared["results"] == contacts["results"]
+    assert "Unknown report source" in broken["error"]
+
+    # A second render is served from the report cache
+    assert _render(dashboard)["items"][0]["results"]["cached"] is True
+
+
+@pytest.mark.django_db(transaction=True)
+def test_items_render_concurrently(settings):
+    settings.DASHBOARD_RENDER_WORKERS = 4
+    ContactFactory.create_batch(2)
+    AccountFactory(account_type="customer")
+    dashboard = DashboardFactory()
+    for source in ["contact", "account", "opportunity"]:
+        DashboardItemFactory(
+            dashboard=dashboard,
+            report=ReportFactory(
+                created_by=dashboard.created_by,
+                report_type=Report.ReportType.CUSTOM,
+                query_params={"source": source, "metrics": [{"name": "rows", "function": "count"}]},
+            ),
+        )
+
+    payload = _render(dashboard)
+
+    assert [item["results"]["data"] for item in payload["items"]] == [
+        [{"status": "active", "rows": 2}],
+        [{"account_type": "customer", "rows": 1}],
+        [],
+    ]
+    assert not any(item["shared"] for item in payload["items"])
+
+
+@pytest.mark.django_db
+def test_cached_reports_skip_the_pool(settings):
+    settings.DASHBOARD_RENDER_WORKERS = 1
+    dashboard = DashboardFactory()
+    for source in ["contact", "account"]:
+        DashboardItemFactory(
+            dashboard=dashboard,
+            report=ReportFactory(
+                created_by=dashboard.created_by,
+                report_type=Report.ReportType.CUSTOM,
+                query_params={"source": source, "metrics": [{"name": "rows", "function": "count"}]},
+            ),
+        )
+    _render(dashboard)
+    settings.DASHBOARD_RENDER_WORKERS = 4
+
+    with mock.patch.object(dashboards, "ThreadPoolExecutor") as pool:
+        payload = _render(dashboard)
+
+    pool.assert_not_called()
+    assert all(item["results"]["cached"] for item in payload["items"])
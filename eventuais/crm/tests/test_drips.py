@@ -0,0 +1,170 @@
+import datetime
+import smtplib
+import threading
+from unittest import mock
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connections
+from django.db import transaction
+from django.utils import timezone
+
+from eventuais.crm import drips
+from eventuais.crm import sending
+from eventuais.crm.models import Campaign
+from eventuais.crm.models import CampaignRecipient
+from eventuais.crm.models import DripStep
+from eventuais.crm.tasks import dispatch_drip_steps
+from eventuais.crm.tests.factories import CampaignFactory
+from eventuais.crm.tests.factories import CampaignRecipientFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import MarketingEmailFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def campaign():
+    campaign = CampaignFactory(status=Campaign.CampaignStatus.ACTIVE)
+    MarketingEmailFactory(campaign=campaign, sequence_order=1, subject="Welcome {{ first_name }}")
+    MarketingEmailFactory(campaign=campaign, sequence_order=2, delay_days=2, subject="Day two {{ first_name }}")
+    MarketingEmailFactory(campaign=campaign, sequence_order=3, delay_days=5, subject="Last call")
+    for name in ["Ana", "Bruno", "Carla"]:
+        CampaignRecipientFactory(campaign=campaign, contact=ContactFactory(first_name=name))
+    return campaign
+
+
+def _make_due(campaign):
+    DripStep.objects.filter(recipient__campaign=campaign).update(due_at=timezone.now() - datetime.timedelta(minutes=1))
+
+
+def test_first_send_queues_the_next_step(campaign):
+    sending.send_batch(campaign.pk, 0, None, 10)
+
+    steps = list(DripStep.objects.select_related("email", "recipient"))
+    assert len(steps) == 3
+    for step in steps:
+        assert step.email.sequence_order == 2
+        assert step.due_at == step.recipient.sent_at + datetime.timedelta(days=2)
+    # Nothing is due before the delay has passed
+    assert drips.send_due_steps(10) == 0
+
+
+def test_due_steps_are_sent_and_advanced_until_the_last_one(campaign):
+    sending.send_batch(campaign.pk, 0, None, 10)
+    mail.outbox.clear()
+
+    _make_due(campaign)
+    assert drips.send_due_steps(10) == 3
+    assert sorted(message.subject for message in mail.outbox) == [
+        f"Day two {name}" for name in ["Ana", "Bruno", "Carla"]
+    ]
+    assert set(DripStep.objects.values_list("email__sequence_order", flat=True)) == {3}
+
+    _make_due(campaign)
+    assert drips.send_due_steps(10) == 3
+    assert not DripStep.objects.exists()
+
+    campaign.refresh_from_db()
+    assert campaign.sent_count == 9
+    assert campaign.engagement.filter(granularity="day").count() == 3
+
+
+def test_batches_claim_at_most_batch_size_steps(campaign):
+    sending.send_batch(campaign.pk, 0, None, 10)
+    mail.outbox.clear()
+    _make_due(campaign)
+
+    assert drips.send_due_steps(2) == 2
+    assert len(mail.outbox) == 2
+    assert drips.send_due_steps(2) == 1
+    assert len(mail.outbox) == 3
+
+
+def test_stopped_recipients_leave_the_sequence(campaign):
+    sending.send_batch(campaign.pk, 0, None, 10)
+    mail.outbox.clear()
+    ana, bruno, _ = campaign.recipients.order_by("contact__first_name")
+    CampaignRecipient.objects.filter(pk=ana.pk).update(status=CampaignRecipient.RecipientStatus.UNSUBSCRIBED)
+    bruno.contact.email_opt_out = True
+    bruno.contact.save()
+
+    _make_due(campaign)
+    assert drips.send_due_steps(10) == 3
+
+    assert [message.subject for message in mail.outbox] == ["Day two Carla"]
+    assert list(DripStep.objects.values_list("recipient__contact__first_name", flat=True)) == ["Carla"]
+
+
+def test_refused_steps_are_retried_later_then_dropped(campaign, settings):
+    settings.DRIP_MAX_ATTEMPTS = 2
+    sending.send_batch(campaign.pk, 0, None, 10)
+    mail.outbox.clear()
+    send_messages = EmailBackend.send_messages
+
+    def refuse_bruno(backend, messages):
+        if messages[0].subject == "Day two Bruno":
+            raise smtplib.SMTPRecipientsRefused({messages[0].to[0]: (550, b"No such user")})
+        return send_messages(backend, messages)
+
+    with mock.patch.object(EmailBackend, "send_messages", refuse_bruno):
+        _make_due(campaign)
+        assert drips.send_due_steps(10) == 3
+        assert sorted(message.subject for message in mail.outbox) == ["Day two Ana", "Day two Carla"]
+        bruno = DripStep.objects.get(recipient__contact__first_name="Bruno")
+        assert (bruno.email.sequence_order, bruno.attempts) == (2, 1)
+        assert bruno.due_at > timezone.now() + datetime.timedelta(minutes=settings.DRIP_RETRY_MINUTES - 1)
+        # The failed step no longer heads the queue
+        assert drips.send_due_steps(10) == 0
+
+        DripStep.objects.filter(pk=bruno.pk).update(due_at=timezone.now())
+        assert drips.send_due_steps(10) == 1
+
+    assert not DripStep.objects.filter(pk=bruno.pk).exists()
+    campaign.refresh_from_db()
+    assert campaign.sent_count == 5  # noqa: PLR2004
+
+
+def test_paused_campaigns_wait(campaign):
+    sending.send_batch(campaign.pk, 0, None, 10)
+    mail.outbox.clear()
+    Campaign.objects.filter(pk=campaign.pk).update(status=Campaign.CampaignStatus.PAUSED)
+
+    _make_due(campaign)
+    assert drips.send_due_steps(10) == 0
+    assert DripStep.objects.count() == 3
+
+
+def test_dispatch_starts_one_drain_per_batch_up_to_the_worker_limit(campaign, settings):
+    sending.send_batch(campaign.pk, 0, None, 10)
+    _make_due(campaign)
+    settings.DRIP_BATCH_SIZE = 1
+    settings.DRIP_WORKERS = 2
+
+    assert dispatch_drip_steps() == 2
+    # Eager drains send everything due
+    assert not drips.due_steps().exists()
+    assert set(DripStep.objects.values_list("email__sequence_order", flat=True)) == {3}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_locked_steps_are_skipped_by_other_workers(campaign):
+    sending.send_batch(campaign.pk, 0, None, 10)
+    mail.outbox.clear()
+    _make_due(campaign)
+    claimed = []
+
+    def drain():
+        claimed.append(drips.send_due_steps(10))
+        connections.close_all()
+
+    with transaction.atomic():
+        # Another worker holds the earliest step
+        locked = DripStep.objects.select_for_update().order_by("due_at", "pk").first()
+        worker = threading.Thread(target=drain)
+        worker.start()
+        worker.join()
+
+    assert claimed == [2]
+    assert list(DripStep.objects.filter(email__sequence_order=2).values_list("pk", flat=True)) == [locked.pk]
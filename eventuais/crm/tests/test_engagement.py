@@ -0,0 +1,94 @@
+import datetime
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from eventuais.crm.engagement import record_transitions
+from eventuais.crm.models import CampaignEngagement
+from eventuais.crm.tests.factories import CampaignFactory
+from eventuais.crm.tests.factories import MarketingEmailFactory
+
+pytestmark = pytest.mark.django_db
+
+NOON = datetime.datetime(2026, 3, 2, 12, 0, 30, tzinfo=datetime.UTC)
+
+
+@pytest.fixture
+def emails():
+    campaign = CampaignFactory()
+    return MarketingEmailFactory(campaign=campaign, sequence_order=1), MarketingEmailFactory(
+        campaign=campaign,
+        sequence_order=2,
+    )
+
+
+def test_transitions_add_up_in_every_granularity(emails):
+    first, _ = emails
+    record_transitions({(first.campaign_id, first.pk, "sent", NOON): 10})
+    record_transitions(
+        {
+            (first.campaign_id, first.pk, "sent", NOON + datetime.timedelta(seconds=10)): 5,
+            (first.campaign_id, first.pk, "opened", NOON + datetime.timedelta(minutes=5)): 3,
+        },
+    )
+
+    rollups = {
+        (row.granularity, row.bucket.strftime("%H:%M")): (row.sent, row.opened)
+        for row in CampaignEngagement.objects.all()
+    }
+    assert rollups == {
+        ("minute", "12:00"): (15, 0),
+        ("minute", "12:05"): (0, 3),
+        ("hour", "12:00"): (15, 3),
+        ("day", "00:00"): (15, 3),
+    }
+
+
+def test_endpoint_reads_only_the_rollups(emails, user, django_assert_max_num_queries):
+    first, second = emails
+    campaign = first.campaign
+    record_transitions(
+        {
+            (campaign.pk, first.pk, "sent", NOON): 100,
+            (campaign.pk, first.pk, "opened", NOON + datetime.timedelta(hours=1)): 40,
+            (campaign.pk, first.pk, "clicked", NOON + datetime.timedelta(hours=1)): 10,
+            (campaign.pk, second.pk, "sent", NOON + datetime.timedelta(days=1)): 50,
+        },
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+
+    with django_assert_max_num_queries(5) as context:
+        response = client.get(f"/api/crm/campaigns/{campaign.pk}/engagement/", {"granularity": "day"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert not any("crm_campaignrecipient" in query["sql"] for query in context.captured_queries)
+    assert response.data["funnel"] == {
+        "sent": 150,
+        "opened": 40,
+        "clicked": 10,
+        "open_rate": 0.2667,
+        "click_rate": 0.0667,
+    }
+    assert [(row["sequence_order"], row["sent"], row["open_rate"]) for row in response.data["emails"]] == [
+        (1, 100, 0.4),
+        (2, 50, 0.0),
+    ]
+    assert [(row["bucket"].day, row["sent"]) for row in response.data["series"]] == [(2, 100), (3, 50)]
+
+    hourly = client.get(
+        f"/api/crm/campaigns/{campaign.pk}/engagement/",
+        {"granularity": "hour", "email": str(first.pk), "until": "2026-03-02T12:30:00Z"},
+    )
+    assert [(row["bucket"].hour, row["sent"], row["opened"]) for row in hourly.data["series"]] == [(12, 100, 0)]
+
+
+@pytest.mark.parametrize("params", [{"granularity": "week"}, {"since": "yesterday"}, {"email": "nope"}])
+def test_endpoint_rejects_bad_parameters(emails, user, params):
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get(f"/api/crm/campaigns/{emails[0].campaign_id}/engagement/", params)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from eventuais.crm.models import Contact
+from eventuais.crm.tests.factories import AccountFactory
+from eventuais.crm.tests.factories import ActivityFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import OpportunityFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def _content(response):
+    return b"".join(response.streaming_content).decode()
+
+
+def test_contact_export_streams_filtered_ndjson(api_client):
+    account = AccountFactory(name="Acme")
+    leads = ContactFactory.create_batch(3, status=Contact.Status.LEAD, account=account)
+    ContactFactory(status=Contact.Status.ACTIVE)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get("/api/crm/contacts/export/?status=lead")
+        rows = [json.loads(line) for line in _content(response).splitlines()]
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/x-ndjson"
+    assert {row["id"] for row in rows} == {str(contact.pk) for contact in leads}
+    assert {row["account_name"] for row in rows} == {"Acme"}
+    assert len([query for query in queries.captured_queries if "crm_contact" in query["sql"]]) == 1
+
+
+def test_account_export_as_csv(api_client):
+    AccountFactory.create_batch(2)
+
+    response = api_client.get("/api/crm/accounts/export/?export_format=csv")
+    rows = list(csv.DictReader(io.StringIO(_content(response))))
+
+    assert response["Content-Disposition"] == 'attachment; filename="accounts.csv"'
+    assert len(rows) == 2  # noqa: PLR2004
+    assert {"id", "name", "parent_name", "created_at"} <= set(rows[0])
+
+
+def test_opportunity_and_activity_exports(api_client):
+    opportunity = OpportunityFactory()
+    ActivityFactory(content_type=ContentType.objects.get_for_model(opportunity), object_id=opportunity.pk)
+
+    opportunities = _content(api_client.get("/api/crm/opportunities/export/")).splitlines()
+    activities = [json.loads(line) for line in _content(api_client.get("/api/crm/activities/export/")).splitlines()]
+
+    assert len(opportunities) == 1
+    assert activities[0]["related_model"] == "opportunity"
+    assert activities[0]["related_id"] == str(opportunity.pk)
+
+
+def test_export_rejects_unknown_format(api_client):
+    response = api_client.get("/api/crm/contacts/export/?export_format=xlsx")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
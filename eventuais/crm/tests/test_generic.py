@@ -0,0 +1,91 @@
+import uuid
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from eventuais.crm.generic import load_generic_targets
+from eventuais.crm.models import Activity
+from eventuais.crm.models import Contact
+from eventuais.crm.models import SocialProfile
+from eventuais.crm.tests.factories import AccountFactory
+from eventuais.crm.tests.factories import ActivityFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import OpportunityFactory
+from eventuais.crm.tests.factories import SupportTicketFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def _log(obj):
+    return ActivityFactory(content_type=ContentType.objects.get_for_model(obj), object_id=obj.pk)
+
+
+def _feed_queries(client):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get("/api/crm/activities/")
+    assert response.status_code == 200  # noqa: PLR2004
+    return len(context.captured_queries), response.data["results"]
+
+
+def test_mixed_feed_loads_each_target_model_once(api_client):
+    for make in (AccountFactory, ContactFactory, OpportunityFactory, SupportTicketFactory):
+        _log(make())
+    few, rows = _feed_queries(api_client)
+
+    for make in (AccountFactory, ContactFactory, OpportunityFactory, SupportTicketFactory):
+        for _ in range(3):
+            _log(make())
+    many, more_rows = _feed_queries(api_client)
+
+    assert len(more_rows) > len(rows)
+    assert many == few
+    assert {row["content_object"]["type"] for row in more_rows} == {
+        "account",
+        "contact",
+        "opportunity",
+        "supportticket",
+    }
+
+
+def test_targets_are_rendered_and_deleted_ones_are_none(api_client):
+    account = AccountFactory(name="Acme")
+    kept = _log(account)
+    # Generic relations cascade on delete; a dangling row is left behind by raw deletes
+    gone = ActivityFactory(content_type=ContentType.objects.get_for_model(Contact), object_id=uuid.uuid4())
+
+    rows = {row["id"]: row for row in api_client.get("/api/crm/activities/").data["results"]}
+
+    assert rows[str(kept.pk)]["content_object"] == {"type": "account", "id": str(account.pk), "label": "Acme"}
+    assert rows[str(kept.pk)]["content_type_name"] == "account"
+    assert rows[str(gone.pk)]["content_object"] is None
+
+
+def test_known_targets_are_not_queried(django_assert_num_queries):
+    account = AccountFactory()
+    SocialProfile.objects.create(
+        content_type=ContentType.objects.get_for_model(account),
+        object_id=account.pk,
+        platform=SocialProfile.Platform.LINKEDIN,
+        url="https://example.com/acme",
+    )
+    activity = _log(ContactFactory())
+    profiles = list(SocialProfile.objects.all())
+    activities = list(Activity.objects.all())
+    ContentType.objects.get_for_id(activity.content_type_id)
+
+    with django_assert_num_queries(0):
+        load_generic_targets(profiles, known=[account])
+        assert profiles[0].content_object == account
+    with django_assert_num_queries(1):
+        load_generic_targets(activities)
+        assert activities[0].content_object.pk == activity.object_id
@@ -0,0 +1,194 @@
+import json
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from eventuais.crm.imports import run_import
+from eventuais.crm.membership import rebuild_segment
+from eventuais.crm.membership import segment_contacts
+from eventuais.crm.models import Account
+from eventuais.crm.models import Contact
+from eventuais.crm.models import ImportJob
+from eventuais.crm.tasks import run_import_job
+from eventuais.crm.tests.factories import AccountFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import SegmentFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _job(user, kind, content, file_format):
+    return ImportJob.objects.create(
+        kind=kind,
+        file_format=file_format,
+        file=SimpleUploadedFile(f"import.{file_format}", content.encode()),
+        created_by=user,
+    )
+
+
+def test_upload_runs_the_import(user, django_capture_on_commit_callbacks):
+    account = AccountFactory()
+    ContactFactory(email="taken@example.com")
+    content = "\n".join(
+        [
+            "first_name,last_name,email,status,account_id",
+            f"Ana,Silva,ANA@example.com,lead,{account.pk}",
+            "Ana,Silva,ana@example.com,lead,",
+            "Taken,Person,taken@example.com,active,",
+            "Bad,Status,bad@example.com,unknown,",
+            "No,Account,noaccount@example.com,lead,00000000-0000-0000-0000-000000000000",
+            "Bia,Souza,,lead,",
+        ],
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            "/api/crm/import-jobs/",
+            {"kind": "contacts", "file": SimpleUploadedFile("contacts.csv", content.encode())},
+            format="multipart",
+        )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    job = client.get(f"/api/crm/import-jobs/{response.data['id']}/").data
+    assert job["status"] == ImportJob.JobStatus.COMPLETED
+    assert (job["total_rows"], job["processed_rows"]) == (6, 6)
+    assert (job["created_count"], job["duplicate_count"], job["error_count"]) == (2, 2, 2)
+    assert [error["row"] for error in job["errors"]] == [4, 5]
+    assert Contact.objects.get(email="ANA@example.com").account == account
+
+
+def test_duplicates_are_matched_ignoring_case(user):
+    ContactFactory(email="Ana@Example.com")
+    content = "first_name,last_name,email\nAna,Silva,ana@example.com\nBia,Souza,Bia@Example.com\n"
+
+    run_import(_job(user, ImportJob.Kind.CONTACTS, content, "csv"))
+
+    assert sorted(Contact.objects.values_list("email", flat=True)) == ["Ana@Example.com", "Bia@Example.com"]
+
+
+def test_children_are_placed_in_their_parent_tree(user):
+    parent = ContactFactory(last_name="Root")
+    sibling = ContactFactory(last_name="Zed", parent=parent)
+    rows = [
+        {"first_name": "A", "last_name": "Child", "parent_id": str(parent.pk)},
+        {"first_name": "B", "last_name": "Child", "parent_id": str(parent.pk)},
+        {"first_name": "New", "last_name": "Root"},
+    ]
+    job = _job(user, ImportJob.Kind.CONTACTS, "\n".join(json.dumps(row) for row in rows), "ndjson")
+
+    assert run_import(job) == len(rows)
+
+    parent.refresh_from_db()
+    assert [child.first_name for child in parent.get_children()] == ["A", "B", sibling.first_name]
+    assert parent.get_descendant_count() == 3  # noqa: PLR2004
+    new_root = Contact.objects.get(first_name="New")
+    assert new_root.is_root_node()
+    assert new_root.tree_id != parent.tree_id
+    # The tree is still consistent for regular MPTT inserts
+    late = ContactFactory(last_name="Child", first_name="C", parent=parent)
+    assert list(parent.get_children()).index(late) == 2  # noqa: PLR2004
+
+
+def test_account_import_and_chunk_query_count(user, monkeypatch, django_assert_max_num_queries):
+    monkeypatch.setattr("eventuais.crm.imports.CHUNK_SIZE", 50)
+    rows = [json.dumps({"name": f"Account {i}", "email": f"a{i}@example.com"}) for i in range(100)]
+    job = _job(user, ImportJob.Kind.ACCOUNTS, "\n".join(rows), "ndjson")
+
+    with django_assert_max_num_queries(20):
+        run_import(job)
+
+    assert Account.objects.count() == 100  # noqa: PLR2004
+    assert job.processed_rows == 100  # noqa: PLR2004
+
+
+def test_imported_contacts_join_dynamic_segments(user):
+    segment = SegmentFactory(is_dynamic=True, criteria={"field": "status", "value": "lead"})
+    rebuild_segment(segment)
+    job = _job(user, ImportJob.Kind.CONTACTS, "first_name,last_name,status\nAna,Silva,lead\nBia,Souza,active\n", "csv")
+
+    run_import(job)
+
+    assert [contact.first_name for contact in segment_contacts(segment)] == ["Ana"]
+
+
+def test_imported_rows_reach_the_account_rollups(user):
+    group = AccountFactory(annual_revenue=100)
+    accounts = _job(
+        user,
+        ImportJob.Kind.ACCOUNTS,
+        json.dumps({"name": "Branch", "parent_id": str(group.pk), "annual_revenue": "25"}),
+        "ndjson",
+    )
+    run_import(accounts)
+    branch = Account.objects.get(name="Branch")
+    contacts = _job(user, ImportJob.Kind.CONTACTS, f"first_name,last_name,account_id\nAna,Silva,{branch.pk}\n", "csv")
+    run_import(contacts)
+
+    group.rollup.refresh_from_db()
+    assert group.rollup.annual_revenue == 125  # noqa: PLR2004
+    assert group.rollup.contact_count == 1
+    assert branch.rollup.contact_count == 1
+
+
+def test_imports_resume_after_the_committed_chunks(user, monkeypatch, settings):
+    monkeypatch.setattr("eventuais.crm.imports.CHUNK_SIZE", 2)
+    rows = [json.dumps({"name": f"Account {i}"}) for i in range(5)]
+    job = _job(user, ImportJob.Kind.ACCOUNTS, "\n".join(rows), "ndjson")
+
+    # Past its deadline a run stops after one chunk
+    assert run_import(job, deadline=0) is None
+    job.refresh_from_db()
+    assert (job.status, job.processed_rows, job.total_rows) == (ImportJob.JobStatus.RUNNING, 2, 5)
+
+    # Each task then runs one chunk and queues the next
+    settings.IMPORT_TASK_SECONDS = 0
+    assert run_import_job(str(job.pk)) is None
+    job.refresh_from_db()
+    assert (job.status, job.processed_rows, job.created_count) == (ImportJob.JobStatus.COMPLETED, 5, 5)
+    assert sorted(Account.objects.values_list("name", flat=True)) == [f"Account {i}" for i in range(5)]
+
+
+def test_unreadable_lines_are_row_errors(user):
+    lines = [b'{"name": "First"}', b"{not json", b'["a list"]', b'{"name": "Caf\xe9"}', b'{"name": "Last"}']
+    job = ImportJob.objects.create(
+        kind=ImportJob.Kind.ACCOUNTS,
+        file_format="ndjson",
+        file=SimpleUploadedFile("import.ndjson", b"\n".join(lines)),
+        created_by=user,
+    )
+    csv_job = ImportJob.objects.create(
+        kind=ImportJob.Kind.ACCOUNTS,
+        file_format="csv",
+        file=SimpleUploadedFile("import.csv", b"name\nCSV First\nCaf\xe9\nCSV Last\n"),
+        created_by=user,
+    )
+
+    assert run_import(job) == 2  # noqa: PLR2004
+    assert run_import(csv_job) == 2  # noqa: PLR2004
+
+    assert (job.total_rows, job.error_count) == (5, 3)
+    assert [error["row"] for error in job.errors] == [2, 3, 4]
+    assert "UTF-8" in job.errors[2]["errors"]["non_field_errors"][0]
+    assert [error["row"] for error in csv_job.errors] == [2]
+    assert sorted(Account.objects.values_list("name", flat=True)) == ["CSV First", "CSV Last", "First", "Last"]
+
+
+def test_tree_ids_are_handed_out_under_the_lock(user):
+    job = _job(user, ImportJob.Kind.ACCOUNTS, json.dumps({"name": "Root"}), "ndjson")
+
+    with CaptureQueriesContext(connection) as imported:
+        run_import(job)
+    with CaptureQueriesContext(connection) as saved:
+        AccountFactory()
+
+    for queries in (imported, saved):
+        sql = [query["sql"] for query in queries.captured_queries]
+        lock = next(i for i, statement in enumerate(sql) if "pg_advisory_xact_lock" in statement)
+        assert lock < next(i for i, statement in enumerate(sql) if "tree_id" in statement)
+    assert len(set(Account.objects.values_list("tree_id", flat=True))) == 2  # noqa: PLR2004
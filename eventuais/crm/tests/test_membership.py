@@ -0,0 +1,162 @@
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from eventuais.crm import membership
+from eventuais.crm.membership import rebuild_segment
+from eventuais.crm.membership import segment_contacts
+from eventuais.crm.models import Account
+from eventuais.crm.models import Contact
+from eventuais.crm.models import Segment
+from eventuais.crm.tests.factories import AccountFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import CustomFieldFactory
+from eventuais.crm.tests.factories import CustomFieldValueFactory
+from eventuais.crm.tests.factories import SegmentFactory
+from eventuais.crm.tests.factories import TagFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _members(segment):
+    segment.refresh_from_db()
+    members = set(segment_contacts(segment))
+    assert segment.contact_count == len(members)
+    return members
+
+
+def test_saving_a_segment_builds_its_membership(django_capture_on_commit_callbacks):
+    lead = ContactFactory(status=Contact.Status.LEAD)
+    ContactFactory(status=Contact.Status.ACTIVE)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        segment = SegmentFactory(is_dynamic=True, criteria={"field": "status", "value": "lead"})
+
+    assert _members(segment) == {lead}
+
+
+def test_contact_writes_update_membership_incrementally():
+    segment = SegmentFactory(is_dynamic=True, criteria={"field": "status", "value": "lead"})
+    rebuild_segment(segment)
+
+    contact = ContactFactory(status=Contact.Status.LEAD)
+    assert _members(segment) == {contact}
+
+    contact.status = Contact.Status.ACTIVE
+    contact.save()
+    assert _members(segment) == set()
+
+    contact.status = Contact.Status.LEAD
+    contact.save()
+    contact.delete()
+    assert _members(segment) == set()
+
+
+def test_tag_changes_update_membership():
+    segment = SegmentFactory(is_dynamic=True, criteria={"tag": "vip"})
+    vip = TagFactory(name="vip")
+    contact = ContactFactory()
+    other = ContactFactory()
+
+    contact.tags.add(vip)
+    vip.contacts.add(other)
+    assert _members(segment) == {contact, other}
+
+    contact.tags.remove(vip)
+    assert _members(segment) == {other}
+
+    vip.contacts.clear()
+    assert _members(segment) == set()
+
+    vip.contacts.add(contact)
+    vip.name = "former-vip"
+    vip.save()
+    assert _members(segment) == set()
+
+
+def test_custom_field_values_update_membership():
+    content_type = ContentType.objects.get_for_model(Contact)
+    tier = CustomFieldFactory(name="Tier", content_type=content_type)
+    segment = SegmentFactory(is_dynamic=True, criteria={"custom_field": "Tier", "value": "gold"})
+    contact = ContactFactory()
+
+    value = CustomFieldValueFactory(field=tier, content_type=content_type, object_id=contact.pk, value="gold")
+    assert _members(segment) == {contact}
+
+    value.delete()
+    assert _members(segment) == set()
+
+
+def test_a_broken_segment_does_not_block_contact_writes(monkeypatch):
+    leads = SegmentFactory(is_dynamic=True, criteria={"field": "status", "value": "lead"})
+    # Saved without going through the serializer's validation
+    broken = SegmentFactory(is_dynamic=True, criteria={"field": "created_at", "op": "gte", "value": "yesterday"})
+
+    lead = ContactFactory(status=Contact.Status.LEAD)
+    assert rebuild_segment(broken) == 0
+    assert _members(leads) == {lead}
+
+    def unbuildable(segment, **kwargs):
+        msg = "bad value"
+        raise ValidationError(msg)
+
+    monkeypatch.setattr(membership, "segment_queryset", unbuildable)
+    ContactFactory(status=Contact.Status.LEAD)
+    assert rebuild_segment(leads) == 0
+
+
+def test_static_segments_are_not_materialized():
+    segment = SegmentFactory(is_dynamic=False, criteria={"field": "status", "value": "lead"})
+    contact = ContactFactory(status=Contact.Status.LEAD)
+    segment.static_contacts.add(contact)
+
+    rebuild_segment(segment)
+
+    assert not Segment.objects.get(pk=segment.pk).memberships.exists()
+    assert set(segment_contacts(segment)) == {contact}
+
+
+def test_refresh_endpoint(user):
+    segment = SegmentFactory(is_dynamic=True, criteria={"field": "status", "value": "lead"})
+    ContactFactory.create_batch(2, status=Contact.Status.LEAD)
+    Segment.objects.filter(pk=segment.pk).update(contact_count=0)
+    segment.memberships.all().delete()
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.post(f"/api/crm/segments/{segment.pk}/refresh/")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["contact_count"] == len(_members(segment)) == 2  # noqa: PLR2004
+
+
+def test_account_changes_update_membership():
+    segment = SegmentFactory(is_dynamic=True, criteria={"field": "account__industry", "value": "finance"})
+    rebuild_segment(segment)
+    account = AccountFactory(industry=Account.Industry.TECHNOLOGY)
+    contact = ContactFactory(account=account)
+    assert _members(segment) == set()
+
+    account.industry = Account.Industry.FINANCE
+    account.save()
+    assert _members(segment) == {contact}
+
+    account.delete()
+    assert _members(segment) == set()
+
+
+def test_only_membership_changes_rebuild_a_saved_segment(django_capture_on_commit_callbacks):
+    segment = SegmentFactory(is_dynamic=True, criteria={"field": "status", "value": "lead"})
+    segment = Segment.objects.get(pk=segment.pk)
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        segment.name = "Renamed"
+        segment.save()
+    assert callbacks == []
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        segment.criteria = {"field": "status", "value": "active"}
+        segment.save()
+    assert len(callbacks) == 1
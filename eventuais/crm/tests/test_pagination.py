@@ -0,0 +1,112 @@
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from eventuais.crm.pagination import KeysetPagination
+from eventuais.crm.tests.factories import AccountFactory
+from eventuais.crm.tests.factories import CampaignFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import MarketingEmailFactory
+from eventuais.crm.tests.factories import OpportunityFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def _walk(client, url, direction="next"):
+    pages = []
+    while url:
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        pages.append((response.data, len(queries)))
+        url = response.data[direction]
+    return pages
+
+
+def test_contacts_walk_in_name_order_with_duplicate_keys(api_client):
+    for first_name in ["Ana", "Bea", "Caio"]:
+        ContactFactory.create_batch(3, last_name="Silva", first_name=first_name)
+    ContactFactory.create_batch(2, last_name="Almeida")
+    expected = sorted(
+        (
+            (row["last_name"], row["first_name"], row["id"])
+            for row in _walk(api_client, "/api/crm/contacts/")[0][0]["results"]
+        ),
+    )
+
+    pages = _walk(api_client, "/api/crm/contacts/?page_size=3")
+    rows = [(row["last_name"], row["first_name"], row["id"]) for page, _ in pages for row in page["results"]]
+
+    assert rows == expected
+    assert len(pages) == 4  # noqa: PLR2004
+    assert len({queries for _, queries in pages}) == 1
+
+    back = _walk(api_client, pages[-1][0]["previous"], direction="previous")
+    back_rows = [
+        (row["last_name"], row["first_name"], row["id"]) for page, _ in reversed(back) for row in page["results"]
+    ]
+    assert back_rows == rows[: len(back_rows)]
+    assert len(back_rows) == len(rows) - len(pages[-1][0]["results"])
+
+
+def test_opportunities_default_to_latest_close_date_first(api_client):
+    today = datetime.date(2026, 1, 1)
+    account = AccountFactory()
+    for days in [3, 1, 2, 1]:
+        OpportunityFactory(account=account, expected_close_date=today + datetime.timedelta(days=days))
+
+    pages = _walk(api_client, "/api/crm/opportunities/?page_size=1")
+    dates = [row["expected_close_date"] for page, _ in pages for row in page["results"]]
+
+    assert dates == ["2026-01-04", "2026-01-03", "2026-01-02", "2026-01-02"]
+
+
+def test_client_ordering_on_non_null_field(api_client):
+    account = AccountFactory()
+    OpportunityFactory.create_batch(4, account=account, probability=50)
+
+    pages = _walk(api_client, "/api/crm/opportunities/?ordering=-created_at&page_size=3")
+    created = [row["created_at"] for page, _ in pages for row in page["results"]]
+
+    assert created == sorted(created, reverse=True)
+    assert len(created) == 4  # noqa: PLR2004
+
+
+def test_client_ordering_on_a_foreign_key(api_client):
+    for campaign in CampaignFactory.create_batch(2):
+        MarketingEmailFactory.create_batch(2, campaign=campaign)
+
+    pages = _walk(api_client, "/api/crm/marketing-emails/?ordering=-campaign&page_size=1")
+    rows = [(row["campaign"], row["id"]) for page, _ in pages for row in page["results"]]
+
+    assert len({email_id for _, email_id in rows}) == 4  # noqa: PLR2004
+    assert [str(campaign) for campaign, _ in rows] == sorted((str(campaign) for campaign, _ in rows), reverse=True)
+
+
+def test_page_size_is_capped(api_client, monkeypatch):
+    monkeypatch.setattr(KeysetPagination, "max_page_size", 2)
+    ContactFactory.create_batch(3)
+
+    response = api_client.get("/api/crm/contacts/?page_size=100")
+
+    assert len(response.data["results"]) == 2  # noqa: PLR2004
+    assert response.data["previous"] is None
+    assert response.data["next"]
+
+
+def test_invalid_cursor(api_client):
+    ContactFactory()
+
+    assert api_client.get("/api/crm/contacts/?cursor=garbage").status_code == status.HTTP_404_NOT_FOUND
+    assert api_client.get("/api/crm/contacts/?cursor=eyJwIjogWzFdfQ==").status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,90 @@
+import datetime
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from eventuais.crm import personalization
+from eventuais.crm.models import Contact
+from eventuais.crm.models import MarketingEmail
+from eventuais.crm.personalization import compiled_templates
+from eventuais.crm.personalization import merge_data
+from eventuais.crm.personalization import render_emails
+from eventuais.crm.tests.factories import AccountFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import CustomFieldFactory
+from eventuais.crm.tests.factories import CustomFieldValueFactory
+from eventuais.crm.tests.factories import MarketingEmailFactory
+
+
+def _email(**kwargs):
+    return MarketingEmail(
+        subject="{{ first_name }} & {{ account.name }}",
+        html_content="<p>{{ first_name }} on {{ custom_fields.plan|default:'free' }}</p>",
+        updated_at=datetime.datetime(2026, 1, 1, tzinfo=datetime.UTC),
+        **kwargs,
+    )
+
+
+@pytest.mark.django_db
+def test_merge_data_loads_a_chunk_in_one_query(django_assert_num_queries):
+    plan = CustomFieldFactory(name="plan", content_type=ContentType.objects.get_for_model(Contact))
+    with_fields = ContactFactory(first_name="Ana", account=AccountFactory(name="Acme"))
+    CustomFieldValueFactory(field=plan, content_type=plan.content_type, object_id=with_fields.pk, value="pro")
+    bare = ContactFactory(first_name="Bruno")
+
+    with django_assert_num_queries(1):
+        contexts = merge_data([with_fields.pk, bare.pk])
+
+    assert contexts[with_fields.pk]["first_name"] == "Ana"
+    assert contexts[with_fields.pk]["account"] == {"name": "Acme"}
+    assert contexts[with_fields.pk]["custom_fields"] == {"plan": "pro"}
+    assert contexts[with_fields.pk]["contact"]["first_name"] == "Ana"
+    assert contexts[bare.pk]["account"] == {"name": ""}
+    assert contexts[bare.pk]["custom_fields"] == {}
+
+
+def test_templates_compile_once_per_version():
+    first = compiled_templates("email:v1", ("a", "b", "c"))
+
+    assert compiled_templates("email:v1", ("a", "b", "c")) is first
+    assert compiled_templates("email:v2", ("a", "b", "c")) is not first
+
+
+def test_only_html_is_escaped():
+    contexts = [
+        {"first_name": "O'Brien", "account": {"name": "A<B>"}, "custom_fields": {}},
+        {"first_name": "Eva", "account": {"name": "Acme"}, "custom_fields": {"plan": "pro"}},
+    ]
+
+    rendered = render_emails(_email(), contexts, processes=1)
+
+    assert rendered[0][0] == "O'Brien & A<B>"
+    assert rendered[0][2] == "<p>O&#x27;Brien on free</p>"
+    assert rendered[1] == ("Eva & Acme", rendered[1][2], "<p>Eva on pro</p>")
+
+
+def test_chunks_render_on_a_process_pool(monkeypatch):
+    monkeypatch.setattr(personalization, "RENDER_CHUNK_SIZE", 2)
+    contexts = [{"first_name": f"N{n}", "account": {"name": "X"}, "custom_fields": {}} for n in range(5)]
+
+    rendered = render_emails(_email(), contexts, processes=2)
+
+    assert [subject for subject, _, _ in rendered] == [f"N{n} & X" for n in range(5)]
+
+
+@pytest.mark.django_db
+def test_emails_that_do_not_compile_are_rejected(user):
+    email = MarketingEmailFactory()
+    client = APIClient()
+    client.force_authenticate(user)
+    url = f"/api/crm/marketing-emails/{email.pk}/"
+
+    response = client.patch(url, {"subject": "Hi {{ first_name|nope }}", "html_content": "{% if %}"}, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert set(response.data) == {"subject", "html_content"}
+    # Tags built into the campaign engine need no {% load %}
+    response = client.patch(url, {"html_content": '<a href="{% track_click "https://example.com" %}">x</a>'})
+    assert response.status_code == status.HTTP_200_OK
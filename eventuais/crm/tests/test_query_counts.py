@@ -0,0 +1,130 @@
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from rest_framework.test import APIClient
+
+from eventuais.crm.models import Account
+from eventuais.crm.models import Contact
+from eventuais.crm.models import SocialProfile
+from eventuais.crm.tests.factories import AccountFactory
+from eventuais.crm.tests.factories import ActivityFactory
+from eventuais.crm.tests.factories import CampaignFactory
+from eventuais.crm.tests.factories import CampaignRecipientFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import CustomFieldFactory
+from eventuais.crm.tests.factories import CustomFieldValueFactory
+from eventuais.crm.tests.factories import DashboardFactory
+from eventuais.crm.tests.factories import DashboardItemFactory
+from eventuais.crm.tests.factories import MarketingEmailFactory
+from eventuais.crm.tests.factories import OpportunityFactory
+from eventuais.crm.tests.factories import ReportFactory
+from eventuais.crm.tests.factories import SegmentFactory
+from eventuais.crm.tests.factories import SupportTicketFactory
+from eventuais.crm.tests.factories import TagFactory
+from eventuais.crm.tests.factories import TicketMessageFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _with_social_profile(obj):
+    SocialProfile.objects.create(
+        content_type=ContentType.objects.get_for_model(obj),
+        object_id=obj.pk,
+        platform=SocialProfile.Platform.LINKEDIN,
+        url="https://example.com/profile",
+    )
+    return obj
+
+
+def _account(user):
+    account = _with_social_profile(AccountFactory(assigned_to=user, parent=AccountFactory()))
+    account.tags.add(TagFactory(), TagFactory())
+    ContactFactory.create_batch(2, account=account)
+    Account.objects.filter(pk=account.pk).update(primary_contact=account.contacts.first())
+
+
+def _contact(user):
+    contact = _with_social_profile(ContactFactory(account=AccountFactory(), assigned_to=user, parent=ContactFactory()))
+    contact.tags.add(TagFactory(), TagFactory())
+
+
+def _activity(user):
+    ActivityFactory(
+        content_type=ContentType.objects.get_for_model(Contact), object_id=ContactFactory().pk, assigned_to=user
+    )
+
+
+def _opportunity(user):
+    OpportunityFactory(assigned_to=user).tags.add(TagFactory())
+
+
+def _campaign(user):
+    CampaignFactory(assigned_to=user).tags.add(TagFactory())
+
+
+def _segment(user):
+    SegmentFactory().static_contacts.add(*ContactFactory.create_batch(2))
+
+
+def _support_ticket(user):
+    SupportTicketFactory(assigned_to=user).tags.add(TagFactory())
+
+
+def _report(user):
+    ReportFactory(created_by=user).shared_with.add(user)
+
+
+def _dashboard(user):
+    dashboard = DashboardFactory(created_by=user)
+    dashboard.shared_with.add(user)
+    DashboardItemFactory.create_batch(2, dashboard=dashboard)
+
+
+def _custom_field_value(user):
+    CustomFieldValueFactory(
+        field=CustomFieldFactory(content_type=ContentType.objects.get_for_model(Contact)),
+        content_type=ContentType.objects.get_for_model(Contact),
+        object_id=ContactFactory().pk,
+        value="gold",
+    )
+
+
+@pytest.mark.parametrize(
+    ("url", "make_row"),
+    [
+        ("/api/crm/accounts/", _account),
+        ("/api/crm/accounts/my_accounts/", _account),
+        ("/api/crm/contacts/", _contact),
+        ("/api/crm/contacts/my_contacts/", _contact),
+        ("/api/crm/activities/", _activity),
+        ("/api/crm/opportunities/", _opportunity),
+        ("/api/crm/campaigns/", _campaign),
+        ("/api/crm/marketing-emails/", lambda user: MarketingEmailFactory()),
+        ("/api/crm/campaign-recipients/", lambda user: CampaignRecipientFactory()),
+        ("/api/crm/segments/", _segment),
+        ("/api/crm/support-tickets/", _support_ticket),
+        ("/api/crm/ticket-messages/", lambda user: TicketMessageFactory()),
+        ("/api/crm/reports/", _report),
+        ("/api/crm/dashboards/", _dashboard),
+        ("/api/crm/dashboard-items/", lambda user: DashboardItemFactory(dashboard=DashboardFactory(created_by=user))),
+        ("/api/crm/custom-fields/", lambda user: CustomFieldFactory(content_type=ContentType.objects.first())),
+        ("/api/crm/custom-field-values/", _custom_field_value),
+    ],
+)
+def test_list_endpoints_run_a_constant_number_of_queries(assert_constant_queries, url, make_row):
+    assert_constant_queries(url, make_row)
+
+
+def test_detailed_contact_runs_a_constant_number_of_queries(user, django_assert_max_num_queries):
+    contact = ContactFactory(account=AccountFactory())
+    OpportunityFactory.create_batch(3, primary_contact=contact)
+    for _ in range(3):
+        ActivityFactory(
+            content_type=ContentType.objects.get_for_model(Contact), object_id=contact.pk, assigned_to=user
+        )
+    client = APIClient()
+    client.force_authenticate(user)
+
+    with django_assert_max_num_queries(12):
+        response = client.get(f"/api/crm/contacts/{contact.pk}/?detailed=1")
+
+    assert len(response.data["activities"]) == 3  # noqa: PLR2004
@@ -0,0 +1,153 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from eventuais.crm.models import Opportunity
+from eventuais.crm.models import Report
+from eventuais.crm.reports import ReportConfigError
+from eventuais.crm.reports import compile_report
+from eventuais.crm.reports import run_report
+from eventuais.crm.tests.factories import AccountFactory
+from eventuais.crm.tests.factories import OpportunityFactory
+from eventuais.crm.tests.factories import ReportFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def opportunities():
+    account = AccountFactory(name="Acme")
+    for stage, amount, month in [
+        (Opportunity.Stage.PROSPECTING, "100.00", 1),
+        (Opportunity.Stage.PROSPECTING, "50.00", 2),
+        (Opportunity.Stage.PROPOSAL, "300.00", 2),
+    ]:
+        OpportunityFactory(
+            account=account,
+            stage=stage,
+            amount=Decimal(amount),
+            expected_close_date=datetime.date(2026, month, 15),
+        )
+
+
+def test_sales_report_groups_in_one_query(opportunities, django_assert_num_queries):
+    report = ReportFactory(report_type=Report.ReportType.SALES, sort_by="total_amount")
+
+    with django_assert_num_queries(1):
+        result = run_report(report)
+
+    assert result["columns"] == ["stage", "count", "total_amount"]
+    assert [(row["stage"], row["count"], row["total_amount"]) for row in result["data"]] == [
+        ("proposal", 1, "300.00"),
+        ("prospecting", 2, "150.00"),
+    ]
+
+
+def test_periods_filters_and_display_columns(opportunities):
+    report = ReportFactory(
+        report_type=Report.ReportType.CUSTOM,
+        query_params={
+            "source": "opportunity",
+            "group_by": ["account__name"],
+            "period": {"field": "expected_close_date", "unit": "month"},
+            "metrics": [{"name": "average", "function": "avg", "field": "amount"}],
+        },
+        filters=[{"field": "stage", "op": "ne", "value": "proposal"}],
+        display_columns=["period", "average"],
+        sort_by="period",
+        sort_direction="asc",
+    )
+
+    result = run_report(report)
+
+    assert [row["period"][:7] for row in result["data"]] == ["2026-01", "2026-02"]
+    assert [Decimal(row["average"]) for row in result["data"]] == [Decimal(100), Decimal(50)]
+    assert set(result["data"][0]) == {"period", "average"}
+
+
+@pytest.mark.parametrize(
+    ("report_type", "query_params", "filters"),
+    [
+        (Report.ReportType.CUSTOM, {"source": "users"}, []),
+        (Report.ReportType.SALES, {"group_by": ["created_by__password"]}, []),
+        (Report.ReportType.SALES, {"metrics": [{"name": "x", "function": "sum", "field": "stage"}]}, []),
+        (Report.ReportType.SALES, {}, [{"field": "stage", "op": "regex", "value": "."}]),
+        (Report.ReportType.SALES, {"metrics": [{"name": "stage", "function": "count"}]}, []),
+        (Report.ReportType.SALES, {"metrics": [{"name": "amount", "function": "count"}]}, []),
+        (
+            Report.ReportType.SALES,
+            {"period": {"field": "created_at", "unit": "month"}, "metrics": [{"name": "period", "function": "count"}]},
+            [],
+        ),
+        (Report.ReportType.SALES, {}, [{"field": "amount", "op": "gt", "value": "abc"}]),
+        (Report.ReportType.SALES, {}, [{"field": "account", "op": "in", "value": ["not-a-uuid"]}]),
+        (Report.ReportType.SALES, {}, [{"field": "expected_close_date", "op": "isnull", "value": "yes"}]),
+    ],
+)
+def test_invalid_configurations(report_type, query_params, filters):
+    report = Report(report_type=report_type, query_params=query_params, filters=filters)
+
+    with pytest.raises(ReportConfigError):
+        compile_report(report)
+
+
+def test_run_report_endpoint_caches_until_the_source_changes(user, opportunities, django_capture_on_commit_callbacks):
+    report = ReportFactory(report_type=Report.ReportType.SALES, created_by=user)
+    client = APIClient()
+    client.force_authenticate(user)
+    url = f"/api/crm/reports/{report.pk}/run_report/"
+
+    first = client.post(url).data["results"]
+    second = client.post(url).data["results"]
+    with django_capture_on_commit_callbacks(execute=True):
+        OpportunityFactory(stage=Opportunity.Stage.PROPOSAL, amount=Decimal("1.00"))
+    third = client.post(url).data["results"]
+
+    assert (first["cached"], second["cached"], third["cached"]) == (False, True, False)
+    assert second["data"] == first["data"]
+    assert sum(row["count"] for row in third["data"]) == 4  # noqa: PLR2004
+
+
+def test_filter_values_are_converted_to_the_field_type(opportunities):
+    report = Report(
+        report_type=Report.ReportType.SALES,
+        filters=[
+            {"field": "amount", "op": "gte", "value": "100"},
+            {"field": "expected_close_date", "op": "lt", "value": "2026-02-01"},
+        ],
+    )
+
+    result = run_report(report)
+
+    assert [(row["stage"], row["count"]) for row in result["data"]] == [("prospecting", 1)]
+
+
+def test_run_endpoint_rejects_a_bad_filter_value(user):
+    report = ReportFactory(
+        report_type=Report.ReportType.SALES,
+        filters=[{"field": "amount", "op": "gt", "value": "abc"}],
+        created_by=user,
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.post(f"/api/crm/reports/{report.pk}/run_report/")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_report_serializer_rejects_bad_config(user):
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.post(
+        "/api/crm/reports/",
+        {"name": "Bad", "report_type": "sales", "query_params": {"group_by": ["nope"]}},
+        format="json",
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "query_params" in response.data
@@ -0,0 +1,168 @@
+from decimal import Decimal
+from importlib import import_module
+
+import pytest
+from django.apps import apps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from eventuais.crm.models import Account
+from eventuais.crm.models import AccountRollup
+from eventuais.crm.models import Opportunity
+from eventuais.crm.rollups import ROLLUP_FIELDS
+from eventuais.crm.rollups import rebuild_trees
+from eventuais.crm.tests.factories import AccountFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import OpportunityFactory
+from eventuais.crm.tests.factories import SupportTicketFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def group():
+    root = AccountFactory(name="Group", annual_revenue=Decimal(1000))
+    region = AccountFactory(name="Region", parent=root, annual_revenue=Decimal(200))
+    branch = AccountFactory(name="Branch", parent=region, annual_revenue=Decimal(30))
+    return root, region, branch
+
+
+def _rollup(account):
+    return AccountRollup.objects.filter(account=account).values(*ROLLUP_FIELDS).get()
+
+
+def _all_rollups():
+    return {row.pop("account"): row for row in AccountRollup.objects.values("account", *ROLLUP_FIELDS)}
+
+
+def _assert_consistent():
+    """The incrementally kept rollups match a rebuild from scratch."""
+    kept = _all_rollups()
+    rebuild_trees(Account.objects.values_list("tree_id", flat=True))
+    assert kept == _all_rollups()
+
+
+def test_rows_roll_up_to_every_ancestor(group):
+    root, region, branch = group
+    ContactFactory(account=branch)
+    SupportTicketFactory(account=branch)
+    OpportunityFactory(account=region, amount=Decimal(500))
+    OpportunityFactory(account=branch, amount=Decimal(70), stage=Opportunity.Stage.CLOSED_WON)
+
+    assert _rollup(root) == {
+        "annual_revenue": Decimal(1230),
+        "open_pipeline": Decimal(500),
+        "ticket_count": 1,
+        # The ticket's and both opportunities' primary contacts
+        "contact_count": 4,
+    }
+    assert _rollup(branch)["open_pipeline"] == 0
+    _assert_consistent()
+
+
+def test_changes_adjust_by_the_difference(group):
+    root, region, branch = group
+    opportunity = OpportunityFactory(account=branch, amount=Decimal(100))
+    contact = ContactFactory(account=branch)
+
+    opportunity = Opportunity.objects.get(pk=opportunity.pk)
+    opportunity.amount = Decimal(150)
+    opportunity.save()
+    assert _rollup(root)["open_pipeline"] == Decimal(150)
+
+    opportunity.account = region
+    opportunity.stage = Opportunity.Stage.NEGOTIATION
+    opportunity.save()
+    assert _rollup(branch)["open_pipeline"] == 0
+    assert _rollup(region)["open_pipeline"] == Decimal(150)
+
+    opportunity.stage = Opportunity.Stage.CLOSED_LOST
+    opportunity.save()
+    contact.account = None
+    contact.save()
+    region.annual_revenue = Decimal(250)
+    region.save()
+
+    assert _rollup(root)["open_pipeline"] == 0
+    assert _rollup(root)["annual_revenue"] == Decimal(1280)
+    _assert_consistent()
+
+
+def test_moving_an_account_moves_its_totals(group):
+    root, region, branch = group
+    SupportTicketFactory(account=branch)
+    other = AccountFactory(name="Other", annual_revenue=Decimal(5))
+
+    branch = Account.objects.get(pk=branch.pk)
+    branch.parent = other
+    branch.save()
+    assert _rollup(other)["ticket_count"] == 1
+    assert _rollup(root)["ticket_count"] == 0
+    assert _rollup(root)["annual_revenue"] == Decimal(1200)
+
+    Account.objects.get(pk=region.pk).move_to(Account.objects.get(pk=other.pk))
+    assert _rollup(other)["annual_revenue"] == Decimal(235)
+    assert _rollup(root)["annual_revenue"] == Decimal(1000)
+    _assert_consistent()
+
+
+def test_deleting_rows_and_accounts_takes_them_out(group):
+    root, region, branch = group
+    ticket = SupportTicketFactory(account=region)
+    ContactFactory(account=branch)
+    OpportunityFactory(account=branch, amount=Decimal(40))
+
+    ticket.delete()
+    assert _rollup(root)["ticket_count"] == 0
+
+    # Cascades to the branch's opportunity and unlinks its contacts without signals
+    Account.objects.get(pk=region.pk).delete()
+    assert _rollup(root) == {
+        "annual_revenue": Decimal(1000),
+        "open_pipeline": 0,
+        "ticket_count": 0,
+        "contact_count": 0,
+    }
+    _assert_consistent()
+
+
+def test_tree_loads_the_rollups_in_one_query(api_client, group):
+    root, region, branch = group
+    ContactFactory(account=branch)
+
+    def tree_queries():
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(f"/api/crm/accounts/{root.pk}/tree/")
+        assert response.status_code == 200  # noqa: PLR2004
+        return len(context.captured_queries), response.data["results"]
+
+    few, rows = tree_queries()
+    for _ in range(3):
+        AccountFactory(parent=branch)
+    many, more_rows = tree_queries()
+
+    assert [row["name"] for row in rows] == ["Group", "Region", "Branch"]
+    assert rows[0]["rollup"]["contact_count"] == 1
+    assert len(more_rows) == len(rows) + 3
+    assert many == few
+    detail = api_client.get(f"/api/crm/accounts/{region.pk}/")
+    assert detail.data["rollup"]["annual_revenue"] == "230.00"
+
+
+def test_migration_backfills_the_rollups(group):
+    root, _, branch = group
+    ContactFactory(account=branch)
+    AccountRollup.objects.all().delete()
+
+    import_module("eventuais.crm.migrations.0018_account_rollups").backfill_rollups(apps, None)
+
+    assert _rollup(root)["annual_revenue"] == Decimal(1230)
+    assert _rollup(root)["contact_count"] == 1
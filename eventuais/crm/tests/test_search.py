@@ -0,0 +1,77 @@
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+from eventuais.crm.models import Contact
+from eventuais.crm.search import prefix_query
+from eventuais.crm.search import search_vector
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import MarketingEmailFactory
+from eventuais.crm.tests.factories import SupportTicketFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def _names(response):
+    return [f"{row['first_name']} {row['last_name']}" for row in response.data["results"]]
+
+
+def test_contacts_match_word_prefixes_ranked_by_column_weight(api_client):
+    ContactFactory(first_name="Bia", last_name="Costa", email="", description="Met Anabela at the fair")
+    ContactFactory(first_name="Anabela", last_name="Souza", email="")
+    ContactFactory(first_name="Carlos", last_name="Lima", email="carlos@example.com")
+
+    response = api_client.get("/api/crm/contacts/", {"search": "ana"})
+
+    # A name hit outranks a description hit
+    assert _names(response) == ["Anabela Souza", "Bia Costa"]
+    assert _names(api_client.get("/api/crm/contacts/", {"search": "CARLOS@example"})) == ["Carlos Lima"]
+    assert _names(api_client.get("/api/crm/contacts/", {"search": "anabela souza"})) == ["Anabela Souza"]
+    assert _names(api_client.get("/api/crm/contacts/", {"search": "' & !"})) == []
+
+
+def test_ranked_results_page_without_gaps_or_repeats(api_client):
+    for number in range(5):
+        ContactFactory(first_name="Nina", last_name=f"Number{number}", description="nina " * number)
+
+    seen = []
+    url, params = "/api/crm/contacts/", {"search": "nina", "page_size": 2}
+    while url:
+        response = api_client.get(url, params)
+        seen += _names(response)
+        url, params = response.data["next"], None
+
+    assert sorted(seen) == sorted(f"Nina Number{number}" for number in range(5))
+
+
+def test_emails_and_tickets_search_their_bodies(api_client):
+    email = MarketingEmailFactory(html_content="<p>Spring <b>discount</b> inside</p>")
+    MarketingEmailFactory(html_content="<p>Newsletter</p>")
+    ticket = SupportTicketFactory(description="The invoice export times out")
+    SupportTicketFactory(description="Password reset")
+
+    emails = api_client.get("/api/crm/marketing-emails/", {"search": "discount"}).data["results"]
+    tickets = api_client.get("/api/crm/support-tickets/", {"search": "invoice"}).data["results"]
+
+    assert [row["id"] for row in emails] == [str(email.pk)]
+    assert [row["id"] for row in tickets] == [str(ticket.pk)]
+
+
+def test_search_uses_the_gin_index():
+    queryset = (
+        Contact.objects.alias(search_document=search_vector("crm.Contact"))
+        .filter(search_document=prefix_query(["ana"]))
+        .values("pk")
+    )
+    with connection.cursor() as cursor:
+        # Leave bitmap scans, which only an index matching the filter can serve
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("SET LOCAL enable_indexscan = off")
+    assert "crm_contact_search" in queryset.explain()
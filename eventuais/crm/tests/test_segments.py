@@ -0,0 +1,164 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from eventuais.crm.models import Contact
+from eventuais.crm.models import CustomField
+from eventuais.crm.segments import SCAN_COST
+from eventuais.crm.segments import SegmentCriteriaError
+from eventuais.crm.segments import compile_criteria
+from eventuais.crm.segments import estimate_cost
+from eventuais.crm.tests.factories import ActivityFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import CustomFieldFactory
+from eventuais.crm.tests.factories import CustomFieldValueFactory
+from eventuais.crm.tests.factories import SegmentFactory
+from eventuais.crm.tests.factories import TagFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _matching(criteria):
+    return set(Contact.objects.filter(compile_criteria(criteria, check_cost=False)))
+
+
+def test_field_and_boolean_nodes():
+    lead = ContactFactory(status=Contact.Status.LEAD, city="Lisbon")
+    active = ContactFactory(status=Contact.Status.ACTIVE, city="Lisbon")
+    ContactFactory(status=Contact.Status.ACTIVE, city="Porto")
+
+    assert _matching({"field": "status", "op": "eq", "value": "lead"}) == {lead}
+    assert _matching(
+        {"and": [{"field": "city", "value": "Lisbon"}, {"not": {"field": "status", "value": "lead"}}]},
+    ) == {active}
+    assert _matching({"or": [{"field": "status", "value": "lead"}, {"field": "city", "value": "Porto"}]}) == (
+        set(Contact.objects.exclude(pk=active.pk))
+    )
+
+
+def test_tag_custom_field_and_activity_nodes():
+    vip = TagFactory(name="vip")
+    tagged = ContactFactory()
+    tagged.tags.add(vip, TagFactory(name="beta"))
+
+    content_type = ContentType.objects.get_for_model(Contact)
+    tier = CustomFieldFactory(name="Tier", content_type=content_type)
+    gold = ContactFactory()
+    CustomFieldValueFactory(field=tier, content_type=content_type, object_id=gold.pk, value="gold")
+
+    recent = ContactFactory()
+    ActivityFactory(content_type=content_type, object_id=recent.pk)
+    stale = ContactFactory()
+    ActivityFactory(content_type=content_type, object_id=stale.pk, start_date=timezone.now() - timedelta(days=90))
+
+    # A contact with several matching tags is only returned once
+    assert list(Contact.objects.filter(compile_criteria({"tag": ["vip", "beta"]}))) == [tagged]
+    assert _matching({"custom_field": "Tier", "op": "eq", "value": "gold"}) == {gold}
+    assert _matching({"activity": {"within_days": 30}}) == {recent}
+    assert _matching({"activity": {"within_days": 30, "type": "call"}}) == set()
+
+
+def test_typed_custom_fields_compare_their_parsed_values():
+    content_type = ContentType.objects.get_for_model(Contact)
+    score = CustomFieldFactory(name="score", content_type=content_type, field_type=CustomField.FieldType.NUMBER)
+    ten, nine = ContactFactory(), ContactFactory()
+    CustomFieldValueFactory(field=score, content_type=content_type, object_id=ten.pk, value="10")
+    CustomFieldValueFactory(field=score, content_type=content_type, object_id=nine.pk, value="9")
+
+    # Compared as text, "9" > "5" but "10" < "5"
+    assert _matching({"custom_field": "score", "op": "gt", "value": "5"}) == {ten, nine}
+    assert _matching({"custom_field": "score", "op": "lte", "value": 9}) == {nine}
+    assert _matching({"custom_field": "score", "op": "in", "value": ["10.0"]}) == {ten}
+    for invalid in [{"op": "gt", "value": "many"}, {"op": "startswith", "value": "1"}]:
+        with pytest.raises(SegmentCriteriaError):
+            compile_criteria({"custom_field": "score", **invalid})
+
+
+@pytest.mark.parametrize(
+    "criteria",
+    [
+        {"field": "city", "op": "contains", "value": "x"},
+        {"not": {"field": "status", "value": "lead"}},
+        {"or": [{"field": "status", "value": "lead"}, {"field": "city", "value": "Porto"}]},
+        {"activity": {"within_days": 7}},
+    ],
+)
+def test_full_scans_are_rejected(criteria):
+    assert estimate_cost(criteria) >= SCAN_COST
+    with pytest.raises(SegmentCriteriaError, match="full scan"):
+        compile_criteria(criteria)
+
+
+def test_indexed_filter_makes_scan_predicates_acceptable():
+    criteria = {"and": [{"field": "status", "value": "lead"}, {"field": "city", "op": "contains", "value": "bon"}]}
+
+    assert estimate_cost(criteria) < SCAN_COST
+    compile_criteria(criteria)
+
+
+@pytest.mark.parametrize(
+    "criteria",
+    [
+        {},
+        {"and": []},
+        {"field": "password", "value": "x"},
+        {"field": "status", "op": "like", "value": "x"},
+        {"field": "status", "op": "in", "value": "lead"},
+        {"nope": 1},
+        {"field": "created_at", "op": "gte", "value": "yesterday"},
+        {"field": "id", "value": "not-a-uuid"},
+        {"field": "account", "value": "nope"},
+        {"field": "assigned_to", "op": "in", "value": ["x"]},
+        {"field": "email_opt_out", "value": "maybe"},
+        {"field": "status", "op": "isnull", "value": "yes"},
+    ],
+)
+def test_invalid_criteria(criteria):
+    with pytest.raises(SegmentCriteriaError):
+        compile_criteria(criteria)
+
+
+def test_segment_contacts_endpoint(user, django_capture_on_commit_callbacks):
+    lead = ContactFactory(status=Contact.Status.LEAD)
+    ContactFactory(status=Contact.Status.ACTIVE)
+    with django_capture_on_commit_callbacks(execute=True):
+        segment = SegmentFactory(is_dynamic=True, criteria={"field": "status", "value": "lead"})
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get(f"/api/crm/segments/{segment.pk}/contacts/")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [row["id"] for row in response.data["results"]] == [str(lead.pk)]
+
+
+def test_segment_serializer_rejects_full_scan(user):
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.post(
+        "/api/crm/segments/",
+        {"name": "Everyone in Porto", "criteria": {"field": "city", "value": "Porto"}},
+        format="json",
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "criteria" in response.data
+
+
+def test_segment_serializer_rejects_values_the_field_cannot_hold(user):
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.post(
+        "/api/crm/segments/",
+        {"name": "Recent", "criteria": {"field": "created_at", "op": "gte", "value": "yesterday"}},
+        format="json",
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "created_at" in str(response.data["criteria"])
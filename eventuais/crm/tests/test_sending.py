@@ -0,0 +1,149 @@
+import smtplib
+from unittest import mock
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.template import Context
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from eventuais.crm import personalization
+from eventuais.crm import sending
+from eventuais.crm.models import Campaign
+from eventuais.crm.models import CampaignRecipient
+from eventuais.crm.models import DripStep
+from eventuais.crm.tests.factories import CampaignFactory
+from eventuais.crm.tests.factories import CampaignRecipientFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import MarketingEmailFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def campaign():
+    campaign = CampaignFactory()
+    MarketingEmailFactory(campaign=campaign, sequence_order=1, subject="Hi {{ first_name }}")
+    MarketingEmailFactory(campaign=campaign, sequence_order=2, subject="Follow-up")
+    for name in ["Ana", "Bruno", "Carla", "Davi", "Eva"]:
+        CampaignRecipientFactory(campaign=campaign, contact=ContactFactory(first_name=name))
+    CampaignRecipientFactory(campaign=campaign, contact=ContactFactory(email_opt_out=True))
+    return campaign
+
+
+def _send(campaign, user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client.post(f"/api/crm/campaigns/{campaign.pk}/send/")
+
+
+def test_batches_follow_each_other_by_primary_key(campaign):
+    sendable = sorted(
+        CampaignRecipient.objects.filter(campaign=campaign, contact__email_opt_out=False).values_list("pk", flat=True),
+    )
+    generation = sending.start_campaign(campaign)
+
+    assert sending.send_batch(campaign.pk, generation, None, 2) == (2, sendable[1])
+    assert sending.send_batch(campaign.pk, generation, sendable[1], 2) == (2, sendable[3])
+    assert sending.send_batch(campaign.pk, generation, sendable[3], 2) == (1, None)
+    campaign.refresh_from_db()
+    assert campaign.status == Campaign.CampaignStatus.COMPLETED
+
+
+def test_batch_countdown_stays_within_one_batch_interval(settings):
+    settings.CAMPAIGN_SEND_BATCH_SIZE = 500
+    settings.CAMPAIGN_SEND_RATE = 200
+
+    assert sending.batch_countdown(0.5) == 2.0  # noqa: PLR2004
+    assert sending.batch_countdown(4) == 0
+
+
+def test_send_delivers_in_batches_over_one_connection_each(
+    campaign,
+    user,
+    settings,
+    django_capture_on_commit_callbacks,
+):
+    settings.CAMPAIGN_SEND_BATCH_SIZE = 2
+
+    with mock.patch.object(personalization, "get_connection", wraps=personalization.get_connection) as get_connection:
+        with django_capture_on_commit_callbacks(execute=True):
+            response = _send(campaign, user)
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.data["pending"] == 5
+    assert get_connection.call_count == 3
+    assert sorted(message.subject for message in mail.outbox) == [
+        f"Hi {name}" for name in ["Ana", "Bruno", "Carla", "Davi", "Eva"]
+    ]
+
+    campaign.refresh_from_db()
+    assert campaign.status == Campaign.CampaignStatus.COMPLETED
+    assert campaign.sent_count == 5
+    assert (
+        campaign.recipients.filter(status=CampaignRecipient.RecipientStatus.SENT, sent_at__isnull=False).count() == 5
+    )
+    # Opted-out contacts are never mailed
+    assert campaign.recipients.filter(status=CampaignRecipient.RecipientStatus.PENDING).count() == 1
+
+
+def test_running_campaign_cannot_be_sent_again(campaign, user):
+    Campaign.objects.filter(pk=campaign.pk).update(status=Campaign.CampaignStatus.ACTIVE)
+
+    response = _send(campaign, user)
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert mail.outbox == []
+
+
+def test_paused_campaign_stops_sending(campaign):
+    generation = sending.start_campaign(campaign)
+    Campaign.objects.filter(pk=campaign.pk).update(status=Campaign.CampaignStatus.PAUSED)
+
+    assert sending.send_batch(campaign.pk, generation, None, 2) == (0, None)
+    assert mail.outbox == []
+
+
+def test_batches_of_an_earlier_dispatch_exit(campaign):
+    stale = sending.start_campaign(campaign)
+    Campaign.objects.filter(pk=campaign.pk).update(status=Campaign.CampaignStatus.PAUSED)
+    resumed = sending.start_campaign(campaign)
+
+    assert resumed == stale + 1
+    assert sending.send_batch(campaign.pk, stale, None, 2) == (0, None)
+    assert mail.outbox == []
+    sent, _ = sending.send_batch(campaign.pk, resumed, None, 2)
+    assert sent == 2  # noqa: PLR2004
+
+
+def test_failed_recipients_do_not_stop_the_campaign(campaign, user, settings, django_capture_on_commit_callbacks):
+    settings.CAMPAIGN_SEND_BATCH_SIZE = 2
+    send_messages = EmailBackend.send_messages
+
+    def fail_bruno(context, **kwargs):
+        if context["first_name"] == "Bruno":
+            msg = "Broken tag"
+            raise ValueError(msg)
+        return Context(context, **kwargs)
+
+    def refuse_carla(backend, messages):
+        if any(message.subject == "Hi Carla" for message in messages):
+            raise smtplib.SMTPRecipientsRefused({messages[0].to[0]: (550, b"No such user")})
+        return send_messages(backend, messages)
+
+    with (
+        mock.patch.object(personalization, "Context", fail_bruno),
+        mock.patch.object(EmailBackend, "send_messages", refuse_carla),
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        _send(campaign, user)
+
+    assert sorted(message.subject for message in mail.outbox) == ["Hi Ana", "Hi Davi", "Hi Eva"]
+    campaign.refresh_from_db()
+    assert campaign.status == Campaign.CampaignStatus.COMPLETED
+    assert campaign.sent_count == 3  # noqa: PLR2004
+    failed = campaign.recipients.filter(status=CampaignRecipient.RecipientStatus.FAILED)
+    assert sorted(failed.values_list("contact__first_name", flat=True)) == ["Bruno", "Carla"]
+    # Only delivered recipients are queued for the follow-up
+    assert not DripStep.objects.filter(recipient__in=failed).exists()
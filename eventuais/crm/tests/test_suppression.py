@@ -0,0 +1,139 @@
+import os
+
+import pytest
+import redis
+from django.core import mail
+
+from eventuais.crm import sending
+from eventuais.crm import suppression
+from eventuais.crm.bulk import add_campaign_recipients
+from eventuais.crm.models import Campaign
+from eventuais.crm.models import CampaignRecipient
+from eventuais.crm.suppression import BloomFilter
+from eventuais.crm.suppression import email_digest
+from eventuais.crm.suppression import suppressed
+from eventuais.crm.tests.factories import CampaignFactory
+from eventuais.crm.tests.factories import CampaignRecipientFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import MarketingEmailFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def addresses():
+    ContactFactory(email="opted.out@example.com", email_opt_out=True)
+    CampaignRecipientFactory(
+        contact=ContactFactory(email="Bounced@Example.com"),
+        status=CampaignRecipient.RecipientStatus.BOUNCED,
+    )
+    ContactFactory(email="fine@example.com")
+    return ["opted.out@example.com", " bounced@example.com", "fine@example.com", "unknown@example.com"]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    members = [os.urandom(16) for _ in range(1000)]
+    for digest in members:
+        bloom.add(digest)
+
+    assert all(digest in bloom for digest in members)
+    false_positives = sum(os.urandom(16) in bloom for _ in range(10_000))
+    assert false_positives < 300  # noqa: PLR2004
+
+
+def test_database_answers_until_the_list_is_built(addresses):
+    assert suppressed(addresses) == {"opted.out@example.com", " bounced@example.com"}
+
+
+def test_built_list_answers_without_queries(addresses, django_assert_num_queries):
+    assert suppression.rebuild() == 2
+
+    with django_assert_num_queries(0):
+        assert suppressed(addresses) == {"opted.out@example.com", " bounced@example.com"}
+
+
+def test_other_processes_catch_up_on_new_suppressions(addresses, suppression_redis):
+    suppression.rebuild()
+    assert suppressed(["late@example.com"]) == set()
+
+    # Another process suppresses an address after this one loaded its filter
+    suppression_redis.sadd(suppression.SET_KEY, email_digest("late@example.com"))
+    suppression_redis.rpush(suppression.LOG_KEY, email_digest("late@example.com"))
+
+    assert suppressed(["LATE@example.com"]) == {"LATE@example.com"}
+
+
+def test_rebuild_keeps_suppressions_logged_while_it_runs(addresses, suppression_redis, monkeypatch):
+    suppression.rebuild()
+    read_database = suppression._suppressed_emails  # noqa: SLF001
+
+    def suppress_meanwhile():
+        # Saved after the rebuild read the database
+        suppression.suppress(["meanwhile@example.com"])
+        return read_database()
+
+    monkeypatch.setattr(suppression, "_suppressed_emails", suppress_meanwhile)
+
+    assert suppression.rebuild() == 3  # noqa: PLR2004
+    assert suppressed(["meanwhile@example.com"]) == {"meanwhile@example.com"}
+    assert suppression_redis.lrange(suppression.LOG_KEY, 0, -1) == []
+
+
+def test_saves_update_the_list(addresses, django_capture_on_commit_callbacks):
+    suppression.rebuild()
+    contact = ContactFactory(email="changes@example.com")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        contact.email_opt_out = True
+        contact.save()
+    assert suppressed([contact.email]) == {contact.email}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        contact.email_opt_out = False
+        contact.save()
+    assert suppressed([contact.email]) == set()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        CampaignRecipientFactory(contact=contact, status=CampaignRecipient.RecipientStatus.UNSUBSCRIBED)
+    assert suppressed([contact.email]) == {contact.email}
+
+
+def test_unreachable_redis_falls_back_to_the_database(addresses, monkeypatch):
+    def unreachable():
+        msg = "connection refused"
+        raise redis.ConnectionError(msg)
+
+    monkeypatch.setattr(suppression, "get_redis", unreachable)
+
+    assert suppressed(addresses) == {"opted.out@example.com", " bounced@example.com"}
+
+
+def test_sends_skip_suppressed_recipients():
+    campaign = CampaignFactory(status=Campaign.CampaignStatus.ACTIVE)
+    MarketingEmailFactory(campaign=campaign, sequence_order=1)
+    kept = CampaignRecipientFactory(campaign=campaign, contact=ContactFactory(email="kept@example.com"))
+    blocked = CampaignRecipientFactory(campaign=campaign, contact=ContactFactory(email="blocked@example.com"))
+    CampaignRecipientFactory(contact=blocked.contact, status=CampaignRecipient.RecipientStatus.BOUNCED)
+    suppression.rebuild()
+
+    assert sending.send_batch(campaign.pk, 0, None, 10) == (1, None)
+
+    assert [message.to for message in mail.outbox] == [["kept@example.com"]]
+    assert dict(campaign.recipients.values_list("pk", "status")) == {
+        kept.pk: CampaignRecipient.RecipientStatus.SENT,
+        blocked.pk: CampaignRecipient.RecipientStatus.SUPPRESSED,
+    }
+    campaign.refresh_from_db()
+    assert campaign.status == Campaign.CampaignStatus.COMPLETED
+
+
+def test_suppressed_contacts_are_not_added_to_campaigns(addresses):
+    contacts = ContactFactory.create_batch(2)
+    opted_out = ContactFactory(email_opt_out=True)
+    campaign = CampaignFactory()
+
+    counts = add_campaign_recipients(campaign, [str(contact.pk) for contact in [*contacts, opted_out]])
+
+    assert counts == {"added": 2, "existing": 0, "suppressed": 1, "missing": 0}
+    assert set(campaign.recipients.values_list("contact_id", flat=True)) == {contact.pk for contact in contacts}
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from eventuais.crm.tests.factories import AccountFactory
+from eventuais.crm.tests.factories import ActivityFactory
+from eventuais.crm.tests.factories import ContactFactory
+from eventuais.crm.tests.factories import OpportunityFactory
+from eventuais.crm.tests.factories import SupportTicketFactory
+from eventuais.crm.timeline import account_timeline
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def _log(subject, days_ago, obj):
+    return ActivityFactory(
+        subject=subject,
+        content_type=ContentType.objects.get_for_model(obj),
+        object_id=obj.pk,
+        start_date=timezone.now() - timedelta(days=days_ago),
+    )
+
+
+@pytest.fixture
+def enterprise():
+    parent = AccountFactory(name="Holding")
+    child = AccountFactory(name="Subsidiary", parent=parent)
+    contact = ContactFactory(account=child)
+    _log("account call", 6, parent)
+    _log("child account call", 5, child)
+    _log("contact email", 4, contact)
+    _log("opportunity demo", 3, OpportunityFactory(account=parent, primary_contact=contact))
+    _log("ticket follow-up", 2, SupportTicketFactory(account=child, contact=contact))
+    # Activities of an unrelated account stay out
+    _log("other account call", 1, AccountFactory(name="Other"))
+    return parent, child
+
+
+def test_timeline_merges_the_account_hierarchy_newest_first(api_client, enterprise):
+    parent, child = enterprise
+
+    subjects = [row["subject"] for row in api_client.get(f"/api/crm/accounts/{parent.pk}/timeline/").data["results"]]
+    child_subjects = [
+        row["subject"] for row in api_client.get(f"/api/crm/accounts/{child.pk}/timeline/").data["results"]
+    ]
+
+    assert subjects == ["ticket follow-up", "opportunity demo", "contact email", "child account call", "account call"]
+    assert child_subjects == ["ticket follow-up", "contact email", "child account call"]
+
+
+def test_timeline_pages_with_a_single_activity_query(api_client, enterprise):
+    parent, _ = enterprise
+
+    first = api_client.get(f"/api/crm/accounts/{parent.pk}/timeline/", {"page_size": 3})
+    with CaptureQueriesContext(connection) as context:
+        second = api_client.get(first.data["next"])
+
+    assert [row["subject"] for row in first.data["results"]] == [
+        "ticket follow-up",
+        "opportunity demo",
+        "contact email",
+    ]
+    assert [row["subject"] for row in second.data["results"]] == ["child account call", "account call"]
+    assert second.data["next"] is None
+    assert len([query for query in context.captured_queries if 'FROM "crm_activity"' in query["sql"]]) == 1
+
+
+def test_timeline_uses_the_subject_index(enterprise):
+    parent, _ = enterprise
+    with connection.cursor() as cursor:
+        # Leave bitmap scans, which only an index matching the filter can serve
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("SET LOCAL enable_indexscan = off")
+
+        indexes = connection.introspection.get_constraints(cursor, "crm_activity")
+
+    assert indexes["crm_activity_subject"]["columns"] == ["content_type_id", "object_id", "start_date"]
+    assert "crm_activity_subject" in account_timeline(parent).order_by().explain()
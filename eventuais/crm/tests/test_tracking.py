@@ -0,0 +1,134 @@
+import re
+
+import pytest
+from django.urls import reverse
+
+from eventuais.crm import tracking
+from eventuais.crm.models import CampaignRecipient
+from eventuais.crm.personalization import build_messages
+from eventuais.crm.tests.factories import CampaignFactory
+from eventuais.crm.tests.factories import CampaignRecipientFactory
+from eventuais.crm.tests.factories import MarketingEmailFactory
+from eventuais.crm.tests.fakes import InMemoryRedis
+from eventuais.crm.tracking import apply_events
+from eventuais.crm.tracking import click_url
+from eventuais.crm.tracking import flush_events
+from eventuais.crm.tracking import live_counts
+from eventuais.crm.tracking import open_url
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    client = InMemoryRedis()
+    monkeypatch.setattr(tracking, "get_redis", lambda: client)
+    return client
+
+
+@pytest.fixture
+def email():
+    return MarketingEmailFactory(campaign=CampaignFactory())
+
+
+@pytest.fixture
+def recipients(email):
+    return CampaignRecipientFactory.create_batch(
+        3,
+        campaign=email.campaign,
+        status=CampaignRecipient.RecipientStatus.SENT,
+    )
+
+
+def _path(url):
+    return url.removeprefix("http://localhost:8000")
+
+
+def test_pixel_records_an_open_without_queries(client, redis_client, email, recipients, django_assert_num_queries):
+    recipient = recipients[0]
+
+    with django_assert_num_queries(0):
+        response = client.get(_path(open_url(recipient.campaign_id, recipient.pk, email.pk)))
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/gif"
+    assert "no-cache" in response["Cache-Control"]
+    assert live_counts(recipient.campaign_id.hex) == {"open": 1}
+    assert len(redis_client.stream) == 1
+
+
+def test_tampered_pixel_still_returns_the_image(client, redis_client):
+    response = client.get(reverse("crm-track-open", kwargs={"token": "forged"}))
+
+    assert response.status_code == 200
+    assert redis_client.stream == []
+
+
+def test_click_redirects_to_the_signed_url(client, redis_client, email, recipients):
+    recipient = recipients[0]
+    url = click_url(recipient.campaign_id, recipient.pk, email.pk, "https://example.com/offer?a=1")
+
+    response = client.get(_path(url))
+
+    assert response.status_code == 302
+    assert response["Location"] == "https://example.com/offer?a=1"
+    assert live_counts(recipient.campaign_id.hex) == {"click": 1}
+    assert client.get(_path(url).replace("/click/", "/click/x")).status_code == 404
+
+
+def test_flush_applies_events_in_bulk(client, redis_client, email, recipients, django_assert_max_num_queries):
+    opened, clicked, untouched = recipients
+    for url in [
+        open_url(opened.campaign_id, opened.pk, email.pk),
+        open_url(opened.campaign_id, opened.pk, email.pk),
+        click_url(clicked.campaign_id, clicked.pk, email.pk, "https://example.com"),
+    ]:
+        client.get(_path(url))
+
+    with django_assert_max_num_queries(7):
+        assert flush_events() == 3
+
+    assert redis_client.stream == []
+    for recipient in recipients:
+        recipient.refresh_from_db()
+    assert opened.status == CampaignRecipient.RecipientStatus.OPENED
+    assert opened.opened_at is not None
+    assert opened.clicked_at is None
+    assert clicked.status == CampaignRecipient.RecipientStatus.CLICKED
+    assert clicked.opened_at is not None
+    assert clicked.clicked_at is not None
+    assert untouched.status == CampaignRecipient.RecipientStatus.SENT
+    campaign = opened.campaign
+    campaign.refresh_from_db()
+    assert (campaign.open_count, campaign.click_count) == (2, 1)
+
+    # Replaying the same events changes nothing
+    apply_events([{"e": "click", "c": campaign.pk.hex, "r": clicked.pk.hex, "m": email.pk.hex, "t": "1700000000"}])
+    campaign.refresh_from_db()
+    assert (campaign.open_count, campaign.click_count) == (2, 1)
+
+
+def test_rendered_links_go_through_the_click_redirect(client, redis_client, recipients):
+    email = MarketingEmailFactory(
+        campaign=recipients[0].campaign,
+        html_content='<a href="{% track_click "https://example.com/offer?a=1" %}">Offer</a>',
+        text_content="Offer: {% track_click 'https://example.com/offer?a=1' %}",
+    )
+    recipient = recipients[0]
+
+    [(_, message)] = build_messages(email.campaign, email, [(recipient.pk, recipient.contact_id)])
+    html = message.alternatives[0][0]
+    url = re.search(r'href="([^"]+)"', html).group(1)
+
+    assert url.startswith("http://localhost:8000/")
+    assert url in message.body
+    response = client.get(_path(url))
+    assert response.status_code == 302
+    assert response["Location"] == "https://example.com/offer?a=1"
+
+    flush_events()
+    recipient.refresh_from_db()
+    recipient.campaign.refresh_from_db()
+    assert recipient.status == CampaignRecipient.RecipientStatus.CLICKED
+    assert recipient.clicked_at is not None
+    assert recipient.campaign.click_count == 1
@@ -0,0 +1,75 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from eventuais.crm.models import Contact
+from eventuais.crm.tests.factories import AccountFactory
+from eventuais.crm.tests.factories import ContactFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def _labels(response):
+    assert response.status_code == 200  # noqa: PLR2004
+    return [row["label"] for row in response.data]
+
+
+def test_contacts_match_every_term_as_a_name_or_email_prefix(api_client):
+    ana = ContactFactory(first_name="Ana", last_name="Silva", email="ana@example.com")
+    ContactFactory(first_name="Bia", last_name="Anapolis", email="")
+    ContactFactory(first_name="Carlos", last_name="Lima", email="silva@example.com")
+
+    response = api_client.get("/api/crm/contacts/typeahead/", {"q": "ana"})
+
+    assert _labels(response) == ["Bia Anapolis", "Ana Silva <ana@example.com>"]
+    assert response.data[1] == {"id": str(ana.pk), "label": "Ana Silva <ana@example.com>"}
+    assert _labels(api_client.get("/api/crm/contacts/typeahead/", {"q": "SILVA ana"})) == [
+        "Ana Silva <ana@example.com>",
+    ]
+    assert _labels(api_client.get("/api/crm/contacts/typeahead/", {"q": "silva@"})) == [
+        "Carlos Lima <silva@example.com>",
+    ]
+    assert _labels(api_client.get("/api/crm/contacts/typeahead/", {"q": "%"})) == []
+    assert _labels(api_client.get("/api/crm/contacts/typeahead/", {"q": " "})) == []
+
+
+def test_accounts_match_name_or_email_and_respect_the_limit(api_client, settings):
+    settings.TYPEAHEAD_MAX_LIMIT = 3
+    for number in range(5):
+        AccountFactory(name=f"Acme {number}", email=f"sales{number}@acme.test")
+    AccountFactory(name="Globex", email="acme@globex.test")
+
+    assert _labels(api_client.get("/api/crm/accounts/typeahead/", {"q": "acme", "limit": 2})) == ["Acme 0", "Acme 1"]
+    assert len(api_client.get("/api/crm/accounts/typeahead/", {"q": "acme", "limit": 50}).data) == 3  # noqa: PLR2004
+    assert _labels(api_client.get("/api/crm/accounts/typeahead/", {"q": "acme@"})) == ["Globex"]
+
+
+def test_short_prefixes_are_cached_until_the_table_changes(api_client, django_capture_on_commit_callbacks):
+    ContactFactory(first_name="Ana", last_name="Silva", email="")
+    assert _labels(api_client.get("/api/crm/contacts/typeahead/", {"q": "an"})) == ["Ana Silva"]
+
+    with CaptureQueriesContext(connection) as context:
+        api_client.get("/api/crm/contacts/typeahead/", {"q": "an"})
+    assert not [query for query in context.captured_queries if "crm_contact" in query["sql"]]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ContactFactory(first_name="Anabela", last_name="Souza", email="")
+
+    assert _labels(api_client.get("/api/crm/contacts/typeahead/", {"q": "an"})) == ["Ana Silva", "Anabela Souza"]
+
+
+def test_prefix_matches_use_the_prefix_indexes():
+    queryset = Contact.objects.filter(last_name__istartswith="sil").values("pk")
+    with connection.cursor() as cursor:
+        # Leave bitmap scans, which only an index matching the filter can serve
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("SET LOCAL enable_indexscan = off")
+    assert "crm_contact_last_prefix" in queryset.explain()
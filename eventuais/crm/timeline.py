@@ -0,0 +1,37 @@
+"""The activity timeline of an account and everything under it.
+
+Activities point at their subject through a generic relation, so the
+timeline of an account is the union of the activities logged against the
+account and its MPTT descendants, their contacts, opportunities and support
+tickets. Each group is one ``content_type = X AND object_id IN (subquery)``
+condition; the id sets stay subqueries (descendants are a ``tree_id``/``lft``
+range), so a page of the timeline is a single SQL query answered by the
+``(content_type, object_id, start_date)`` index on ``Activity``.
+"""
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+
+from .models import Activity
+from .models import Contact
+from .models import Opportunity
+from .models import SupportTicket
+
+# Models whose activities belong to the timeline of the account they hang off
+ACCOUNT_CHILDREN = [Contact, Opportunity, SupportTicket]
+
+# Keyset order of a timeline page, newest first
+TIMELINE_ORDERING = ("-start_date", "-id")
+
+
+def account_timeline(account):
+    """Activities of ``account``, its descendant accounts and their contacts, opportunities and tickets."""
+    accounts = account.get_descendants(include_self=True).values("pk")
+    subjects = {type(account): accounts}
+    subjects.update({model: model.objects.filter(account__in=accounts).values("pk") for model in ACCOUNT_CHILDREN})
+
+    content_types = ContentType.objects.get_for_models(*subjects)
+    condition = Q()
+    for model, ids in subjects.items():
+        condition |= Q(content_type=content_types[model], object_id__in=ids)
+    return Activity.objects.filter(condition)
@@ -0,0 +1,183 @@
+"""Open and click tracking for campaign emails.
+
+The tracking endpoints never touch the database. A hit checks its signed
+token and sends one Redis pipeline: ``HINCRBY`` on the campaign's live
+counters and ``XADD`` of the event to a capped stream. That keeps them well
+under a few milliseconds however many recipients open at once.
+
+``flush_events`` (run by Celery beat) drains the stream in batches and applies
+them to the database with a handful of set-based ``UPDATE`` statements: per
+campaign and second, recipients whose ``opened_at``/``clicked_at`` is still
+empty get it set and their status moved forward, and the number of rows
+changed is added to the campaign counters and the engagement rollups. Conditional updates make replays
+harmless, so a flush that fails halfway leaves its events in the stream to be
+retried. A click also counts as an open.
+"""
+
+import time
+from collections import defaultdict
+from datetime import UTC
+from datetime import datetime
+from functools import lru_cache
+from uuid import UUID
+
+import redis
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.db.models import Case
+from django.db.models import F
+from django.db.models import Value
+from django.db.models import When
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+from django.utils import timezone
+
+from .engagement import record_transitions
+from .models import Campaign
+from .models import CampaignRecipient
+from .reports import bump_data_version
+
+OPEN = "open"
+CLICK = "click"
+
+STREAM_KEY = "crm:tracking:events"
+COUNTERS_KEY = "crm:tracking:campaign:{campaign_id}"
+
+# Recipient timestamp set by each event type, and the statuses it moves forward
+EVENT_FIELDS = {
+    OPEN: ("opened_at", [CampaignRecipient.RecipientStatus.SENT], CampaignRecipient.RecipientStatus.OPENED),
+    CLICK: (
+        "clicked_at",
+        [CampaignRecipient.RecipientStatus.SENT, CampaignRecipient.RecipientStatus.OPENED],
+        CampaignRecipient.RecipientStatus.CLICKED,
+    ),
+}
+COUNTER_FIELDS = {OPEN: "open_count", CLICK: "click_count"}
+ENGAGEMENT_METRICS = {OPEN: "opened", CLICK: "clicked"}
+
+# A transparent 1x1 GIF
+PIXEL = (
+    b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\x00\x00\x00"
+    b"!\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+)
+
+_signer = signing.Signer(salt="eventuais.crm.tracking")
+
+
+@lru_cache(maxsize=1)
+def get_redis():
+    return redis.Redis.from_url(settings.REDIS_URL, socket_timeout=settings.TRACKING_REDIS_TIMEOUT)
+
+
+def open_token(campaign_id, recipient_id, email_id):
+    return _signer.sign(".".join(UUID(str(value)).hex for value in (campaign_id, recipient_id, email_id)))
+
+
+def click_token(campaign_id, recipient_id, email_id, url):
+    return _signer.sign_object({"t": open_token(campaign_id, recipient_id, email_id), "u": url}, compress=True)
+
+
+def open_url(campaign_id, recipient_id, email_id):
+    """Absolute URL of the tracking pixel of one recipient in one email."""
+    path = reverse("crm-track-open", kwargs={"token": open_token(campaign_id, recipient_id, email_id)})
+    return f"{settings.TRACKING_BASE_URL}{path}"
+
+
+def click_url(campaign_id, recipient_id, email_id, url):
+    """Absolute URL that records a click of one recipient and redirects to ``url``."""
+    path = reverse("crm-track-click", kwargs={"token": click_token(campaign_id, recipient_id, email_id, url)})
+    return f"{settings.TRACKING_BASE_URL}{path}"
+
+
+def read_open_token(token):
+    """Return ``(campaign_id, recipient_id, email_id)`` hex strings; raise ``signing.BadSignature`` if tampered."""
+    campaign_id, recipient_id, email_id = _signer.unsign(token).split(".")
+    return campaign_id, recipient_id, email_id
+
+
+def read_click_token(token):
+    """Return ``(campaign_id, recipient_id, email_id, url)``; raise ``signing.BadSignature`` if tampered."""
+    data = _signer.unsign_object(token)
+    return (*read_open_token(data["t"]), data["u"])
+
+
+def record_event(event, campaign_id, recipient_id, email_id):
+    """Count an event and queue it for the database in one Redis round trip."""
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.hincrby(COUNTERS_KEY.format(campaign_id=campaign_id), event, 1)
+    pipe.xadd(
+        STREAM_KEY,
+        {"e": event, "c": campaign_id, "r": recipient_id, "m": email_id, "t": f"{time.time():.0f}"},
+        maxlen=settings.TRACKING_STREAM_MAXLEN,
+        approximate=True,
+    )
+    pipe.execute()
+
+
+def live_counts(campaign_id):
+    """Opens and clicks recorded so far, repeats included, before they are flushed."""
+    counts = get_redis().hgetall(COUNTERS_KEY.format(campaign_id=campaign_id))
+    return {_text(key): int(value) for key, value in counts.items()}
+
+
+def flush_events(batch_size=None, max_batches=None):
+    """Apply queued tracking events to recipients and campaign counters and return how many were read."""
+    client = get_redis()
+    batch_size = batch_size or settings.TRACKING_FLUSH_BATCH_SIZE
+    flushed = 0
+    for _ in range(max_batches or settings.TRACKING_FLUSH_MAX_BATCHES):
+        entries = client.xrange(STREAM_KEY, "-", "+", count=batch_size)
+        if not entries:
+            break
+        apply_events([{_text(key): _text(value) for key, value in fields.items()} for _, fields in entries])
+        client.xdel(STREAM_KEY, *[entry_id for entry_id, _ in entries])
+        flushed += len(entries)
+    return flushed
+
+
+def apply_events(events):
+    """Apply decoded stream events with one conditional ``UPDATE`` per event type, campaign, email and second."""
+    groups = defaultdict(set)
+    for event in events:
+        kinds = [OPEN, CLICK] if event["e"] == CLICK else [event["e"]]
+        for kind in kinds:
+            if kind in EVENT_FIELDS:
+                groups[kind, event["c"], event.get("m"), int(event["t"])].add(event["r"])
+
+    counters = defaultdict(lambda: defaultdict(int))
+    transitions = {}
+    with transaction.atomic():
+        # Opens first, so a click in the same batch finds its recipient already opened
+        for kind, campaign_id, email_id, second in sorted(groups, key=lambda group: group[0] != OPEN):
+            field, before, after = EVENT_FIELDS[kind]
+            at = datetime.fromtimestamp(second, tz=UTC)
+            changed = CampaignRecipient.objects.filter(
+                pk__in=groups[kind, campaign_id, email_id, second],
+                campaign_id=campaign_id,
+                **{f"{field}__isnull": True},
+            ).update(
+                **{
+                    "opened_at": Coalesce("opened_at", Value(at)),
+                    field: at,
+                    "status": Case(When(status__in=before, then=Value(after)), default=F("status")),
+                    "updated_at": timezone.now(),
+                },
+            )
+            counters[campaign_id][COUNTER_FIELDS[kind]] += changed
+            transitions[campaign_id, email_id, ENGAGEMENT_METRICS[kind], at] = changed
+
+        for campaign_id, counts in counters.items():
+            if any(counts.values()):
+                Campaign.objects.filter(pk=campaign_id).update(
+                    **{name: F(name) + count for name, count in counts.items()},
+                )
+        record_transitions(transitions)
+        # update() sends no post_save, so retire cached reports here
+        bump_data_version(CampaignRecipient)
+        bump_data_version(Campaign)
+    return counters
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
@@ -0,0 +1,89 @@
+"""Typeahead lookups of contacts and accounts by name and email.
+
+A lookup matches every term of the query as the prefix of one of the model's
+``TYPEAHEAD_FIELDS`` (``ana sil`` finds Ana Silva and silva@anatel.pt) and
+returns at most ``TYPEAHEAD_MAX_LIMIT`` ``{"id", "label"}`` rows read with
+``values_list``, with no serializer or related rows involved. The
+case-insensitive prefix tests compile to ``UPPER(column) LIKE 'ANA%'``, which
+the ``text_pattern_ops`` indexes of :func:`eventuais.crm.search.prefix_index`
+answer with a range scan.
+
+Short prefixes match the most rows and are typed by everyone, so results of
+queries up to ``TYPEAHEAD_CACHE_PREFIX_LENGTH`` characters are kept per
+process, keyed by the table's data version (see
+:func:`eventuais.crm.reports.data_versions`): any write to the table retires
+them, at the cost of one cache read per lookup.
+"""
+
+from functools import reduce
+
+from django.conf import settings
+from django.db.models import Q
+
+from .reports import data_versions
+
+# Columns matched by prefix, label columns and label ordering of each model
+TYPEAHEAD_FIELDS = {
+    "crm.Account": {"match": ["name", "email"], "label": ["name"], "ordering": ["name", "id"]},
+    "crm.Contact": {
+        "match": ["first_name", "last_name", "email"],
+        "label": ["first_name", "last_name", "email"],
+        "ordering": ["last_name", "first_name", "id"],
+    },
+}
+
+# Terms of a query that are matched; the rest are ignored
+MAX_TYPEAHEAD_TERMS = 4
+
+# Query results kept per process
+MAX_CACHED = 1024
+
+_cached = {}
+
+
+def typeahead_matches(model, query, limit=None):
+    """Return up to ``limit`` ``{"id", "label"}`` rows of ``model`` matching the prefixes in ``query``."""
+    terms = query.split()[:MAX_TYPEAHEAD_TERMS]
+    if not terms:
+        return []
+    limit = _limit(limit)
+
+    key = None
+    if len(query.strip()) <= settings.TYPEAHEAD_CACHE_PREFIX_LENGTH:
+        (version,) = data_versions([model])
+        key = (model._meta.label, " ".join(terms).lower(), limit, version)  # noqa: SLF001
+        if key in _cached:
+            return _cached[key]
+
+    results = _lookup(model, terms, limit)
+    if key is not None:
+        if len(_cached) >= MAX_CACHED:
+            _cached.clear()
+        _cached[key] = results
+    return results
+
+
+def _lookup(model, terms, limit):
+    config = TYPEAHEAD_FIELDS[model._meta.label]  # noqa: SLF001
+    matches = reduce(
+        Q.__and__,
+        (reduce(Q.__or__, (Q(**{f"{field}__istartswith": term}) for field in config["match"])) for term in terms),
+    )
+    rows = model.objects.filter(matches).order_by(*config["ordering"]).values_list("pk", *config["label"])
+    return [{"id": str(pk), "label": _label(*label)} for pk, *label in rows[:limit]]
+
+
+def _label(name, *rest):
+    if not rest:
+        return name
+    first_name, last_name, email = name, *rest
+    full_name = f"{first_name} {last_name}".strip()
+    return f"{full_name} <{email}>" if email else full_name
+
+
+def _limit(value):
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return settings.TYPEAHEAD_LIMIT
+    return min(max(limit, 1), settings.TYPEAHEAD_MAX_LIMIT)
@@ -0,0 +1,102 @@
+"""Typed copies of custom field values.
+
+``CustomFieldValue.value`` holds every value as text. Number, date,
+date & time, boolean and multi-select values are also parsed into a column
+of their own type when saved, and partial ``(field, <typed column>)``
+indexes make filters such as ``cf_revenue__gte=1000`` a range scan over
+one field's values instead of a cast over every row.
+
+This module knows nothing about models so that models can import it. The
+backfill migration keeps its own frozen copy of these rules.
+"""
+
+import datetime
+import json
+from contextlib import suppress
+from decimal import Decimal
+from decimal import InvalidOperation
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+# Typed column of each custom field type; the other types are only stored as text
+TYPED_COLUMNS = {
+    "number": "number_value",
+    "date": "date_value",
+    "datetime": "datetime_value",
+    "boolean": "bool_value",
+    "multiselect": "json_value",
+}
+
+# Lookups a filter may use on each typed column
+COLUMN_LOOKUPS = {
+    "number_value": {"exact", "gt", "gte", "lt", "lte"},
+    "date_value": {"exact", "gt", "gte", "lt", "lte"},
+    "datetime_value": {"exact", "gt", "gte", "lt", "lte"},
+    "bool_value": {"exact"},
+    "json_value": {"contains"},
+    "value": {"exact", "iexact", "startswith", "istartswith"},
+}
+
+# Digits kept of a number value; larger ones are left untyped
+NUMBER_DIGITS = 24
+NUMBER_PLACES = 6
+
+TRUE_WORDS = {"true", "1", "yes", "on"}
+FALSE_WORDS = {"false", "0", "no", "off"}
+
+
+def parse_number(text):
+    number = Decimal(text)
+    if not number.is_finite() or number.adjusted() >= NUMBER_DIGITS - NUMBER_PLACES:
+        msg = f"{text!r} is not a storable number"
+        raise ValueError(msg)
+    return number.quantize(Decimal(1).scaleb(-NUMBER_PLACES))
+
+
+def parse_datetime_value(text):
+    moment = parse_datetime(text)
+    if moment is None:
+        moment = datetime.datetime.combine(datetime.date.fromisoformat(text), datetime.time())
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def parse_bool(text):
+    word = text.lower()
+    if word not in TRUE_WORDS | FALSE_WORDS:
+        msg = f"{text!r} is not a boolean"
+        raise ValueError(msg)
+    return word in TRUE_WORDS
+
+
+def parse_choices(text):
+    """A multi-select value: a JSON array, or comma-separated choices."""
+    if text.startswith("["):
+        choices = json.loads(text)
+        if not isinstance(choices, list):
+            msg = f"{text!r} is not a list of choices"
+            raise ValueError(msg)
+        return [str(choice) for choice in choices]
+    return [choice.strip() for choice in text.split(",") if choice.strip()]
+
+
+PARSERS = {
+    "number_value": parse_number,
+    "date_value": datetime.date.fromisoformat,
+    "datetime_value": parse_datetime_value,
+    "bool_value": parse_bool,
+    "json_value": parse_choices,
+}
+
+
+def typed_columns(field_type, text):
+    """Return every typed column for a value of ``field_type``: its own parsed, the others ``None``.
+
+    Text that does not parse leaves its column ``None``; the text itself is kept as it is.
+    """
+    columns = dict.fromkeys(PARSERS)
+    column = TYPED_COLUMNS.get(field_type)
+    if column is not None and text.strip():
+        with suppress(ValueError, InvalidOperation):
+            columns[column] = PARSERS[column](text.strip())
+    return columns
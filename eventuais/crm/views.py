@@ -1,21 +1,40 @@
+import logging
+
+import redis
 from django.contrib.contenttypes.models import ContentType
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import Http404
+from django.http import HttpResponse
+from django.http import HttpResponseRedirect
+from django.utils import timezone
+from django.utils.cache import add_never_cache_headers
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 from rest_framework import permissions
 from rest_framework import status
 from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 
 from eventuais.crm.models import Account
 from eventuais.crm.models import Activity
+from eventuais.crm.models import AudienceBuild
 from eventuais.crm.models import Campaign
+from eventuais.crm.models import CampaignEngagement
 from eventuais.crm.models import CampaignRecipient
 from eventuais.crm.models import Contact
 from eventuais.crm.models import CustomField
 from eventuais.crm.models import CustomFieldValue
 from eventuais.crm.models import Dashboard
 from eventuais.crm.models import DashboardItem
+from eventuais.crm.models import ImportJob
 from eventuais.crm.models import MarketingEmail
 from eventuais.crm.models import Opportunity
 from eventuais.crm.models import Report
@@ -24,10 +43,47 @@ from eventuais.crm.models import SocialProfile
 from eventuais.crm.models import SupportTicket
 from eventuais.crm.models import Tag
 from eventuais.crm.models import TicketMessage
-
+from eventuais.users.models import User
+
+from .access import accessible_ids
+from .audiences import expression_filter
+from .bitmaps import SegmentExpressionError
+from .bitmaps import evaluate
+from .bitmaps import expression_segments
+from .bitmaps import overlaps
+from .bulk import add_campaign_recipients
+from .bulk import add_segment_contacts
+from .bulk import is_ndjson
+from .bulk import iter_contact_ids
+from .bulk import remove_campaign_recipients
+from .bulk import remove_segment_contacts
+from .dashboards import render_dashboard
+from .engagement import campaign_engagement
+from .exports import ACCOUNT_EXPORT
+from .exports import ACTIVITY_EXPORT
+from .exports import CONTACT_EXPORT
+from .exports import OPPORTUNITY_EXPORT
+from .filters import CustomFieldFilter
+from .filters import FullTextSearchFilter
+from .membership import rebuild_segment
+from .membership import segment_contacts
+from .mixins import CustomFieldsMixin
+from .mixins import ExportMixin
+from .mixins import QuerysetProfileMixin
+from .mixins import apply_profile
+from .mixins import related_only
+from .reports import ReportConfigError
+from .reports import run_report
+from .segments import SegmentCriteriaError
+from .segments import segment_queryset
+from .sending import first_email
+from .sending import sendable_recipients
+from .sending import start_campaign
 from .serializers import AccountDetailSerializer
 from .serializers import AccountSerializer
+from .serializers import AccountTreeSerializer
 from .serializers import ActivitySerializer
+from .serializers import AudienceBuildSerializer
 from .serializers import CampaignRecipientSerializer
 from .serializers import CampaignSerializer
 from .serializers import ContactDetailSerializer
@@ -38,6 +94,7 @@ from .serializers import CustomFieldSerializer
 from .serializers import CustomFieldValueSerializer
 from .serializers import DashboardItemSerializer
 from .serializers import DashboardSerializer
+from .serializers import ImportJobSerializer
 from .serializers import MarketingEmailSerializer
 from .serializers import OpportunityListSerializer
 from .serializers import OpportunitySerializer
@@ -47,25 +104,68 @@ from .serializers import SocialProfileSerializer
 from .serializers import SupportTicketSerializer
 from .serializers import TagSerializer
 from .serializers import TicketMessageSerializer
+from .tasks import build_campaign_audience
+from .tasks import run_import_job
+from .tasks import send_campaign
+from .timeline import TIMELINE_ORDERING
+from .timeline import account_timeline
+from .tracking import CLICK
+from .tracking import OPEN
+from .tracking import PIXEL
+from .tracking import read_click_token
+from .tracking import read_open_token
+from .tracking import record_event
+from .typeahead import typeahead_matches
+
+logger = logging.getLogger(__name__)
+
+# Content types and generic targets are filled in by the serializers (see ``generic``)
+ACTIVITY_PROFILE = {"select_related": ["created_by", "assigned_to", "performed_by"]}
+
+ACCOUNT_PROFILE = {
+    "select_related": ["parent", "primary_contact", "assigned_to", "created_by", "rollup"],
+    "prefetch_related": ["tags", "contacts", "social_profiles"],
+}
+CONTACT_PROFILE = {
+    "select_related": ["account", "assigned_to", "created_by", "parent"],
+    "prefetch_related": ["tags", "social_profiles"],
+}
+
+
+def _detailed_profile(profile):
+    """Extend an Account/Contact profile with the relations of the 360° detail serializers."""
+    return {
+        **profile,
+        "prefetch_related": [
+            *profile["prefetch_related"],
+            "opportunities",
+            Prefetch("activities", queryset=apply_profile(Activity.objects.all(), ACTIVITY_PROFILE)),
+        ],
+    }
 
 
 class TagViewSet(viewsets.ModelViewSet):
     """ViewSet for managing Tags."""
 
     queryset = Tag.objects.all()
+    cursor_ordering = ("name", "id")
     serializer_class = TagSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter]
     search_fields = ["name"]
 
 
-class ActivityViewSet(viewsets.ModelViewSet):
+class ActivityViewSet(ExportMixin, QuerysetProfileMixin, viewsets.ModelViewSet):
     """ViewSet for managing Activities."""
 
     queryset = Activity.objects.all()
+    cursor_ordering = ("-start_date", "-id")
+    queryset_profiles = {"default": ACTIVITY_PROFILE, "export": {}}
+    export_columns = ACTIVITY_EXPORT
+    export_filename = "activities"
     serializer_class = ActivitySerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ["activity_type", "is_completed", "created_by", "assigned_to"]
     search_fields = ["subject", "description"]
     ordering_fields = ["due_date", "created_at", "completion_date"]
@@ -76,7 +176,7 @@ class ActivityViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["GET"])
     def my_activities(self, request):
         """Return activities assigned to the current user."""
-        activities = self.queryset.filter(assigned_to=request.user)
+        activities = self.get_queryset().filter(assigned_to=request.user)
         page = self.paginate_queryset(activities)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -89,7 +189,7 @@ class ActivityViewSet(viewsets.ModelViewSet):
         """Return overdue activities."""
         from django.utils import timezone
 
-        activities = self.queryset.filter(due_date__lt=timezone.now(), is_completed=False)
+        activities = self.get_queryset().filter(due_date__lt=timezone.now(), is_completed=False)
         page = self.paginate_queryset(activities)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -98,10 +198,11 @@ class ActivityViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class CustomFieldViewSet(viewsets.ModelViewSet):
+class CustomFieldViewSet(QuerysetProfileMixin, viewsets.ModelViewSet):
     """ViewSet for managing Custom Fields."""
 
     queryset = CustomField.objects.all()
+    queryset_profiles = {"default": {"select_related": ["content_type"]}}
     serializer_class = CustomFieldSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
@@ -119,7 +220,7 @@ class CustomFieldViewSet(viewsets.ModelViewSet):
 
         try:
             content_type = ContentType.objects.get(app_label=app_label, model=model_name)
-            fields = self.queryset.filter(content_type=content_type)
+            fields = self.get_queryset().filter(content_type=content_type)
             serializer = self.get_serializer(fields, many=True)
             return Response(serializer.data)
         except ContentType.DoesNotExist:
@@ -128,10 +229,11 @@ class CustomFieldViewSet(viewsets.ModelViewSet):
             )
 
 
-class CustomFieldValueViewSet(viewsets.ModelViewSet):
+class CustomFieldValueViewSet(QuerysetProfileMixin, viewsets.ModelViewSet):
     """ViewSet for managing Custom Field Values."""
 
     queryset = CustomFieldValue.objects.all()
+    queryset_profiles = {"default": {"select_related": ["field"]}}
     serializer_class = CustomFieldValueSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
@@ -149,7 +251,7 @@ class CustomFieldValueViewSet(viewsets.ModelViewSet):
             )
 
         try:
-            values = self.queryset.filter(object_id=object_id, content_type_id=content_type_id)
+            values = self.get_queryset().filter(object_id=object_id, content_type_id=content_type_id)
             serializer = self.get_serializer(values, many=True)
             return Response(serializer.data)
         except Exception as e:
@@ -167,13 +269,17 @@ class SocialProfileViewSet(viewsets.ModelViewSet):
     search_fields = ["username", "url"]
 
 
-class AccountViewSet(viewsets.ModelViewSet):
+class AccountViewSet(CustomFieldsMixin, ExportMixin, QuerysetProfileMixin, viewsets.ModelViewSet):
     """ViewSet for managing Accounts."""
 
     queryset = Account.objects.all()
+    queryset_profiles = {"default": ACCOUNT_PROFILE, "export": {}, "timeline": {}, "tree": {}}
+    action_cursor_orderings = {"timeline": TIMELINE_ORDERING, "tree": ("lft", "id")}
+    export_columns = ACCOUNT_EXPORT
+    export_filename = "accounts"
     serializer_class = AccountSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, CustomFieldFilter, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ["account_type", "industry", "assigned_to", "tags"]
     search_fields = ["name", "description", "email", "phone", "city", "country"]
     ordering_fields = ["name", "created_at"]
@@ -181,15 +287,26 @@ class AccountViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    def get_queryset(self):
+        if self.action == "retrieve" and self.request.query_params.get("detailed", False):
+            return apply_profile(Account.objects.all(), _detailed_profile(ACCOUNT_PROFILE))
+        return super().get_queryset()
+
     def get_serializer_class(self):
         if self.action == "retrieve" and self.request.query_params.get("detailed", False):
             return AccountDetailSerializer
         return super().get_serializer_class()
 
+    @action(detail=False, methods=["GET"])
+    def typeahead(self, request):
+        """Return up to ``limit`` ``{id, label}`` accounts whose name or email starts with the terms in ``q``."""
+        params = request.query_params
+        return Response(typeahead_matches(Account, params.get("q", ""), params.get("limit")))
+
     @action(detail=False, methods=["GET"])
     def my_accounts(self, request):
         """Return accounts assigned to the current user."""
-        accounts = self.queryset.filter(assigned_to=request.user)
+        accounts = self.get_queryset().filter(assigned_to=request.user)
         page = self.paginate_queryset(accounts)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -226,7 +343,10 @@ class AccountViewSet(viewsets.ModelViewSet):
         """Return activities for a specific account."""
         account = self.get_object()
         content_type = ContentType.objects.get_for_model(Account)
-        activities = Activity.objects.filter(content_type=content_type, object_id=account.id)
+        activities = apply_profile(
+            Activity.objects.filter(content_type=content_type, object_id=account.id),
+            ACTIVITY_PROFILE,
+        )
         page = self.paginate_queryset(activities)
         if page is not None:
             serializer = ActivitySerializer(page, many=True)
@@ -234,14 +354,40 @@ class AccountViewSet(viewsets.ModelViewSet):
         serializer = ActivitySerializer(activities, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=["GET"])
+    def tree(self, request, pk=None):
+        """Return an account and all its descendants in tree order, each with the rollups of its subtree."""
+        accounts = self.get_object().get_descendants(include_self=True).select_related("rollup")
+        page = self.paginate_queryset(accounts)
+        if page is not None:
+            serializer = AccountTreeSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = AccountTreeSerializer(accounts, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=["GET"])
+    def timeline(self, request, pk=None):
+        """Return the activities of an account, its child accounts and their contacts, opportunities and tickets."""
+        activities = apply_profile(account_timeline(self.get_object()), ACTIVITY_PROFILE)
+        page = self.paginate_queryset(activities)
+        if page is not None:
+            serializer = ActivitySerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = ActivitySerializer(activities.order_by(*TIMELINE_ORDERING), many=True)
+        return Response(serializer.data)
+
 
-class ContactViewSet(viewsets.ModelViewSet):
+class ContactViewSet(CustomFieldsMixin, ExportMixin, QuerysetProfileMixin, viewsets.ModelViewSet):
     """ViewSet for managing Contacts."""
 
     queryset = Contact.objects.all()
+    cursor_ordering = ("last_name", "first_name", "id")
+    queryset_profiles = {"default": CONTACT_PROFILE, "export": {}}
+    export_columns = CONTACT_EXPORT
+    export_filename = "contacts"
     serializer_class = ContactSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, CustomFieldFilter, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ["status", "account", "assigned_to", "tags"]
     search_fields = ["first_name", "last_name", "email", "phone", "mobile", "city", "country", "description"]
     ordering_fields = ["last_name", "first_name", "created_at"]
@@ -249,15 +395,26 @@ class ContactViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    def get_queryset(self):
+        if self.action == "retrieve" and self.request.query_params.get("detailed", False):
+            return apply_profile(Contact.objects.all(), _detailed_profile(CONTACT_PROFILE))
+        return super().get_queryset()
+
     def get_serializer_class(self):
         if self.action == "retrieve" and self.request.query_params.get("detailed", False):
             return ContactDetailSerializer
         return super().get_serializer_class()
 
+    @action(detail=False, methods=["GET"])
+    def typeahead(self, request):
+        """Return up to ``limit`` ``{id, label}`` contacts whose name or email starts with the terms in ``q``."""
+        params = request.query_params
+        return Response(typeahead_matches(Contact, params.get("q", ""), params.get("limit")))
+
     @action(detail=False, methods=["GET"])
     def my_contacts(self, request):
         """Return contacts assigned to the current user."""
-        contacts = self.queryset.filter(assigned_to=request.user)
+        contacts = self.get_queryset().filter(assigned_to=request.user)
         page = self.paginate_queryset(contacts)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -282,7 +439,10 @@ class ContactViewSet(viewsets.ModelViewSet):
         """Return activities for a specific contact."""
         contact = self.get_object()
         content_type = ContentType.objects.get_for_model(Contact)
-        activities = Activity.objects.filter(content_type=content_type, object_id=contact.id)
+        activities = apply_profile(
+            Activity.objects.filter(content_type=content_type, object_id=contact.id),
+            ACTIVITY_PROFILE,
+        )
         page = self.paginate_queryset(activities)
         if page is not None:
             serializer = ActivitySerializer(page, many=True)
@@ -291,13 +451,25 @@ class ContactViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class OpportunityViewSet(viewsets.ModelViewSet):
+class OpportunityViewSet(CustomFieldsMixin, ExportMixin, QuerysetProfileMixin, viewsets.ModelViewSet):
     """ViewSet for managing Opportunities."""
 
     queryset = Opportunity.objects.all()
+    cursor_ordering = ("-expected_close_date", "id")
+    queryset_profiles = {
+        "default": {
+            "select_related": ["account", "primary_contact", "assigned_to", "created_by"],
+            "prefetch_related": ["tags"],
+        },
+        # Aggregates and flat rows only, so skip the joins
+        "pipeline": {},
+        "export": {},
+    }
+    export_columns = OPPORTUNITY_EXPORT
+    export_filename = "opportunities"
     serializer_class = OpportunitySerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, CustomFieldFilter, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ["stage", "account", "primary_contact", "assigned_to", "tags"]
     search_fields = ["name", "description", "next_step"]
     ordering_fields = ["expected_close_date", "amount", "probability", "created_at"]
@@ -308,7 +480,7 @@ class OpportunityViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["GET"])
     def my_opportunities(self, request):
         """Return opportunities assigned to the current user."""
-        opportunities = self.queryset.filter(assigned_to=request.user)
+        opportunities = self.get_queryset().filter(assigned_to=request.user)
         page = self.paginate_queryset(opportunities)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -322,7 +494,8 @@ class OpportunityViewSet(viewsets.ModelViewSet):
         from django.db.models import Sum, Count, Avg
 
         pipeline_data = (
-            self.queryset.values("stage")
+            self.get_queryset()
+            .values("stage")
             .annotate(
                 count=Count("id"),
                 total_amount=Sum("amount"),
@@ -339,7 +512,10 @@ class OpportunityViewSet(viewsets.ModelViewSet):
         """Return activities for a specific opportunity."""
         opportunity = self.get_object()
         content_type = ContentType.objects.get_for_model(Opportunity)
-        activities = Activity.objects.filter(content_type=content_type, object_id=opportunity.id)
+        activities = apply_profile(
+            Activity.objects.filter(content_type=content_type, object_id=opportunity.id),
+            ACTIVITY_PROFILE,
+        )
         page = self.paginate_queryset(activities)
         if page is not None:
             serializer = ActivitySerializer(page, many=True)
@@ -352,6 +528,7 @@ class ContentTypeViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for browsing available content types."""
 
     queryset = ContentType.objects.all()
+    cursor_ordering = ("app_label", "model", "id")
     serializer_class = ContentTypeSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
@@ -366,10 +543,16 @@ class ContentTypeViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
-class CampaignViewSet(viewsets.ModelViewSet):
+class CampaignViewSet(QuerysetProfileMixin, viewsets.ModelViewSet):
     """ViewSet for managing Campaigns."""
 
     queryset = Campaign.objects.all()
+    cursor_ordering = ("-created_at", "-id")
+    queryset_profiles = {
+        "default": {"select_related": ["assigned_to", "created_by"], "prefetch_related": ["tags"]},
+        "engagement": {},
+        "audience": {},
+    }
     serializer_class = CampaignSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -383,7 +566,7 @@ class CampaignViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["GET"])
     def my_campaigns(self, request):
         """Return campaigns assigned to the current user."""
-        campaigns = self.queryset.filter(assigned_to=request.user)
+        campaigns = self.get_queryset().filter(assigned_to=request.user)
         page = self.paginate_queryset(campaigns)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -395,7 +578,7 @@ class CampaignViewSet(viewsets.ModelViewSet):
     def emails(self, request, pk=None):
         """Return emails for a specific campaign."""
         campaign = self.get_object()
-        emails = campaign.emails.all()
+        emails = campaign.emails.select_related("created_by", "campaign")
         page = self.paginate_queryset(emails)
         if page is not None:
             serializer = MarketingEmailSerializer(page, many=True)
@@ -407,7 +590,7 @@ class CampaignViewSet(viewsets.ModelViewSet):
     def recipients(self, request, pk=None):
         """Return recipients for a specific campaign."""
         campaign = self.get_object()
-        recipients = campaign.recipients.all()
+        recipients = campaign.recipients.select_related("campaign", "contact")
         page = self.paginate_queryset(recipients)
         if page is not None:
             serializer = CampaignRecipientSerializer(page, many=True)
@@ -415,14 +598,115 @@ class CampaignViewSet(viewsets.ModelViewSet):
         serializer = CampaignRecipientSerializer(recipients, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=["GET", "POST"])
+    def audience(self, request, pk=None):
+        """List the campaign's audience builds, or start one in the background.
+
+        POST ``{"expression": ...}`` adds the contacts selected by a segment
+        expression (see ``SegmentViewSet.combine``); POST ``{"build_id": ...}``
+        resumes a failed build from where it stopped.
+        """
+        campaign = self.get_object()
+        if request.method == "GET":
+            builds = campaign.audience_builds.all()
+            page = self.paginate_queryset(builds)
+            if page is not None:
+                serializer = AudienceBuildSerializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            return Response(AudienceBuildSerializer(builds, many=True).data)
+
+        build_id = request.data.get("build_id")
+        if build_id:
+            try:
+                build = campaign.audience_builds.get(pk=build_id)
+            except (AudienceBuild.DoesNotExist, ValidationError):
+                return Response({"error": "Audience build not found"}, status=status.HTTP_404_NOT_FOUND)
+            if build.status != AudienceBuild.JobStatus.FAILED:
+                return Response(
+                    {"error": f"A {build.status} audience build cannot be resumed"},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            build.status = AudienceBuild.JobStatus.PENDING
+            build.save(update_fields=["status", "updated_at"])
+        else:
+            expression = request.data.get("expression")
+            if expression is None:
+                return Response({"error": "expression is required"}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                expression_filter(expression)
+            except SegmentExpressionError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            build = AudienceBuild.objects.create(campaign=campaign, expression=expression, created_by=request.user)
+
+        transaction.on_commit(lambda: build_campaign_audience.delay(str(build.pk)))
+        return Response(AudienceBuildSerializer(build).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["POST"])
+    def send(self, request, pk=None):
+        """Start sending the campaign's first email to its pending recipients in the background."""
+        campaign = self.get_object()
+        if first_email(campaign) is None:
+            return Response({"error": "Campaign has no email to send"}, status=status.HTTP_400_BAD_REQUEST)
+        generation = start_campaign(campaign)
+        if generation is None:
+            return Response(
+                {"error": f"A {campaign.status} campaign cannot be sent"},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        transaction.on_commit(lambda: send_campaign.delay(str(campaign.pk), generation))
+        return Response(
+            {"campaign_id": str(campaign.pk), "pending": sendable_recipients(campaign.pk).count()},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @action(detail=True, methods=["GET"])
+    def engagement(self, request, pk=None):
+        """Return the engagement funnel and time series of a campaign from its rollups.
+
+        Query parameters: ``granularity`` (minute, hour or day; default hour),
+        ``since``/``until`` (ISO datetimes) and ``email`` (a marketing email id).
+        """
+        campaign = self.get_object()
+        granularity = request.query_params.get("granularity", CampaignEngagement.Granularity.HOUR)
+        if granularity not in CampaignEngagement.Granularity.values:
+            return Response(
+                {"error": f"granularity must be one of {', '.join(CampaignEngagement.Granularity.values)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        bounds = {}
+        for name in ("since", "until"):
+            value = request.query_params.get(name)
+            try:
+                bounds[name] = parse_datetime(value) if value else None
+            except ValueError:
+                bounds[name] = None
+            if value and bounds[name] is None:
+                return Response({"error": f"{name} must be an ISO datetime"}, status=status.HTTP_400_BAD_REQUEST)
+            if bounds[name] is not None and timezone.is_naive(bounds[name]):
+                bounds[name] = timezone.make_aware(bounds[name])
+
+        email_id = request.query_params.get("email")
+        try:
+            unknown_email = bool(email_id) and not campaign.emails.filter(pk=email_id).exists()
+        except ValidationError:
+            unknown_email = True
+        if unknown_email:
+            return Response({"error": "email is not an email of this campaign"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(campaign_engagement(campaign, granularity, email_id=email_id or None, **bounds))
 
-class MarketingEmailViewSet(viewsets.ModelViewSet):
+
+class MarketingEmailViewSet(QuerysetProfileMixin, viewsets.ModelViewSet):
     """ViewSet for managing Marketing Emails."""
 
     queryset = MarketingEmail.objects.all()
+    cursor_ordering = ("campaign_id", "sequence_order")
+    queryset_profiles = {"default": {"select_related": ["created_by", "campaign"]}}
     serializer_class = MarketingEmailSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ["campaign", "sequence_order"]
     search_fields = ["name", "subject", "html_content", "text_content"]
     ordering_fields = ["campaign", "sequence_order", "created_at"]
@@ -437,7 +721,7 @@ class MarketingEmailViewSet(viewsets.ModelViewSet):
         if not campaign_id:
             return Response({"error": "campaign_id parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        emails = self.queryset.filter(campaign_id=campaign_id).order_by("sequence_order")
+        emails = self.get_queryset().filter(campaign_id=campaign_id).order_by("sequence_order")
         page = self.paginate_queryset(emails)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -446,10 +730,11 @@ class MarketingEmailViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class CampaignRecipientViewSet(viewsets.ModelViewSet):
+class CampaignRecipientViewSet(QuerysetProfileMixin, viewsets.ModelViewSet):
     """ViewSet for managing Campaign Recipients."""
 
     queryset = CampaignRecipient.objects.all()
+    queryset_profiles = {"default": {"select_related": ["campaign", "contact"]}}
     serializer_class = CampaignRecipientSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -459,52 +744,84 @@ class CampaignRecipientViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["POST"])
     def add_contacts(self, request):
-        """Add multiple contacts to a campaign."""
-        campaign_id = request.data.get("campaign_id")
-        contact_ids = request.data.get("contact_ids", [])
+        """Add multiple contacts to a campaign.
 
-        if not campaign_id:
-            return Response({"error": "campaign_id is required"}, status=status.HTTP_400_BAD_REQUEST)
-        if not contact_ids:
+        Accepts ``campaign_id`` and ``contact_ids`` in a JSON body, or an NDJSON body of contact ids
+        with ``campaign_id`` passed as a query parameter.
+        """
+        campaign = self._get_bulk_campaign(request)
+        if isinstance(campaign, Response):
+            return campaign
+
+        try:
+            with transaction.atomic():
+                counts = add_campaign_recipients(campaign, iter_contact_ids(request))
+        except ValueError as e:
+            return Response({"error": f"Invalid contact id list: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not sum(counts.values()):
             return Response({"error": "contact_ids list is required"}, status=status.HTTP_400_BAD_REQUEST)
 
+        return Response(
+            {
+                "message": (
+                    f"Added {counts['added']} contacts to campaign. {counts['existing']} were already recipients, "
+                    f"{counts['suppressed']} are suppressed."
+                ),
+                **counts,
+            }
+        )
+
+    @action(detail=False, methods=["POST"])
+    def remove_contacts(self, request):
+        """Remove pending recipients from a campaign, taking the same input as ``add_contacts``."""
+        campaign = self._get_bulk_campaign(request)
+        if isinstance(campaign, Response):
+            return campaign
+
         try:
-            campaign = Campaign.objects.get(id=campaign_id)
-            created_count = 0
-            existing_count = 0
-
-            for contact_id in contact_ids:
-                try:
-                    contact = Contact.objects.get(id=contact_id)
-                    _, created = CampaignRecipient.objects.get_or_create(
-                        campaign=campaign,
-                        contact=contact,
-                        defaults={"status": CampaignRecipient.RecipientStatus.PENDING},
-                    )
-                    if created:
-                        created_count += 1
-                    else:
-                        existing_count += 1
-                except Contact.DoesNotExist:
-                    continue
+            with transaction.atomic():
+                counts = remove_campaign_recipients(campaign, iter_contact_ids(request))
+        except ValueError as e:
+            return Response({"error": f"Invalid contact id list: {e}"}, status=status.HTTP_400_BAD_REQUEST)
 
-            return Response(
-                {
-                    "message": f"Added {created_count} contacts to campaign. {existing_count} were already recipients.",
-                    "added": created_count,
-                    "existing": existing_count,
-                }
-            )
-        except Campaign.DoesNotExist:
+        if not sum(counts.values()):
+            return Response({"error": "contact_ids list is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"message": f"Removed {counts['removed']} contacts from campaign.", **counts})
+
+    def _get_bulk_campaign(self, request):
+        if is_ndjson(request):
+            campaign_id = request.query_params.get("campaign_id")
+        else:
+            campaign_id = request.data.get("campaign_id")
+
+        if not campaign_id:
+            return Response({"error": "campaign_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            return Campaign.objects.get(id=campaign_id)
+        except (Campaign.DoesNotExist, ValidationError):
             return Response({"error": "Campaign not found"}, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SegmentViewSet(viewsets.ModelViewSet):
+class SegmentViewSet(QuerysetProfileMixin, viewsets.ModelViewSet):
     """ViewSet for managing Segments."""
 
     queryset = Segment.objects.all()
+    queryset_profiles = {
+        "default": {
+            "select_related": ["created_by"],
+            "prefetch_related": [related_only("static_contacts", Contact.objects.all())],
+        },
+        # Membership actions only need the segment row itself
+        "contacts": {},
+        "refresh": {},
+        "add_contacts": {},
+        "remove_contacts": {},
+        "overlap": {},
+        "combine": {},
+    }
     serializer_class = SegmentSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -520,14 +837,8 @@ class SegmentViewSet(viewsets.ModelViewSet):
         """Return contacts in this segment."""
         segment = self.get_object()
 
-        # For static segments, use the explicit contacts
-        if not segment.is_dynamic:
-            contacts = segment.static_contacts.all()
-        else:
-            # For dynamic segments, we'd execute the criteria logic
-            # This is a placeholder - in a real app you'd process the criteria JSON
-            # to build a dynamic query
-            contacts = Contact.objects.none()
+        # Static segments use the explicit contacts, dynamic ones their materialized membership
+        contacts = segment_contacts(segment)
 
         page = self.paginate_queryset(contacts)
         if page is not None:
@@ -536,83 +847,116 @@ class SegmentViewSet(viewsets.ModelViewSet):
         serializer = ContactListSerializer(contacts, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=["POST"])
+    def refresh(self, request, pk=None):
+        """Recompute the membership of a dynamic segment from its criteria."""
+        segment = self.get_object()
+
+        if not segment.is_dynamic:
+            return Response({"error": "Only dynamic segments can be refreshed"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            segment_queryset(segment)
+        except SegmentCriteriaError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        contact_count = rebuild_segment(segment)
+        return Response({"message": f"Segment now has {contact_count} contacts.", "contact_count": contact_count})
+
     @action(detail=True, methods=["POST"])
     def add_contacts(self, request, pk=None):
-        """Add contacts to a static segment."""
+        """Add contacts to a static segment from a JSON ``contact_ids`` list or an NDJSON body."""
         segment = self.get_object()
-        contact_ids = request.data.get("contact_ids", [])
 
         if segment.is_dynamic:
             return Response(
                 {"error": "Cannot manually add contacts to a dynamic segment"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        if not contact_ids:
-            return Response({"error": "contact_ids list is required"}, status=status.HTTP_400_BAD_REQUEST)
-
-        added_count = 0
-        for contact_id in contact_ids:
-            try:
-                contact = Contact.objects.get(id=contact_id)
-                segment.static_contacts.add(contact)
-                added_count += 1
-            except Contact.DoesNotExist:
-                continue
+        try:
+            with transaction.atomic():
+                counts = add_segment_contacts(segment, iter_contact_ids(request))
+        except ValueError as e:
+            return Response({"error": f"Invalid contact id list: {e}"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Update the contact count
-        segment.contact_count = segment.static_contacts.count()
-        segment.save()
+        if not sum(counts.values()):
+            return Response({"error": "contact_ids list is required"}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(
             {
-                "message": f"Added {added_count} contacts to segment.",
-                "added": added_count,
+                "message": f"Added {counts['added']} contacts to segment.",
+                "contact_count": segment.contact_count,
+                **counts,
             }
         )
 
     @action(detail=True, methods=["POST"])
     def remove_contacts(self, request, pk=None):
-        """Remove contacts from a static segment."""
+        """Remove contacts from a static segment from a JSON ``contact_ids`` list or an NDJSON body."""
         segment = self.get_object()
-        contact_ids = request.data.get("contact_ids", [])
 
         if segment.is_dynamic:
             return Response(
                 {"error": "Cannot manually remove contacts from a dynamic segment"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        if not contact_ids:
-            return Response({"error": "contact_ids list is required"}, status=status.HTTP_400_BAD_REQUEST)
-
-        removed_count = 0
-        for contact_id in contact_ids:
-            try:
-                contact = Contact.objects.get(id=contact_id)
-                if contact in segment.static_contacts.all():
-                    segment.static_contacts.remove(contact)
-                    removed_count += 1
-            except Contact.DoesNotExist:
-                continue
+        try:
+            with transaction.atomic():
+                counts = remove_segment_contacts(segment, iter_contact_ids(request))
+        except ValueError as e:
+            return Response({"error": f"Invalid contact id list: {e}"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Update the contact count
-        segment.contact_count = segment.static_contacts.count()
-        segment.save()
+        if not sum(counts.values()):
+            return Response({"error": "contact_ids list is required"}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(
             {
-                "message": f"Removed {removed_count} contacts from segment.",
-                "removed": removed_count,
+                "message": f"Removed {counts['removed']} contacts from segment.",
+                "contact_count": segment.contact_count,
+                **counts,
             }
         )
 
+    @action(detail=False, methods=["GET"])
+    def overlap(self, request):
+        """Return the size of each segment in ``?segments=<id>,<id>,...`` and of every pairwise overlap."""
+        segment_ids = [value for value in request.query_params.get("segments", "").split(",") if value]
+        if len(segment_ids) < 2:  # noqa: PLR2004
+            return Response({"error": "At least two segments are required"}, status=status.HTTP_400_BAD_REQUEST)
 
-class SupportTicketViewSet(viewsets.ModelViewSet):
+        try:
+            return Response(overlaps(expression_segments({"union": segment_ids})))
+        except SegmentExpressionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=["POST"])
+    def combine(self, request):
+        """Count the contacts selected by a union/intersect/except ``expression`` over segments."""
+        expression = request.data.get("expression")
+        if expression is None:
+            return Response({"error": "expression is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            contact_count = evaluate(expression).bit_count()
+        except SegmentExpressionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"expression": expression, "contact_count": contact_count})
+
+
+class SupportTicketViewSet(QuerysetProfileMixin, viewsets.ModelViewSet):
     """ViewSet for managing Support Tickets."""
 
     queryset = SupportTicket.objects.all()
+    cursor_ordering = ("-created_at", "-id")
+    queryset_profiles = {
+        "default": {
+            "select_related": ["assigned_to", "created_by", "contact", "account"],
+            "prefetch_related": ["tags"],
+        },
+    }
     serializer_class = SupportTicketSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ["status", "priority", "category", "contact", "account", "assigned_to", "is_overdue", "tags"]
     search_fields = ["subject", "description", "category"]
     ordering_fields = ["created_at", "updated_at", "due_by", "resolved_at"]
@@ -623,7 +967,7 @@ class SupportTicketViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["GET"])
     def my_tickets(self, request):
         """Return tickets assigned to the current user."""
-        tickets = self.queryset.filter(assigned_to=request.user)
+        tickets = self.get_queryset().filter(assigned_to=request.user)
         page = self.paginate_queryset(tickets)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -635,7 +979,7 @@ class SupportTicketViewSet(viewsets.ModelViewSet):
     def messages(self, request, pk=None):
         """Return messages for a specific ticket."""
         ticket = self.get_object()
-        messages = ticket.messages.all().order_by("created_at")
+        messages = ticket.messages.select_related("sender", "ticket").order_by("created_at")
         page = self.paginate_queryset(messages)
         if page is not None:
             serializer = TicketMessageSerializer(page, many=True)
@@ -688,10 +1032,11 @@ class SupportTicketViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class TicketMessageViewSet(viewsets.ModelViewSet):
+class TicketMessageViewSet(QuerysetProfileMixin, viewsets.ModelViewSet):
     """ViewSet for managing Ticket Messages."""
 
     queryset = TicketMessage.objects.all()
+    queryset_profiles = {"default": {"select_related": ["sender", "ticket"]}}
     serializer_class = TicketMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
@@ -710,10 +1055,17 @@ class TicketMessageViewSet(viewsets.ModelViewSet):
         ticket.save(update_fields=["updated_at"])
 
 
-class ReportViewSet(viewsets.ModelViewSet):
+class ReportViewSet(QuerysetProfileMixin, viewsets.ModelViewSet):
     """ViewSet for managing Reports."""
 
     queryset = Report.objects.all()
+    cursor_ordering = ("-created_at", "-id")
+    queryset_profiles = {
+        "default": {
+            "select_related": ["created_by"],
+            "prefetch_related": [related_only("shared_with", User.objects.all())],
+        }
+    }
     serializer_class = ReportSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -723,11 +1075,8 @@ class ReportViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Return reports that the user has access to."""
-        user = self.request.user
-        # Include reports that are public, created by the user, or shared with the user
-        return Report.objects.filter(
-            models.Q(is_public=True) | models.Q(created_by=user) | models.Q(shared_with=user)
-        ).distinct()
+        # Public reports, the user's own and those shared with them, cached per user
+        return super().get_queryset().filter(pk__in=accessible_ids(self.request.user, Report))
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -737,26 +1086,20 @@ class ReportViewSet(viewsets.ModelViewSet):
         """Execute the report and return the results."""
         report = self.get_object()
 
-        # In a real implementation, you would process the report's query_params here
-        # This is a placeholder - in production, you'd execute the actual query
-        # based on the report configuration
-
-        # Update the last_run_at timestamp
-        from django.utils import timezone
+        try:
+            results = run_report(report)
+        except ReportConfigError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         report.last_run_at = timezone.now()
         report.save(update_fields=["last_run_at"])
 
-        # Return mock results
         return Response(
             {
                 "report_id": str(report.id),
                 "report_name": report.name,
                 "executed_at": report.last_run_at,
-                "results": {
-                    "data": [],  # This would contain the actual query results
-                    "count": 0,
-                },
+                "results": results,
             }
         )
 
@@ -769,28 +1112,30 @@ class ReportViewSet(viewsets.ModelViewSet):
         if not user_ids:
             return Response({"error": "user_ids list is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        from django.contrib.auth import get_user_model
-
-        User = get_user_model()
-
-        added_count = 0
-        for user_id in user_ids:
-            try:
-                user = User.objects.get(id=user_id)
-                report.shared_with.add(user)
-                added_count += 1
-            except User.DoesNotExist:
-                continue
+        # One add() sends one m2m_changed, which drops the cached access sets of these users
+        users = list(User.objects.filter(id__in=user_ids).values_list("pk", flat=True))
+        report.shared_with.add(*users)
+        added_count = len(users)
 
         return Response(
             {"message": f"Shared report with {added_count} users.", "shared_with_count": report.shared_with.count()}
         )
 
 
-class DashboardViewSet(viewsets.ModelViewSet):
+class DashboardViewSet(QuerysetProfileMixin, viewsets.ModelViewSet):
     """ViewSet for managing Dashboards."""
 
     queryset = Dashboard.objects.all()
+    queryset_profiles = {
+        "default": {
+            "select_related": ["created_by"],
+            "prefetch_related": [
+                related_only("shared_with", User.objects.all()),
+                related_only("reports", Report.objects.all()),
+                Prefetch("items", queryset=DashboardItem.objects.select_related("report", "dashboard")),
+            ],
+        },
+    }
     serializer_class = DashboardSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -800,11 +1145,8 @@ class DashboardViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Return dashboards that the user has access to."""
-        user = self.request.user
-        # Include dashboards that are public, created by the user, or shared with the user
-        return Dashboard.objects.filter(
-            models.Q(is_public=True) | models.Q(created_by=user) | models.Q(shared_with=user)
-        ).distinct()
+        # Public dashboards, the user's own and those shared with them, cached per user
+        return super().get_queryset().filter(pk__in=accessible_ids(self.request.user, Dashboard))
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -818,18 +1160,10 @@ class DashboardViewSet(viewsets.ModelViewSet):
         if not user_ids:
             return Response({"error": "user_ids list is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        from django.contrib.auth import get_user_model
-
-        User = get_user_model()
-
-        added_count = 0
-        for user_id in user_ids:
-            try:
-                user = User.objects.get(id=user_id)
-                dashboard.shared_with.add(user)
-                added_count += 1
-            except User.DoesNotExist:
-                continue
+        # One add() sends one m2m_changed, which drops the cached access sets of these users
+        users = list(User.objects.filter(id__in=user_ids).values_list("pk", flat=True))
+        dashboard.shared_with.add(*users)
+        added_count = len(users)
 
         return Response(
             {
@@ -838,11 +1172,19 @@ class DashboardViewSet(viewsets.ModelViewSet):
             }
         )
 
+    @action(detail=True, methods=["GET"], url_path="render")
+    def render_items(self, request, pk=None):
+        """Run the reports of every item concurrently and return them with per-item timings."""
+        dashboard = self.get_object()
+        return Response(render_dashboard(dashboard))
+
 
-class DashboardItemViewSet(viewsets.ModelViewSet):
+class DashboardItemViewSet(QuerysetProfileMixin, viewsets.ModelViewSet):
     """ViewSet for managing Dashboard Items."""
 
     queryset = DashboardItem.objects.all()
+    cursor_ordering = ("dashboard_id", "position_y", "position_x")
+    queryset_profiles = {"default": {"select_related": ["report", "dashboard"]}}
     serializer_class = DashboardItemSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
@@ -850,9 +1192,58 @@ class DashboardItemViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Only return dashboard items for dashboards the user can access."""
-        user = self.request.user
-        accessible_dashboards = Dashboard.objects.filter(
-            models.Q(is_public=True) | models.Q(created_by=user) | models.Q(shared_with=user)
-        ).values_list("id", flat=True)
+        return super().get_queryset().filter(dashboard_id__in=accessible_ids(self.request.user, Dashboard))
+
+
+class ImportJobViewSet(QuerysetProfileMixin, viewsets.ModelViewSet):
+    """Upload CSV/NDJSON files of contacts or accounts and follow the import progress."""
+
+    queryset = ImportJob.objects.all()
+    cursor_ordering = ("-created_at", "-id")
+    queryset_profiles = {"default": {"select_related": ["created_by"]}}
+    serializer_class = ImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    http_method_names = ["get", "post", "head", "options"]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ["kind", "status"]
+
+    def get_queryset(self):
+        return super().get_queryset().filter(created_by=self.request.user)
+
+    def perform_create(self, serializer):
+        job = serializer.save(created_by=self.request.user)
+        transaction.on_commit(lambda: run_import_job.delay(str(job.pk)))
+
+
+@transaction.non_atomic_requests
+@require_GET
+def track_open(request, token):
+    """Tracking pixel: record an open and return a transparent GIF, whatever happens."""
+    try:
+        record_event(OPEN, *read_open_token(token))
+    except signing.BadSignature:
+        pass
+    except redis.RedisError:
+        logger.exception("Could not record an email open")
+    response = HttpResponse(PIXEL, content_type="image/gif")
+    add_never_cache_headers(response)
+    return response
+
+
+@transaction.non_atomic_requests
+@require_GET
+def track_click(request, token):
+    """Record a click and redirect to the link's target."""
+    try:
+        campaign_id, recipient_id, email_id, url = read_click_token(token)
+    except signing.BadSignature as e:
+        raise Http404 from e
+    try:
+        record_event(CLICK, campaign_id, recipient_id, email_id)
+    except redis.RedisError:
+        logger.exception("Could not record an email click")
+    response = HttpResponseRedirect(url)
+    add_never_cache_headers(response)
+    return response
 
-        return DashboardItem.objects.filter(dashboard_id__in=accessible_dashboards)
@@ -3,6 +3,8 @@ from rest_framework import filters
 from rest_framework import permissions
 from rest_framework import viewsets
 
+from eventuais.crm.mixins import QuerysetProfileMixin
+
 from .models import Comment
 from .models import Crew
 from .models import Equipment
@@ -75,8 +77,9 @@ class TaskViewSet(viewsets.ModelViewSet):
     ordering_fields = ["created_at", "priority", "status"]
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(QuerysetProfileMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all()
+    queryset_profiles = {"default": {"select_related": ["author"]}}
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
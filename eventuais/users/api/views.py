@@ -22,6 +22,7 @@ class UserViewSet(RetrieveModelMixin, ListModelMixin, UpdateModelMixin, GenericV
     serializer_class = UserSerializer
     queryset = User.objects.all()
     lookup_field = "pk"
+    cursor_ordering = ("id",)
 
     def get_queryset(self, *args, **kwargs):
         assert isinstance(self.request.user.id, int)